@@ -0,0 +1,120 @@
+"""
+Compare the compiled single-pass matcher against the per-field scan it
+replaced.
+
+    python benchmarks/bench_extraction.py [--pages 40] [--repeat 5]
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.extraction import (  # noqa: E402
+    C1_LABEL_PATTERNS,
+    EXPECTED_FIELDS,
+    FIELD_LABEL_PATTERNS,
+    _extract_number_from_line,
+    _normalize,
+    extract_fields_from_text,
+)
+
+
+SECTIONS = """
+C1:
+Total first-time, first-year men who applied 19,195
+Total first-time, first-year women who applied 23,636
+Total first-time, first-year another gender who applied 0
+Total first-time, first-year unknown gender who applied 781
+Total first-time, first-year men who were admitted 1,070
+Total first-time, first-year women who were admitted 885
+Total first-time, first-year another gender who were admitted 0
+Total first-time, first-year unknown gender who were admitted 0
+
+G1:
+Tuition (Undergraduates) 71,325
+Required Fees: (Undergraduates) 1,941
+Food and housing (on-campus): (Undergraduates) 20,835
+Housing Only (on-campus): (Undergraduates) --
+Food Only (on-campus meal plan): (Undergraduates) --
+
+H2:
+A. Number of degree-seeking undergraduate students 7,497
+B. Number of students in line a who applied for need-based financial aid 2,953
+C. Number of students in line b who were determined to have financial need 2,589
+D. Number of students in line c who were awarded any financial aid 2,579
+J. The average financial aid package of those in line d 78,883
+"""
+
+NOISE_LINE = "Common Data Set 2024-2025       Page filler describing enrollment and persistence {n}"
+
+
+def build_document(pages: int, lines_per_page: int = 60) -> str:
+    noise = "\n".join(NOISE_LINE.format(n=n) for n in range(pages * lines_per_page))
+    return noise + SECTIONS
+
+
+def find_value_on_line_or_next_lines(text: str, label_patterns, lookahead: int = 2):
+    # The per-field search the compiled matcher replaced, kept as the baseline.
+    lines = _normalize(text).split("\n")
+    for pattern in label_patterns:
+        regex = re.compile(pattern, re.IGNORECASE)
+        for i, line in enumerate(lines):
+            if regex.search(line):
+                value = _extract_number_from_line(line)
+                if value is not None:
+                    return value
+                if re.search(r"--|\bN/?A\b|\bNone\b", line, re.IGNORECASE):
+                    return None
+
+                for j in range(1, lookahead + 1):
+                    if i + j < len(lines):
+                        nxt = lines[i + j].strip()
+                        value = _extract_number_from_line(nxt)
+                        if value is not None:
+                            return value
+                        if re.fullmatch(r"--|N/?A|None|-", nxt, re.IGNORECASE):
+                            return None
+    return None
+
+
+def extract_per_field(text: str):
+    text = _normalize(text)
+    data = dict(EXPECTED_FIELDS)
+    for key, patterns in {**C1_LABEL_PATTERNS, **FIELD_LABEL_PATTERNS}.items():
+        data[key] = find_value_on_line_or_next_lines(text, patterns, lookahead=2)
+    return data
+
+
+def best_of(func, text, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(text)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 40, 200])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'pages':>6} {'per-field (ms)':>15} {'compiled (ms)':>14} {'speedup':>8}")
+    for pages in args.pages:
+        text = build_document(pages)
+        legacy_time, legacy = best_of(extract_per_field, text, args.repeat)
+        compiled_time, compiled = best_of(extract_fields_from_text, text, args.repeat)
+        if legacy != compiled:
+            raise SystemExit(f"results differ for {pages} pages")
+        print(
+            f"{pages:>6} {legacy_time * 1000:>15.2f} {compiled_time * 1000:>14.2f} "
+            f"{legacy_time / compiled_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
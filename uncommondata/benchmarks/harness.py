@@ -0,0 +1,96 @@
+"""
+Timing, memory and baseline helpers shared by the benchmark suites.
+
+Results are a flat mapping of benchmark name to metrics, e.g.
+``{"dump.uploads.json.1000": {"seconds": 0.12, "peak_bytes": 4200000}}``.
+A metric's name says which direction is better, so two result files can be
+compared without knowing what each benchmark measures.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# Metrics where a larger number is better; every other metric is a cost.
+HIGHER_IS_BETTER = {"per_second", "mb_per_second"}
+
+
+def time_call(func: Callable[[], object], repeat: int = 5) -> Dict[str, float]:
+    """Run ``func`` ``repeat`` times and report the median and best wall time."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return {"seconds": statistics.median(timings), "min_seconds": min(timings)}
+
+
+def peak_memory(func: Callable[[], object]) -> int:
+    """Peak Python heap allocated while ``func`` runs, in bytes."""
+    tracemalloc.start()
+    try:
+        func()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def metadata() -> Dict[str, str]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+
+    import django
+
+    return {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "django": django.get_version(),
+        "platform": platform.platform(),
+    }
+
+
+def write_results(path: Path, results: Dict[str, Dict[str, float]]) -> None:
+    path.write_text(json.dumps({"meta": metadata(), "results": results}, indent=2, sort_keys=True) + "\n")
+
+
+def load_results(path: Path) -> Dict[str, Dict[str, float]]:
+    return json.loads(path.read_text())["results"]
+
+
+def find_regressions(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    """
+    Describe every metric that got worse than ``baseline`` by more than
+    ``tolerance`` (0.2 = 20%). Benchmarks missing from either side are
+    ignored so suites can be added or skipped.
+    """
+    regressions = []
+    for name, metrics in sorted(results.items()):
+        for metric, value in sorted(metrics.items()):
+            if metric.startswith("min_"):
+                continue
+            previous = baseline.get(name, {}).get(metric)
+            if not previous:
+                continue
+            change = value / previous - 1
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > tolerance:
+                regressions.append(f"{name} {metric}: {previous:.4g} -> {value:.4g} ({change:+.0%})")
+    return regressions
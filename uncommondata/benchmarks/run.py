@@ -0,0 +1,264 @@
+"""
+Benchmark the extraction, upload, dump and download hot paths.
+
+Runs offline against a throwaway test database and media directory, writes
+the results to a JSON file and, given a baseline from an earlier run,
+exits non-zero when a metric regressed beyond the tolerance.
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --baseline baseline.json --tolerance 0.2
+    python benchmarks/run.py --suite dump --rows 1000 10000 100000
+"""
+import argparse
+import hashlib
+import logging
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "uncommondata.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.files.base import ContentFile  # noqa: E402
+from django.core.files.uploadedfile import SimpleUploadedFile  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from core.extraction import EXTRACTOR_VERSION, extract_fields_from_file  # noqa: E402
+from core.models import InstitutionYearSummary, Upload  # noqa: E402
+from core.storage import content_addressed_name  # noqa: E402
+from core.synthetic import generate_document  # noqa: E402
+from harness import find_regressions, load_results, peak_memory, time_call, write_results  # noqa: E402
+
+SUITES = {}
+
+
+def suite(func):
+    SUITES[func.__name__] = func
+    return func
+
+
+def consume(response):
+    if response.streaming:
+        for _chunk in response.streaming_content:
+            pass
+    response.close()
+    return response
+
+
+@suite
+def extraction(ctx):
+    rng = random.Random(0)
+    for label, pages in (("small", 2), ("large", 200)):
+        path = ctx.workdir / f"cds_{label}.txt"
+        path.write_text(generate_document(rng, pages=pages).text)
+        ctx.results[f"extraction.file.{label}"] = time_call(
+            lambda: extract_fields_from_file(str(path)), ctx.repeat
+        )
+
+    # Every section missing, so each file is read to the end; peak memory
+    # should stay flat as the file grows.
+    for pages in (20, 200, 2000):
+        path = ctx.workdir / f"cds_missing_{pages}.txt"
+        path.write_text(generate_document(rng, pages=pages, missing_rate=1.0).text)
+        name = f"extraction.file.memory.{pages}"
+        ctx.results[name] = time_call(lambda: extract_fields_from_file(str(path)), ctx.repeat)
+        ctx.results[name]["peak_bytes"] = peak_memory(lambda: extract_fields_from_file(str(path)))
+        ctx.results[name]["file_bytes"] = path.stat().st_size
+
+
+@suite
+def upload(ctx):
+    client = ctx.client()
+    rng = random.Random(1)
+    documents = [generate_document(rng, pages=20).text.encode() for _ in range(ctx.uploads)]
+
+    def post_all():
+        for content in documents:
+            response = client.post(
+                "/app/api/upload/",
+                {
+                    "institution": "Benchmark",
+                    "year": "2024-2025",
+                    "file": SimpleUploadedFile("cds.txt", content, content_type="text/plain"),
+                },
+            )
+            assert response.status_code == 201, response.content
+
+    timing = time_call(post_all, repeat=1)
+    ctx.results["upload.api"] = {
+        "seconds": timing["seconds"],
+        "per_second": len(documents) / timing["seconds"],
+    }
+    Upload.objects.filter(institution="Benchmark").delete()
+
+    payload = ContentFile(os.urandom(1024 * 1024) * 64, name="large.pdf")
+    timing = time_call(lambda: Upload.hash_uploaded_file(payload), ctx.repeat)
+    ctx.results["upload.hash_uploaded_file"] = {
+        "seconds": timing["seconds"],
+        "mb_per_second": payload.size / (1024 * 1024) / timing["seconds"],
+    }
+
+
+@suite
+def dump(ctx):
+    client = ctx.client()
+    user = User.objects.get(username="benchmark")
+    institutions = [f"Benchmark College {n:04d}" for n in range(500)]
+    created = 0
+    for rows in sorted(ctx.rows):
+        batch = []
+        for n in range(created, rows):
+            digest = hashlib.sha256(f"dump-row-{n}".encode()).hexdigest()
+            batch.append(
+                Upload(
+                    id=digest,
+                    content_sha256=digest,
+                    user=user,
+                    institution=institutions[n % len(institutions)],
+                    year="2024-2025",
+                    file=content_addressed_name(digest, "cds.pdf"),
+                    original_filename="cds.pdf",
+                )
+            )
+        Upload.objects.bulk_create(batch, batch_size=5000)
+        created = rows
+
+        for mode, query in (("json", ""), ("ndjson", "?stream=ndjson"), ("page", "?limit=100")):
+            url = f"/app/api/dump-uploads/{query}"
+            name = f"dump.uploads.{mode}.{rows}"
+            ctx.results[name] = time_call(lambda: consume(client.get(url)), ctx.repeat)
+            ctx.results[name]["peak_bytes"] = peak_memory(lambda: consume(client.get(url)))
+
+
+@suite
+def download(ctx):
+    client = ctx.client()
+    content = generate_document(random.Random(2), pages=50).text.encode()
+    digest = hashlib.sha256(content).hexdigest()
+    Upload.objects.create(
+        id=digest,
+        user=User.objects.get(username="benchmark"),
+        institution="Benchmark",
+        year="2024-2025",
+        file=ContentFile(content, name="cds.txt"),
+    )
+    missing = hashlib.sha256(b"not uploaded").hexdigest()
+
+    ctx.results["download.hit"] = time_call(lambda: consume(client.get(f"/app/api/download/{digest}")), ctx.repeat)
+    ctx.results["download.miss"] = time_call(lambda: consume(client.get(f"/app/api/download/{missing}")), ctx.repeat)
+    etag = f'"{digest}"'
+    ctx.results["download.not_modified"] = time_call(
+        lambda: consume(client.get(f"/app/api/download/{digest}", headers={"If-None-Match": etag})), ctx.repeat
+    )
+    ctx.results["download.range"] = time_call(
+        lambda: consume(client.get(f"/app/api/download/{digest}", headers={"Range": "bytes=-65536"})), ctx.repeat
+    )
+
+    user = User.objects.get(username="benchmark")
+    for n in range(20):
+        Upload.objects.create(
+            id=hashlib.sha256(f"archive-{n}".encode()).hexdigest(),
+            user=user,
+            institution="Benchmark Archive",
+            year="2024-2025",
+            file=ContentFile(os.urandom(1024 * 1024), name=f"cds_{n}.pdf"),
+        )
+    url = "/app/api/download-archive/?institution=Benchmark+Archive&manifest=1"
+    ctx.results["download.archive.20"] = time_call(lambda: consume(client.get(url)), ctx.repeat)
+    ctx.results["download.archive.20"]["peak_bytes"] = peak_memory(lambda: consume(client.get(url)))
+
+
+@suite
+def stats(ctx):
+    client = ctx.client()
+    profile = User.objects.get(username="benchmark").profile
+    profile.is_curator = True
+    profile.save()
+    rng = random.Random(3)
+    years = [f"{year}-{year + 1}" for year in range(2000, 2025)]
+    summaries = [
+        InstitutionYearSummary(
+            institution=f"Benchmark College {n:04d}",
+            year=year,
+            extractor_version=EXTRACTOR_VERSION,
+            uploads=1,
+            tuition_undergraduates=rng.randrange(5000, 70000),
+            men_applied=rng.randrange(1000, 30000),
+            men_admitted=rng.randrange(100, 1000),
+            women_applied=rng.randrange(1000, 30000),
+            women_admitted=rng.randrange(100, 1000),
+        )
+        for n in range(400)
+        for year in years
+    ]
+    InstitutionYearSummary.objects.bulk_create(summaries, batch_size=5000)
+
+    for name, query in (("all", {}), ("institution", {"institution": "Benchmark College 0001"})):
+        ctx.results[f"stats.api.{name}"] = time_call(lambda: client.get("/app/api/stats/", query), ctx.repeat)
+
+
+class Context:
+    def __init__(self, workdir, repeat, rows, uploads):
+        self.workdir = workdir
+        self.repeat = repeat
+        self.rows = rows
+        self.uploads = uploads
+        self.results = {}
+
+    def client(self):
+        client = Client()
+        client.force_login(User.objects.get_or_create(username="benchmark")[0])
+        return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--suite", nargs="+", choices=sorted(SUITES), default=list(SUITES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--uploads", type=int, default=200, help="Documents posted by the upload suite")
+    parser.add_argument("--output", type=Path, default=Path("benchmark-results.json"))
+    parser.add_argument("--baseline", type=Path, help="Earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging, 0.2 = 20%%")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    # The download miss benchmark would log every 404.
+    logging.getLogger("django.request").setLevel(logging.ERROR)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with tempfile.TemporaryDirectory() as workdir, override_settings(
+            MEDIA_ROOT=os.path.join(workdir, "media"),
+            EXTRACTION_TEXT_CACHE_DIR=os.path.join(workdir, "cache"),
+        ):
+            ctx = Context(Path(workdir), args.repeat, args.rows, args.uploads)
+            for name in args.suite:
+                print(f"running {name}...", file=sys.stderr)
+                SUITES[name](ctx)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    for name, metrics in sorted(ctx.results.items()):
+        print(f"{name:<32} " + "  ".join(f"{metric}={value:.4g}" for metric, value in sorted(metrics.items())))
+    write_results(args.output, ctx.results)
+
+    if args.baseline:
+        regressions = find_regressions(ctx.results, load_results(args.baseline), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 from functools import wraps
 from django.http import JsonResponse
 
+from .models import user_is_curator
+
 def api_login_required(view_func):
     """
     Decorator for API views that returns 401 instead of redirecting to login page
@@ -27,7 +29,7 @@ def curator_required(view_func):
                 {"error": "Authentication required"}, 
                 status=401
             )
-        if not request.user.profile.is_curator:
+        if not user_is_curator(request.user):
             return JsonResponse(
                 {"error": "Curator privileges required"}, 
                 status=403
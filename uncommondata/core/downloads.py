@@ -0,0 +1,207 @@
+"""
+Serving stored upload files for download_api and download_archive_api.
+
+Files are content addressed, so the SHA-256 is a strong ETag and a file
+never changes under its URL: responses carry immutable cache headers,
+conditional requests are answered with 304 before the file is opened, and
+a single byte range is served as 206 so interrupted downloads resume.
+With DOWNLOAD_OFFLOAD set, the body is left to the web server through
+X-Sendfile or X-Accel-Redirect, which then also handles ranges.
+
+Archives of many uploads are ZIP files written entry by entry into a small
+buffer that is emptied after every chunk, so neither the archive nor any
+one file is ever held whole in memory or written to disk.
+"""
+import json
+import mimetypes
+import re
+import zipfile
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, HttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+from . import dumps
+from .models import Upload
+
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+ARCHIVE_CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    The inclusive (first, last) byte positions asked for by a Range header
+    over a file of ``size`` bytes, or None to send the whole file: no
+    header, several ranges, or one that does not parse. Raises ValueError
+    when the range lies entirely past the end of the file.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes.
+        if int(last) == 0 or size == 0:
+            raise ValueError("unsatisfiable range")
+        return max(0, size - int(last)), size - 1
+    if last and int(last) < int(first):
+        return None
+    if int(first) >= size:
+        raise ValueError("unsatisfiable range")
+    return int(first), min(int(last), size - 1) if last else size - 1
+
+
+def _range_applies(request, etag: str, last_modified: int) -> bool:
+    # If-Range asks for the range only while the file is unchanged.
+    validator = request.headers.get("If-Range")
+    if not validator:
+        return True
+    if validator.startswith(('"', "W/")):
+        return validator == etag
+    return parse_http_date_safe(validator) == last_modified
+
+
+class _FileRange:
+    """File-like view of ``length`` bytes of ``file`` from its position."""
+
+    def __init__(self, file, length: int):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def _offloaded(upload: Upload) -> HttpResponse:
+    content_type = mimetypes.guess_type(upload.original_filename)[0] or "application/octet-stream"
+    response = HttpResponse(content_type=content_type)
+    response["Content-Disposition"] = content_disposition_header(True, upload.original_filename)
+    if settings.DOWNLOAD_OFFLOAD == "x-sendfile":
+        response["X-Sendfile"] = upload.file.path
+    elif settings.DOWNLOAD_OFFLOAD == "x-accel-redirect":
+        response["X-Accel-Redirect"] = settings.DOWNLOAD_ACCEL_REDIRECT_PREFIX + quote(upload.file.name)
+    else:
+        raise ImproperlyConfigured(f"Unknown DOWNLOAD_OFFLOAD {settings.DOWNLOAD_OFFLOAD!r}")
+    return response
+
+
+def _file_response(request, upload: Upload, etag: str, last_modified: int) -> HttpResponse:
+    if settings.DOWNLOAD_OFFLOAD:
+        return _offloaded(upload)
+
+    size = upload.file.size
+    header = request.headers.get("Range") if _range_applies(request, etag, last_modified) else None
+    try:
+        byte_range = parse_range(header, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+    if byte_range is None:
+        return FileResponse(upload.file.open("rb"), as_attachment=True, filename=upload.original_filename)
+
+    first, last = byte_range
+    file = upload.file.open("rb")
+    file.seek(first)
+    response = FileResponse(
+        _FileRange(file, last - first + 1),
+        status=206,
+        as_attachment=True,
+        filename=upload.original_filename,
+    )
+    response["Content-Length"] = last - first + 1
+    response["Content-Range"] = f"bytes {first}-{last}/{size}"
+    return response
+
+
+def serve(request, upload: Upload) -> HttpResponse:
+    etag = quote_etag(upload.content_sha256 or upload.id)
+    last_modified = int(upload.uploaded_at.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(request, upload, etag, last_modified)
+
+    response["Accept-Ranges"] = "bytes"
+    if response.status_code in (200, 206, 304):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Cache-Control"] = CACHE_CONTROL
+    return response
+
+
+class _ChunkBuffer:
+    """Write-only, unseekable sink for ZipFile, emptied by ``take``."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> List[bytes]:
+        """The buffered bytes as a list of at most one non-empty chunk."""
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return [data] if data else []
+
+
+def archive_name(upload: Upload) -> str:
+    """Entry name in an archive: the id prefix keeps equal filenames apart."""
+    filename = upload.original_filename or upload.file.name.rsplit("/", 1)[-1]
+    return f"{upload.id[:12]}_{filename}"
+
+
+def archive_chunks(uploads, manifest: bool = False) -> Iterator[bytes]:
+    """
+    Yield a ZIP of the files of ``uploads`` piece by piece. Entries are
+    stored uncompressed, as CDS files are mostly PDFs that would not shrink.
+    With ``manifest`` a final manifest.json holds each upload's
+    dump_uploads_api row plus its entry name, or an error if its file could
+    not be read.
+    """
+    buffer = _ChunkBuffer()
+    rows: Dict[str, Dict] = {}
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for upload in uploads.iterator(chunk_size=dumps.STREAM_CHUNK_SIZE):
+            row = dumps.upload_row(upload) if manifest else None
+            try:
+                source = upload.file.open("rb")
+            except OSError:
+                if manifest:
+                    rows[upload.id] = {**row, "error": "file missing"}
+                continue
+
+            name = archive_name(upload)
+            info = zipfile.ZipInfo(name, date_time=timezone.localtime(upload.uploaded_at).timetuple()[:6])
+            # A known size lets ZipFile pick zip64 headers up front.
+            info.file_size = upload.file.size
+            with source, archive.open(info, "w") as entry:
+                for chunk in iter(lambda: source.read(ARCHIVE_CHUNK_SIZE), b""):
+                    entry.write(chunk)
+                    yield from buffer.take()
+            if manifest:
+                rows[upload.id] = {**row, "archive_name": name}
+            yield from buffer.take()
+
+        if manifest:
+            payload = {"status": "ok", "count": len(rows), "uploads": rows}
+            archive.writestr("manifest.json", json.dumps(payload, cls=DjangoJSONEncoder, indent=2))
+    yield from buffer.take()
@@ -0,0 +1,168 @@
+import base64
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 2000
+
+
+def upload_row(upload):
+    return {
+        "id": upload.id,
+        "user": upload.user.username,
+        "institution": upload.institution,
+        "year": upload.year,
+        "url": upload.url,
+        "file": upload.original_filename,
+        "uploaded_at": upload.uploaded_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "download_url": f"/app/api/download/{upload.id}",
+        "process_url": f"/app/api/process/{upload.id}",
+    }
+
+
+def data_row(upload):
+    return {
+        "id": upload.id,
+        "user": upload.user.username,
+        "institution": upload.institution,
+        "year": upload.year,
+        "file": upload.original_filename,
+        "uploaded_at": upload.uploaded_at.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def _parse_moment(value: str, end_of_day: bool = False) -> datetime:
+    """
+    Accept an ISO date or datetime. A bare date means the start of that day,
+    or the start of the next day when it closes a range.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"invalid date: {value}")
+        if end_of_day:
+            day += timedelta(days=1)
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_uploads(queryset, params):
+    """
+    Narrow ``queryset`` by the institution, year, user, since and until query
+    parameters. Each maps onto one of the Upload indexes; raises ValueError
+    for malformed dates.
+    """
+    if params.get("institution"):
+        queryset = queryset.filter(institution=params["institution"])
+    if params.get("year"):
+        queryset = queryset.filter(year=params["year"])
+    if params.get("user"):
+        queryset = queryset.filter(user__username=params["user"])
+    if params.get("since"):
+        queryset = queryset.filter(uploaded_at__gte=_parse_moment(params["since"]))
+    if params.get("until"):
+        until = params["until"]
+        if parse_datetime(until) is None:
+            queryset = queryset.filter(uploaded_at__lt=_parse_moment(until, end_of_day=True))
+        else:
+            queryset = queryset.filter(uploaded_at__lte=_parse_moment(until))
+    return queryset
+
+
+def encode_cursor(upload) -> str:
+    raw = f"{upload.uploaded_at.isoformat()}|{upload.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """Return (uploaded_at, id) from a cursor; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        uploaded_at, upload_id = raw.split("|", 1)
+        return datetime.fromisoformat(uploaded_at), upload_id
+    except ValueError as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def parse_limit(value) -> int:
+    """Page size from the ``limit`` parameter; raises ValueError if invalid."""
+    if value in (None, ""):
+        return DEFAULT_PAGE_SIZE
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def paginated_response(queryset, row, limit, cursor=None):
+    """
+    One keyset page of ``queryset`` ordered newest first. The cursor names the
+    last row of the previous page, so pages stay stable while rows are added.
+    """
+    queryset = queryset.order_by("-uploaded_at", "-id")
+    if cursor:
+        uploaded_at, upload_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, id__lt=upload_id)
+        )
+
+    page = list(queryset[: limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    return JsonResponse(
+        {
+            "status": "ok",
+            "count": len(page),
+            "uploads": {upload.id: row(upload) for upload in page},
+            "next_cursor": encode_cursor(page[-1]) if has_more else None,
+        },
+        status=200,
+    )
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, cls=DjangoJSONEncoder)
+
+
+def _ndjson_lines(queryset, row):
+    for upload in queryset.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        yield _dumps(row(upload)) + "\n"
+
+
+def _json_object_chunks(queryset, row, empty):
+    rows = queryset.iterator(chunk_size=STREAM_CHUNK_SIZE)
+    first = next(rows, None)
+    if first is None:
+        yield _dumps(empty)
+        return
+
+    yield "{" + _dumps(first.id) + ": " + _dumps(row(first))
+    for upload in rows:
+        yield ", " + _dumps(upload.id) + ": " + _dumps(row(upload))
+    yield "}"
+
+
+def streaming_response(queryset, row, mode, empty=None):
+    """
+    Stream ``queryset`` without holding it in memory: ``mode="ndjson"`` sends
+    one row per line, ``mode="json"`` sends the same object as the regular
+    response, built incrementally. ``empty`` is the body sent when there are
+    no rows in json mode.
+    """
+    if mode == "ndjson":
+        return StreamingHttpResponse(_ndjson_lines(queryset, row), content_type="application/x-ndjson")
+    return StreamingHttpResponse(
+        _json_object_chunks(queryset, row, {} if empty is None else empty),
+        content_type="application/json",
+    )
@@ -1,9 +1,26 @@
+import hashlib
+import json
 import os
 import re
+import shutil
 import subprocess
+import tempfile
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+from .metrics import phase
+from .textcache import TextCache
+
+
+# Bump whenever a change to this module can change extracted values; stored
+# ExtractionResult rows from other versions are then ignored.
+EXTRACTOR_VERSION = 3
 
 EXPECTED_FIELDS = {
     "tuition_undergraduates": None,
@@ -27,37 +44,491 @@ EXPECTED_FIELDS = {
 }
 
 
-def pdf_to_text(filename: str) -> str:
-    if not os.path.isfile(filename):
-        raise FileNotFoundError(f"Input file not found: {filename}")
+DEFAULT_TEXT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_CONVERTER_WORKERS = 4
+DEFAULT_CONVERSION_TIMEOUT = 60
+DEFAULT_MAX_PAGES = 200
+DEFAULT_MAX_TEXT_BYTES = 50 * 1024 * 1024
+DEFAULT_LOCATE_BATCH_PAGES = 8
+DEFAULT_LOCATE_MAX_PAGES = 80
+# Characters read at a time when extracting from a single file.
+DEFAULT_STREAM_CHUNK_CHARS = 256 * 1024
+
 
-    output_filename = filename + ".txt"
+def _setting(name: str, default):
+    """Read an EXTRACTION_* Django setting, falling back when Django is not configured."""
     try:
-        subprocess.run(
-            ["pdftotext", "-layout", filename, output_filename],
-            check=True,
+        from django.conf import settings
+    except ImportError:
+        return default
+    if not settings.configured:
+        return default
+    return getattr(settings, name, default)
+
+
+def _hash_file(filename: str) -> str:
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _text_cache(directory: str, max_bytes: int) -> TextCache:
+    return TextCache(directory, max_bytes)
+
+
+def get_text_cache() -> TextCache:
+    """
+    The converted-text cache configured by EXTRACTION_TEXT_CACHE_DIR and
+    EXTRACTION_TEXT_CACHE_MAX_BYTES, or a temporary directory when Django
+    settings are not available.
+    """
+    directory = _setting("EXTRACTION_TEXT_CACHE_DIR", Path(tempfile.gettempdir()) / "uncommondata-text-cache")
+    max_bytes = _setting("EXTRACTION_TEXT_CACHE_MAX_BYTES", DEFAULT_TEXT_CACHE_MAX_BYTES)
+    return _text_cache(str(directory), max_bytes)
+
+
+class ConversionError(RuntimeError):
+    pass
+
+
+class ConversionTimeout(ConversionError):
+    pass
+
+
+class ConversionMetrics:
+    """Running totals of PDF conversions, safe to update from several threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.conversions = 0
+            self.failures = 0
+            self.timeouts = 0
+            self.pages = 0
+            self.seconds = 0.0
+
+    def record(self, seconds: float, pages: int = 0, error: Optional[Exception] = None):
+        with self._lock:
+            self.conversions += 1
+            self.seconds += seconds
+            self.pages += pages
+            if isinstance(error, ConversionTimeout):
+                self.timeouts += 1
+            elif error is not None:
+                self.failures += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "conversions": self.conversions,
+                "failures": self.failures,
+                "timeouts": self.timeouts,
+                "pages": self.pages,
+                "seconds": self.seconds,
+                "seconds_per_page": self.seconds / self.pages if self.pages else 0.0,
+            }
+
+
+conversion_metrics = ConversionMetrics()
+
+
+class PdfConverter:
+    """
+    A way of turning a PDF into layout-preserving text. ``convert`` writes the
+    text of pages ``first_page``..``last_page`` to ``output_path``, with a form
+    feed after each page, and returns the number of pages written. With
+    ``layout=False`` the text is in plain reading order, which is cheaper.
+    """
+
+    name = ""
+    options = ()
+
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    def convert(
+        self,
+        filename: str,
+        output_path: Path,
+        first_page: Optional[int] = None,
+        last_page: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        layout: bool = True,
+    ) -> int:
+        raise NotImplementedError
+
+
+class PdftotextSubprocessConverter(PdfConverter):
+    """The poppler ``pdftotext`` command line tool, run once per document."""
+
+    name = "pdftotext"
+    options = ("-layout",)
+
+    @classmethod
+    def available(cls) -> bool:
+        return shutil.which("pdftotext") is not None
+
+    def convert(
+        self, filename, output_path, first_page=None, last_page=None, timeout=None, max_bytes=None, layout=True
+    ):
+        command = ["pdftotext", *(self.options if layout else ())]
+        if first_page is not None:
+            command += ["-f", str(first_page)]
+        if last_page is not None:
+            command += ["-l", str(last_page)]
+        command += [filename, "-"]
+
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(timeout, kill) if timeout else None
+        if timer is not None:
+            timer.start()
+
+        written = pages = 0
+        try:
+            with open(output_path, "wb") as output:
+                for chunk in iter(lambda: process.stdout.read(64 * 1024), b""):
+                    written += len(chunk)
+                    if max_bytes is not None and written > max_bytes:
+                        process.kill()
+                        raise ConversionError(f"pdftotext output exceeded {max_bytes} bytes")
+                    pages += chunk.count(b"\f")
+                    output.write(chunk)
+            returncode = process.wait()
+        finally:
+            if timer is not None:
+                timer.cancel()
+            process.stdout.close()
+            process.wait()
+
+        if timed_out.is_set():
+            raise ConversionTimeout(f"pdftotext did not finish within {timeout} seconds")
+        if returncode != 0:
+            raise ConversionError(f"pdftotext failed with exit code {returncode}")
+        return pages
+
+
+class PdftotextLibraryConverter(PdfConverter):
+    """
+    The same poppler text output produced in-process through the optional
+    ``pdftotext`` Python binding, which saves a fork/exec per document.
+
+    There is no hard timeout: ConverterPool stops waiting after the timeout,
+    but a poppler call that hangs keeps its pool thread for good, and enough
+    of them leave no thread for other conversions. Only choose this backend
+    for trusted PDFs; "auto" uses it only when the command is missing.
+    """
+
+    name = "pdftotext-lib"
+    options = ("physical",)
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            import pdftotext  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def convert(
+        self, filename, output_path, first_page=None, last_page=None, timeout=None, max_bytes=None, layout=True
+    ):
+        import pdftotext
+
+        with open(filename, "rb") as f:
+            try:
+                document = pdftotext.PDF(f, physical=layout)
+            except pdftotext.Error as e:
+                raise ConversionError(f"pdftotext could not read the document: {e}") from e
+
+        first = (first_page or 1) - 1
+        last = min(last_page or len(document), len(document))
+        written = pages = 0
+        with open(output_path, "w", encoding="utf-8") as output:
+            for index in range(first, last):
+                page = document[index] + "\f"
+                written += len(page.encode("utf-8"))
+                if max_bytes is not None and written > max_bytes:
+                    raise ConversionError(f"pdftotext output exceeded {max_bytes} bytes")
+                output.write(page)
+                pages += 1
+        return pages
+
+
+PDF_CONVERTERS = {
+    converter.name: converter for converter in (PdftotextSubprocessConverter, PdftotextLibraryConverter)
+}
+
+
+def _select_converter(name: str) -> PdfConverter:
+    if name == "auto":
+        # The command can be killed at the timeout; the binding cannot.
+        converter = PdftotextSubprocessConverter
+        if not converter.available() and PdftotextLibraryConverter.available():
+            converter = PdftotextLibraryConverter
+        return converter()
+    if name not in PDF_CONVERTERS:
+        raise ValueError(f"Unknown PDF converter: {name}")
+    return PDF_CONVERTERS[name]()
+
+
+class ConverterPool:
+    """
+    Runs conversions on at most ``max_workers`` threads, so a burst of
+    requests cannot start an unbounded number of converters. Each document
+    gets ``timeout`` seconds, at most ``max_pages`` pages and at most
+    ``max_bytes`` of output.
+    """
+
+    def __init__(
+        self,
+        converter: PdfConverter,
+        max_workers: int = DEFAULT_CONVERTER_WORKERS,
+        timeout: Optional[float] = DEFAULT_CONVERSION_TIMEOUT,
+        max_pages: Optional[int] = DEFAULT_MAX_PAGES,
+        max_bytes: Optional[int] = DEFAULT_MAX_TEXT_BYTES,
+    ):
+        self.converter = converter
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pdf-converter")
+
+    @property
+    def cache_options(self):
+        """Everything that changes the converted text, for text cache keys."""
+        return (self.converter.name, *self.converter.options, f"max_pages={self.max_pages}")
+
+    def convert(
+        self,
+        filename: str,
+        output_path: Path,
+        first_page: Optional[int] = None,
+        last_page: Optional[int] = None,
+        layout: bool = True,
+    ) -> int:
+        if self.max_pages is not None:
+            first = first_page or 1
+            last_page = min(last_page or first + self.max_pages - 1, first + self.max_pages - 1)
+
+        started = time.perf_counter()
+        pages = 0
+        error = None
+        future = self._executor.submit(
+            self.converter.convert,
+            filename,
+            output_path,
+            first_page=first_page,
+            last_page=last_page,
+            timeout=self.timeout,
+            max_bytes=self.max_bytes,
+            layout=layout,
         )
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"pdftotext failed with exit code {e.returncode}") from e
+        try:
+            # A little grace so converters that enforce the timeout themselves
+            # report it first.
+            pages = future.result(timeout=self.timeout + 5 if self.timeout else None)
+            return pages
+        except FutureTimeoutError:
+            error = ConversionTimeout(f"{self.converter.name} did not finish within {self.timeout} seconds")
+            raise error
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            conversion_metrics.record(time.perf_counter() - started, pages, error)
+
+    def convert_ranges(self, filename: str, output_path: Path, ranges: List[Tuple[int, int]]) -> int:
+        """Convert each (first, last) page range in turn into one output file."""
+        pages = 0
+        part_path = output_path.with_name(output_path.name + ".part")
+        try:
+            with open(output_path, "wb") as output:
+                for first, last in ranges:
+                    pages += self.convert(filename, part_path, first_page=first, last_page=last)
+                    with open(part_path, "rb") as part:
+                        shutil.copyfileobj(part, output)
+        finally:
+            part_path.unlink(missing_ok=True)
+        return pages
+
+
+@lru_cache(maxsize=None)
+def _converter_pool(name: str, max_workers: int, timeout, max_pages, max_bytes) -> ConverterPool:
+    return ConverterPool(_select_converter(name), max_workers, timeout, max_pages, max_bytes)
+
+
+def get_converter_pool() -> ConverterPool:
+    """
+    The converter pool configured by EXTRACTION_PDF_CONVERTER ("auto",
+    "pdftotext" or "pdftotext-lib"), EXTRACTION_CONVERTER_WORKERS,
+    EXTRACTION_CONVERSION_TIMEOUT, EXTRACTION_MAX_PAGES and
+    EXTRACTION_MAX_TEXT_BYTES.
+    """
+    return _converter_pool(
+        _setting("EXTRACTION_PDF_CONVERTER", "auto"),
+        _setting("EXTRACTION_CONVERTER_WORKERS", DEFAULT_CONVERTER_WORKERS),
+        _setting("EXTRACTION_CONVERSION_TIMEOUT", DEFAULT_CONVERSION_TIMEOUT),
+        _setting("EXTRACTION_MAX_PAGES", DEFAULT_MAX_PAGES),
+        _setting("EXTRACTION_MAX_TEXT_BYTES", DEFAULT_MAX_TEXT_BYTES),
+    )
+
+
+TARGET_SECTIONS = ("C1", "G1", "H2")
+_SECTION_HEADER_RE = re.compile(r"^[ \t]*(C1|G1|H2)\b", re.IGNORECASE | re.MULTILINE)
+# Any CDS item at the start of a line ("C1:", "  G1 Undergraduate costs",
+# "H2A", "C21."), with or without -layout indentation and after the form
+# feed pdftotext puts before a page's first line. Each one ends the section
+# before it.
+_ANY_SECTION_HEADER_RE = re.compile(r"^[ \t\f]*([A-J]\d{1,2}[A-Z]?)\b", re.IGNORECASE | re.MULTILINE)
+
+
+def _scan_section_pages(pool: ConverterPool, filename: str, batch_pages: int, max_pages: int) -> Dict[str, List[int]]:
+    """
+    Convert ``batch_pages`` pages at a time without layout analysis, noting
+    the pages each target header is on, until all three have been seen, the
+    document ends or ``max_pages`` pages have been read.
+    """
+    sections: Dict[str, List[int]] = {}
+    fd, scan_name = tempfile.mkstemp(suffix=".txt")
+    os.close(fd)
+    scan_path = Path(scan_name)
+    try:
+        first = 1
+        while first <= max_pages and not all(section in sections for section in TARGET_SECTIONS):
+            last = min(first + batch_pages - 1, max_pages)
+            try:
+                pages = pool.convert(filename, scan_path, first_page=first, last_page=last, layout=False)
+            except ConversionTimeout:
+                raise
+            except ConversionError:
+                # pdftotext rejects a first page past the end of the document.
+                if first == 1:
+                    raise
+                break
+            text = scan_path.read_text(encoding="utf-8", errors="ignore")
+            for page_number, page in enumerate(text.split("\f")[:pages], start=first):
+                for match in _SECTION_HEADER_RE.finditer(page):
+                    found = sections.setdefault(match.group(1).upper(), [])
+                    if page_number not in found:
+                        found.append(page_number)
+            if pages < last - first + 1:
+                break
+            first = last + 1
+    finally:
+        scan_path.unlink(missing_ok=True)
+    return sections
+
+
+def locate_section_pages(filename: str, content_sha256: Optional[str] = None) -> Dict[str, List[int]]:
+    """
+    Cheap first pass over a PDF: convert it a few pages at a time without
+    layout analysis, stopping as soon as the C1, G1 and H2 headers have all
+    been seen, and return the 1-based pages each appears on. At most
+    EXTRACTION_LOCATE_MAX_PAGES pages are read; sections not found by then
+    are left out. The map is kept in the text cache, so each distinct PDF is
+    scanned once.
+    """
+    pool = get_converter_pool()
+    cache = get_text_cache()
+    batch_pages = max(1, _setting("EXTRACTION_LOCATE_BATCH_PAGES", DEFAULT_LOCATE_BATCH_PAGES))
+    max_pages = _setting("EXTRACTION_LOCATE_MAX_PAGES", DEFAULT_LOCATE_MAX_PAGES)
+    if pool.max_pages is not None:
+        max_pages = min(max_pages, pool.max_pages)
+    options = ("sections", *pool.cache_options, f"locate={batch_pages}/{max_pages}")
+    key = cache.key(content_sha256 or _hash_file(filename), options)
+
+    def scan(output_path: Path) -> None:
+        output_path.write_text(json.dumps(_scan_section_pages(pool, filename, batch_pages, max_pages)))
 
-    return output_filename
+    return json.loads(cache.read_text(key, scan))
 
 
-def _read_text_for_extraction(filename: str) -> str:
-    ext = Path(filename).suffix.lower()
-    if ext == ".pdf":
+def section_page_ranges(
+    section_pages: Optional[Dict[str, List[int]]], spill: int = 1
+) -> Optional[List[Tuple[int, int]]]:
+    """
+    Merged page ranges covering every target section, each extended by
+    ``spill`` pages for sections that continue onto the next page. Returns
+    None, meaning "convert everything", unless all target sections were found.
+    """
+    if not section_pages or any(not section_pages.get(section) for section in TARGET_SECTIONS):
+        return None
+
+    pages = sorted({page for section in TARGET_SECTIONS for page in section_pages[section]})
+    ranges = []
+    for page in pages:
+        if ranges and page <= ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], page + spill))
+        else:
+            ranges.append((page, page + spill))
+    return ranges
+
+
+def pdf_to_text(
+    filename: str,
+    content_sha256: Optional[str] = None,
+    page_ranges: Optional[List[Tuple[int, int]]] = None,
+) -> str:
+    """
+    Convert ``filename`` to layout text and return the path of the text.
+    Only ``page_ranges`` are converted when given. Output lives in the text
+    cache, keyed by the PDF's SHA-256 (computed here unless given), the pages
+    and the converter settings, so each distinct conversion runs once.
+    """
+    if not os.path.isfile(filename):
+        raise FileNotFoundError(f"Input file not found: {filename}")
+
+    pool = get_converter_pool()
+    cache = get_text_cache()
+    options = pool.cache_options
+    if page_ranges:
+        options += tuple(f"pages={first}-{last}" for first, last in page_ranges)
+        convert = partial(pool.convert_ranges, filename, ranges=page_ranges)
+    else:
+        convert = partial(pool.convert, filename)
+
+    key = cache.key(content_sha256 or _hash_file(filename), options)
+    return str(cache.get_or_create(key, convert))
+
+
+def _text_path_for_extraction(
+    filename: str,
+    content_sha256: Optional[str] = None,
+    section_pages: Optional[Dict[str, List[int]]] = None,
+) -> str:
+    # A PDF that cannot be converted is read as text, like any other file.
+    if Path(filename).suffix.lower() == ".pdf":
         try:
-            txt_path = pdf_to_text(filename)
-            return Path(txt_path).read_text(encoding="utf-8", errors="ignore")
+            return pdf_to_text(filename, content_sha256, section_page_ranges(section_pages))
         except Exception:
             pass
-    return Path(filename).read_text(encoding="utf-8", errors="ignore")
+    return filename
 
 
 def _normalize(text: str) -> str:
     return text.replace("\r", "")
 
 
+_NA_AT_END_RE = re.compile(r"(?:--|\bN/?A\b|\bNone\b)$", re.IGNORECASE)
+_NA_ON_LINE_RE = re.compile(r"--|\bN/?A\b|\bNone\b", re.IGNORECASE)
+_NA_CELL_RE = re.compile(r"--|N/?A|None|-", re.IGNORECASE)
+_NUMBER_TOKEN_RE = re.compile(r"\$?\d[\d,]*")
+
+
 def _clean_number(value: str) -> Optional[int]:
     if value is None:
         return None
@@ -85,182 +556,521 @@ def _extract_number_from_line(line: str) -> Optional[int]:
     if not line:
         return None
 
-    if re.search(r"(?:--|\bN/?A\b|\bNone\b)$", line, re.IGNORECASE):
+    if _NA_AT_END_RE.search(line):
         return None
 
-    matches = re.findall(r"\$?\d[\d,]*", line)
+    matches = _NUMBER_TOKEN_RE.findall(line)
     if not matches:
         return None
 
     return _clean_number(matches[-1])
 
 
-def _find_value_on_matching_line(text: str, label_patterns) -> Optional[int]:
+C1_LABEL_PATTERNS = {
+    "men_applied": [
+        r"total\s+first-time,\s*first-year\s+men\s+who\s+applied",
+        r"\bmen\s+who\s+applied\b",
+        r"\bmale\s+applied\b",
+    ],
+    "women_applied": [
+        r"total\s+first-time,\s*first-year\s+women\s+who\s+applied",
+        r"\bwomen\s+who\s+applied\b",
+        r"\bfemale\s+applied\b",
+    ],
+    "another_gender_applied": [
+        r"total\s+first-time,\s*first-year\s+another\s+gender\s+who\s+applied",
+        r"\banother\s+gender\s+who\s+applied\b",
+        r"\bnon[- ]binary.*applied\b",
+    ],
+    "unknown_gender_applied": [
+        r"total\s+first-time,\s*first-year\s+unknown\s+gender\s+who\s+applied",
+        r"\bunknown\s+gender\s+who\s+applied\b",
+        r"\bunknown.*applied\b",
+    ],
+    "men_admitted": [
+        r"total\s+first-time,\s*first-year\s+men\s+who\s+were\s+admitted",
+        r"\bmen\s+who\s+were\s+admitted\b",
+        r"\bmale\s+admitted\b",
+    ],
+    "women_admitted": [
+        r"total\s+first-time,\s*first-year\s+women\s+who\s+were\s+admitted",
+        r"\bwomen\s+who\s+were\s+admitted\b",
+        r"\bfemale\s+admitted\b",
+    ],
+    "another_gender_admitted": [
+        r"total\s+first-time,\s*first-year\s+another\s+gender\s+who\s+were\s+admitted",
+        r"\banother\s+gender\s+who\s+were\s+admitted\b",
+        r"\bnon[- ]binary.*admitted\b",
+    ],
+    "unknown_gender_admitted": [
+        r"total\s+first-time,\s*first-year\s+unknown\s+gender\s+who\s+were\s+admitted",
+        r"\bunknown\s+gender\s+who\s+were\s+admitted\b",
+        r"\bunknown.*admitted\b",
+    ],
+}
+
+G1_LABEL_PATTERNS = {
+    "tuition_undergraduates": [
+        r"tuition\s*\(\s*undergraduates\s*\)",
+        r"\bg1\b.*tuition",
+    ],
+    "required_fees_undergraduates": [
+        r"required\s+fees:?\s*\(\s*undergraduates\s*\)",
+        r"required\s+fees.*undergraduates",
+    ],
+    "food_and_housing_on_campus_undergraduates": [
+        r"food\s+and\s+housing\s*\(\s*on-?campus\s*\):?\s*\(\s*undergraduates\s*\)",
+        r"food\s+and\s+housing.*undergraduates",
+    ],
+    "housing_only_on_campus_undergraduates": [
+        r"housing\s+only\s*\(\s*on-?campus\s*\):?\s*\(\s*undergraduates\s*\)",
+        r"housing\s+only.*undergraduates",
+    ],
+    "food_only_on_campus_meal_plan_undergraduates": [
+        r"food\s+only\s*\(\s*on-?campus\s+meal\s+plan\s*\):?\s*\(\s*undergraduates\s*\)",
+        r"food\s+only.*meal\s+plan.*undergraduates",
+    ],
+}
+
+H2_LABEL_PATTERNS = {
+    "degree_seeking_undergraduate_students": [
+        r"^a\.?\s+number\s+of\s+degree-?seeking\s+undergraduate\s+students",
+        r"number\s+of\s+degree-?seeking\s+undergraduate\s+students",
+    ],
+    "applied_for_need_based_financial_aid": [
+        r"^b\.?\s+number\s+of\s+students\s+in\s+line\s+a\s+who\s+applied\s+for\s+need-?\s*based\s+financial\s+aid",
+        r"applied\s+for\s+need-?\s*based\s+financial\s+aid",
+    ],
+    "determined_to_have_financial_need": [
+        r"^c\.?\s+number\s+of\s+students\s+in\s+line\s+b\s+who\s+were\s+determined\s+to\s+have\s+financial\s+need",
+        r"determined\s+to\s+have\s+financial\s+need",
+    ],
+    "awarded_any_financial_aid": [
+        r"^d\.?\s+number\s+of\s+students\s+in\s+line\s+c\s+who\s+were\s+awarded\s+any\s+financial\s+aid",
+        r"awarded\s+any\s+financial\s+aid",
+    ],
+    "average_financial_aid_package": [
+        r"^j\.?\s+the\s+average\s+financial\s+aid\s+package\s+of\s+those\s+in\s+line\s+d",
+        r"average\s+financial\s+aid\s+package",
+    ],
+}
+
+FIELD_LABEL_PATTERNS = {**G1_LABEL_PATTERNS, **H2_LABEL_PATTERNS}
+
+
+_UNRESOLVED = object()
+_UNSEEN = object()
+
+
+def _resolve_value(line: str, following: Iterable[str]) -> object:
     """
-    Find a line matching one of the label patterns and extract the value
-    from THAT line only.
+    Resolve the value for a label found on ``line``: the last number on it,
+    else the first value on one of the ``following`` lines, which yields the
+    lines after it up to the lookahead and is only consumed when ``line``
+    itself holds no value. Returns the value (possibly None for an explicit
+    N/A cell) or ``_UNRESOLVED`` when the search for that pattern should
+    continue on later lines.
     """
-    if isinstance(label_patterns, str):
-        label_patterns = [label_patterns]
+    value = _extract_number_from_line(line)
+    if value is not None:
+        return value
+    if _NA_ON_LINE_RE.search(line):
+        return None
 
-    lines = _normalize(text).split("\n")
+    for nxt in following:
+        nxt = nxt.strip()
+        value = _extract_number_from_line(nxt)
+        if value is not None:
+            return value
+        if _NA_CELL_RE.fullmatch(nxt):
+            return None
+    return _UNRESOLVED
 
-    for pattern in label_patterns:
-        regex = re.compile(pattern, re.IGNORECASE)
-        for line in lines:
-            if regex.search(line):
-                value = _extract_number_from_line(line)
-                if value is not None:
-                    return value
-                if re.search(r"--|\bN/?A\b|\bNone\b", line, re.IGNORECASE):
-                    return None
-    return None
 
+def _required_literal(pattern: str) -> Optional[str]:
+    """
+    Return the longest run of letters that every match of ``pattern`` must
+    contain, lowercased, or None when no such run can be derived safely
+    (alternations and groups are not analysed).
+    """
+    stripped = re.sub(r"\\.", " ", pattern)
+    stripped = re.sub(r"\[[^\]]*\]", " ", stripped)
+    if "|" in stripped or "(" in stripped:
+        return None
+
+    runs = []
+    for match in re.finditer(r"[A-Za-z]+", stripped):
+        run = match.group(0)
+        if stripped[match.end() : match.end() + 1] in ("?", "*", "{"):
+            run = run[:-1]
+        if run:
+            runs.append(run)
+    return max(runs, key=len).lower() if runs else None
+
+
+class LineBuffer:
+    """
+    One or more documents, normalized and lowercased into a single string.
+
+    Document ``d`` owns characters ``offsets[d]`` up to ``offsets[d + 1]``,
+    so a search over the whole buffer can still stop at document boundaries.
+    Lines are sliced out only when a label may be on them, so the buffer is
+    the one normalized copy of the text. Texts are consumed one at a time
+    from any iterable.
+    """
+
+    def __init__(self, texts: Iterable[str]):
+        parts = []
+        self.offsets = [0]
+        for text in texts:
+            # Lowered first: replace() hands back the same string when there
+            # is no carriage return, so only one copy is made.
+            text = _normalize(text.lower())
+            parts.append(text)
+            self.offsets.append(self.offsets[-1] + len(text) + 1)
+        self.text = "\n".join(parts)
+        self._section_ranges = {}
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def documents(self) -> Iterable[Tuple[int, int]]:
+        return zip(self.offsets, self.offsets[1:])
+
+    def line_starts(self) -> List[int]:
+        return [0, *(match.end() for match in re.finditer("\n", self.text))]
+
+    def line_at(self, start: int, end: int) -> str:
+        stop = self.text.find("\n", start, end)
+        return self.text[start : stop if stop != -1 else end]
+
+    def lines_after(self, start: int, end: int, count: int) -> Iterator[str]:
+        """Up to ``count`` lines following the one at ``start``, stopping at ``end``."""
+        text = self.text
+        for _ in range(count):
+            start = text.find("\n", start, end) + 1
+            if not 0 < start < end:
+                return
+            yield self.line_at(start, end)
+
+    def section_ranges(self, start: int, end: int, current: Optional[str] = None) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        Character ranges of each target section between ``start`` and
+        ``end``: from a header line up to the next header of any section.
+        ``current`` is a section already open at ``start``.
+        """
+        key = (start, end, current)
+        if key in self._section_ranges:
+            return self._section_ranges[key]
 
-def _find_value_on_line_or_next_lines(text: str, label_patterns, lookahead: int = 2) -> Optional[int]:
+        text = self.text
+
+        def section_end(position: int) -> int:
+            match = _ANY_SECTION_HEADER_RE.search(text, position, end)
+            return match.start() if match else end
+
+        ranges = {}
+        if current is not None:
+            ranges[current] = [(start, section_end(start))]
+        # Target headers are found by substring search; a regex over every
+        # line start costs more than the matching itself.
+        for section in TARGET_SECTIONS:
+            literal = section.lower()
+            position = text.find(literal, start, end)
+            while position != -1:
+                line_start = max(text.rfind("\n", start, position) + 1, start)
+                line_end = text.find("\n", position, end)
+                header = _ANY_SECTION_HEADER_RE.match(text, line_start, end)
+                if header and header.group(1).lower() == literal:
+                    close = section_end(line_end + 1) if line_end != -1 else end
+                    ranges.setdefault(section, []).append((line_start, close))
+                position = text.find(literal, line_end + 1, end) if line_end != -1 else -1
+        for section_ranges in ranges.values():
+            section_ranges.sort()
+        self._section_ranges[key] = ranges
+        return ranges
+
+    def lines_containing(self, keywords: Iterable[str]) -> List[int]:
+        """
+        Sorted start positions of the lines containing any of ``keywords``,
+        found with substring searches over the whole buffer rather than a
+        check per line.
+        """
+        text = self.text
+        found = set()
+        for keyword in keywords:
+            position = text.find(keyword)
+            while position != -1:
+                found.add(text.rfind("\n", 0, position) + 1)
+                # One hit per line is enough; resume at the next line.
+                stop = text.find("\n", position)
+                if stop == -1:
+                    break
+                position = text.find(keyword, stop + 1)
+        return sorted(found)
+
+
+class FieldScan:
+    """The best value found so far for each field of one document."""
+
+    def __init__(self, matcher: "FieldMatcher"):
+        self.patterns = matcher.patterns
+        self.result = dict.fromkeys(matcher.fields)
+        # Index of the best (lowest) pattern that has resolved for each field;
+        # only patterns ranked above it can still change the answer.
+        self.best = {key: len(patterns) for key, patterns in matcher.patterns.items()}
+        self.pending = list(matcher.fields)
+
+    @property
+    def done(self) -> bool:
+        return not self.pending
+
+    def feed(self, line: str, following: Iterable[str]) -> bool:
+        """
+        Match one lowered line, with ``following`` yielding the lines after
+        it. Returns True once no later line can change the result.
+        """
+        value = _UNSEEN
+        for key in self.pending:
+            for rank, (regex, literal) in enumerate(self.patterns[key][: self.best[key]]):
+                if literal is not None and literal not in line:
+                    continue
+                if not regex.search(line):
+                    continue
+                if value is _UNSEEN:
+                    value = _resolve_value(line, following)
+                if value is _UNRESOLVED:
+                    continue
+                self.result[key] = value
+                self.best[key] = rank
+                break
+
+        self.pending = [key for key in self.pending if self.best[key] > 0]
+        return not self.pending
+
+
+class FieldMatcher:
+    """
+    All label patterns for a set of fields, compiled once.
+
+    Each pattern is paired with a literal keyword it cannot match without,
+    so only lines containing one of the keywords are looked at; those are
+    checked against the individual patterns in priority order. Each field
+    takes its value from the highest-priority pattern that resolves anywhere,
+    as a separate search per pattern would, but the text is only walked
+    once. Lines are matched lowercased.
+
+    With a ``section``, only lines from one of that section's headers up to
+    the next header of any section are looked at, so the same labels
+    elsewhere (a prior-year table, a loose pattern far down the document)
+    cannot supply values. A document without the section's header is
+    searched in full.
+    """
+
+    def __init__(self, label_patterns: Dict[str, List[str]], lookahead: int = 2, section: Optional[str] = None):
+        self.lookahead = lookahead
+        self.section = section
+        self.fields = list(label_patterns)
+        self.patterns = {
+            key: [(re.compile(pattern, re.IGNORECASE), _required_literal(pattern)) for pattern in patterns]
+            for key, patterns in label_patterns.items()
+        }
+        literals = {literal for patterns in self.patterns.values() for _, literal in patterns}
+        self.match_all_lines = None in literals
+        self.keywords = sorted(literals - {None})
+
+    def candidates(self, buffer: LineBuffer) -> List[int]:
+        if self.match_all_lines:
+            return buffer.line_starts()
+        return buffer.lines_containing(self.keywords)
+
+    def scan_lines(self, scan: FieldScan, buffer: LineBuffer, positions: Iterable[int], end: int) -> bool:
+        """Feed ``scan`` the lines starting at ``positions``; True once it is done."""
+        for position in positions:
+            following = buffer.lines_after(position, end, self.lookahead)
+            if scan.feed(buffer.line_at(position, end), following):
+                return True
+        return False
+
+    def match_buffer(self, buffer: LineBuffer) -> List[Dict[str, Optional[int]]]:
+        """Match every document in ``buffer``, returning one result per document."""
+        candidates = self.candidates(buffer)
+        results = []
+        for start, end in buffer.documents():
+            positions = candidates[bisect_left(candidates, start) : bisect_left(candidates, end)]
+            ranges = buffer.section_ranges(start, end).get(self.section)
+            scan = FieldScan(self)
+            self.scan_lines(scan, buffer, _within(positions, ranges) if ranges else positions, end)
+            results.append(scan.result)
+        return results
+
+    def match(self, text: str) -> Dict[str, Optional[int]]:
+        return self.match_buffer(LineBuffer([text]))[0]
+
+
+def _read_chunks(filename: str, chunk_chars: int, lookahead: int) -> Iterator[Tuple[LineBuffer, int, int]]:
     """
-    For cases where PDF text rendering may put the label on one line and the
-    value on the next line(s). First try the matched line itself, then a small
-    lookahead.
+    Read a text file in chunks of about ``chunk_chars`` characters, yielding
+    ``(buffer, limit, end)`` for each. Lines starting before ``limit`` have
+    their full lookahead in the buffer; the rest are carried over into the
+    next chunk. ``end`` bounds the lookahead.
     """
-    if isinstance(label_patterns, str):
-        label_patterns = [label_patterns]
+    carry = ""
+    with open(filename, encoding="utf-8", errors="ignore") as f:
+        while True:
+            with phase("normalize"):
+                block = f.read(chunk_chars)
+                buffer = LineBuffer([carry + block])
+            end = limit = len(buffer.text)
+            if not block:
+                yield buffer, limit, end
+                return
 
-    lines = _normalize(text).split("\n")
+            for _ in range(lookahead + 1):
+                limit = buffer.text.rfind("\n", 0, limit)
+                if limit == -1:
+                    break
+            limit += 1
+            yield buffer, limit, end
+            carry = buffer.text[limit:]
 
-    for pattern in label_patterns:
-        regex = re.compile(pattern, re.IGNORECASE)
-        for i, line in enumerate(lines):
-            if regex.search(line):
-                value = _extract_number_from_line(line)
-                if value is not None:
-                    return value
-                if re.search(r"--|\bN/?A\b|\bNone\b", line, re.IGNORECASE):
-                    return None
 
-                for j in range(1, lookahead + 1):
-                    if i + j < len(lines):
-                        nxt = lines[i + j].strip()
-                        value = _extract_number_from_line(nxt)
-                        if value is not None:
-                            return value
-                        if re.fullmatch(r"--|N/?A|None|-", nxt, re.IGNORECASE):
-                            return None
+def _within(positions: Iterable[int], ranges: List[Tuple[int, int]]) -> Iterator[int]:
+    starts = [start for start, _ in ranges]
+    for position in positions:
+        index = bisect_right(starts, position) - 1
+        if index >= 0 and position < ranges[index][1]:
+            yield position
+
+
+def _section_open_at(ranges: Dict[str, List[Tuple[int, int]]], position: int) -> Optional[str]:
+    for section, section_ranges in ranges.items():
+        if any(start < position < end for start, end in section_ranges):
+            return section
     return None
 
 
-def _extract_c1_table(text: str) -> Dict[str, Optional[int]]:
-    result = {
-        "men_applied": None,
-        "women_applied": None,
-        "another_gender_applied": None,
-        "unknown_gender_applied": None,
-        "men_admitted": None,
-        "women_admitted": None,
-        "another_gender_admitted": None,
-        "unknown_gender_admitted": None,
-    }
-
-    label_map = {
-        "men_applied": [
-            r"total\s+first-time,\s*first-year\s+men\s+who\s+applied",
-            r"\bmen\s+who\s+applied\b",
-            r"\bmale\s+applied\b",
-        ],
-        "women_applied": [
-            r"total\s+first-time,\s*first-year\s+women\s+who\s+applied",
-            r"\bwomen\s+who\s+applied\b",
-            r"\bfemale\s+applied\b",
-        ],
-        "another_gender_applied": [
-            r"total\s+first-time,\s*first-year\s+another\s+gender\s+who\s+applied",
-            r"\banother\s+gender\s+who\s+applied\b",
-            r"\bnon[- ]binary.*applied\b",
-        ],
-        "unknown_gender_applied": [
-            r"total\s+first-time,\s*first-year\s+unknown\s+gender\s+who\s+applied",
-            r"\bunknown\s+gender\s+who\s+applied\b",
-            r"\bunknown.*applied\b",
-        ],
-        "men_admitted": [
-            r"total\s+first-time,\s*first-year\s+men\s+who\s+were\s+admitted",
-            r"\bmen\s+who\s+were\s+admitted\b",
-            r"\bmale\s+admitted\b",
-        ],
-        "women_admitted": [
-            r"total\s+first-time,\s*first-year\s+women\s+who\s+were\s+admitted",
-            r"\bwomen\s+who\s+were\s+admitted\b",
-            r"\bfemale\s+admitted\b",
-        ],
-        "another_gender_admitted": [
-            r"total\s+first-time,\s*first-year\s+another\s+gender\s+who\s+were\s+admitted",
-            r"\banother\s+gender\s+who\s+were\s+admitted\b",
-            r"\bnon[- ]binary.*admitted\b",
-        ],
-        "unknown_gender_admitted": [
-            r"total\s+first-time,\s*first-year\s+unknown\s+gender\s+who\s+were\s+admitted",
-            r"\bunknown\s+gender\s+who\s+were\s+admitted\b",
-            r"\bunknown.*admitted\b",
-        ],
-    }
-
-    for key, patterns in label_map.items():
-        result[key] = _find_value_on_line_or_next_lines(text, patterns, lookahead=2)
-
-    return result
-
-
-def extract_fields_from_file(filename: str) -> Dict[str, Optional[int]]:
-    text = _read_text_for_extraction(filename)
-    text = _normalize(text)
-    data = dict(EXPECTED_FIELDS)
-
-    data.update(_extract_c1_table(text))
-
-    label_patterns = {
-        "tuition_undergraduates": [
-            r"tuition\s*\(\s*undergraduates\s*\)",
-            r"\bg1\b.*tuition",
-        ],
-        "required_fees_undergraduates": [
-            r"required\s+fees:?\s*\(\s*undergraduates\s*\)",
-            r"required\s+fees.*undergraduates",
-        ],
-        "food_and_housing_on_campus_undergraduates": [
-            r"food\s+and\s+housing\s*\(\s*on-?campus\s*\):?\s*\(\s*undergraduates\s*\)",
-            r"food\s+and\s+housing.*undergraduates",
-        ],
-        "housing_only_on_campus_undergraduates": [
-            r"housing\s+only\s*\(\s*on-?campus\s*\):?\s*\(\s*undergraduates\s*\)",
-            r"housing\s+only.*undergraduates",
-        ],
-        "food_only_on_campus_meal_plan_undergraduates": [
-            r"food\s+only\s*\(\s*on-?campus\s+meal\s+plan\s*\):?\s*\(\s*undergraduates\s*\)",
-            r"food\s+only.*meal\s+plan.*undergraduates",
-        ],
-        "degree_seeking_undergraduate_students": [
-            r"^a\.?\s+number\s+of\s+degree-?seeking\s+undergraduate\s+students",
-            r"number\s+of\s+degree-?seeking\s+undergraduate\s+students",
-        ],
-        "applied_for_need_based_financial_aid": [
-            r"^b\.?\s+number\s+of\s+students\s+in\s+line\s+a\s+who\s+applied\s+for\s+need-?\s*based\s+financial\s+aid",
-            r"applied\s+for\s+need-?\s*based\s+financial\s+aid",
-        ],
-        "determined_to_have_financial_need": [
-            r"^c\.?\s+number\s+of\s+students\s+in\s+line\s+b\s+who\s+were\s+determined\s+to\s+have\s+financial\s+need",
-            r"determined\s+to\s+have\s+financial\s+need",
-        ],
-        "awarded_any_financial_aid": [
-            r"^d\.?\s+number\s+of\s+students\s+in\s+line\s+c\s+who\s+were\s+awarded\s+any\s+financial\s+aid",
-            r"awarded\s+any\s+financial\s+aid",
-        ],
-        "average_financial_aid_package": [
-            r"^j\.?\s+the\s+average\s+financial\s+aid\s+package\s+of\s+those\s+in\s+line\s+d",
-            r"average\s+financial\s+aid\s+package",
-        ],
-    }
-
-    for key, patterns in label_patterns.items():
-        data[key] = _find_value_on_line_or_next_lines(text, patterns, lookahead=2)
-
-    return data
+def match_file(
+    matchers: Sequence[FieldMatcher], filename: str, chunk_chars: int = DEFAULT_STREAM_CHUNK_CHARS
+) -> List[Dict[str, Optional[int]]]:
+    """
+    Match a text file with each of ``matchers``, reading it in chunks of
+    about ``chunk_chars`` characters and stopping as soon as every section
+    is settled. Only the current chunk is held, so memory does not grow
+    with the file. Whether a section's header is missing is only known at
+    the end, so the file is read a second time for those sections. Reading
+    is timed as the "normalize" phase and each matcher as its section.
+    """
+    lookahead = max(matcher.lookahead for matcher in matchers)
+    scans = [FieldScan(matcher) for matcher in matchers]
+    found = [matcher.section is None for matcher in matchers]
+    current = None
+    for buffer, limit, end in _read_chunks(filename, chunk_chars, lookahead):
+        with phase("normalize"):
+            ranges = buffer.section_ranges(0, end, current)
+        for index, (matcher, scan) in enumerate(zip(matchers, scans)):
+            section_ranges = ranges.get(matcher.section)
+            # A header past the limit may be cut off at the chunk edge ("H2"
+            # of "H2A"); it is read again whole with the next chunk.
+            found[index] = found[index] or any(start < limit for start, _ in section_ranges or ())
+            if scan.done or not (matcher.section is None or section_ranges):
+                continue
+            with phase(matcher.section.lower()):
+                candidates = matcher.candidates(buffer)
+                positions = candidates[: bisect_left(candidates, limit)]
+                matcher.scan_lines(
+                    scan, buffer, _within(positions, section_ranges) if section_ranges else positions, end
+                )
+        if limit:
+            # A section still open at the limit continues into the next chunk.
+            current = _section_open_at(ranges, limit)
+        if all(scan.done for scan in scans):
+            break
+
+    absent = [index for index, seen in enumerate(found) if not seen]
+    if absent:
+        for index in absent:
+            scans[index] = FieldScan(matchers[index])
+        for buffer, limit, end in _read_chunks(filename, chunk_chars, lookahead):
+            for index in absent:
+                if not scans[index].done:
+                    with phase(matchers[index].section.lower()):
+                        candidates = matchers[index].candidates(buffer)
+                        positions = candidates[: bisect_left(candidates, limit)]
+                        matchers[index].scan_lines(scans[index], buffer, positions, end)
+            if all(scans[index].done for index in absent):
+                break
+    return [scan.result for scan in scans]
+
+
+C1_MATCHER = FieldMatcher(C1_LABEL_PATTERNS, section="C1")
+G1_MATCHER = FieldMatcher(G1_LABEL_PATTERNS, section="G1")
+H2_MATCHER = FieldMatcher(H2_LABEL_PATTERNS, section="H2")
+SECTION_MATCHERS = (C1_MATCHER, G1_MATCHER, H2_MATCHER)
+
+
+def _extract_fields_from_buffer(buffer: LineBuffer) -> List[Dict[str, Optional[int]]]:
+    results = [dict(EXPECTED_FIELDS) for _ in range(len(buffer))]
+    for matcher in SECTION_MATCHERS:
+        with phase(matcher.section.lower()):
+            for result, fields in zip(results, matcher.match_buffer(buffer)):
+                result.update(fields)
+    return results
+
+
+def extract_fields_from_text(text: str) -> Dict[str, Optional[int]]:
+    with phase("normalize"):
+        buffer = LineBuffer([text])
+    return _extract_fields_from_buffer(buffer)[0]
+
+
+def _locate_text(
+    filename: str,
+    content_sha256: Optional[str] = None,
+    section_pages: Optional[Dict[str, List[int]]] = None,
+) -> Tuple[str, Optional[Dict[str, List[int]]]]:
+    with phase("convert"):
+        if section_pages is None and Path(filename).suffix.lower() == ".pdf":
+            try:
+                section_pages = locate_section_pages(filename, content_sha256)
+            except Exception:
+                section_pages = None
+
+        return _text_path_for_extraction(filename, content_sha256, section_pages), section_pages
+
+
+def extract_fields_and_sections(
+    filename: str,
+    content_sha256: Optional[str] = None,
+    section_pages: Optional[Dict[str, List[int]]] = None,
+) -> Tuple[Dict[str, Optional[int]], Optional[Dict[str, List[int]]]]:
+    """
+    Extract fields, converting only the pages holding the C1, G1 and H2
+    sections of a PDF. ``section_pages`` is the map from an earlier
+    ``locate_section_pages`` call; it is located here when not given and
+    returned so the caller can store it.
+
+    The text is read in chunks and reading stops once every field is settled,
+    so memory stays flat however large the document is.
+    """
+    text_path, section_pages = _locate_text(filename, content_sha256, section_pages)
+    try:
+        results = match_file(SECTION_MATCHERS, text_path)
+    except FileNotFoundError:
+        if text_path == filename:
+            raise
+        # The cached text was evicted before it was opened: convert again.
+        text_path, section_pages = _locate_text(filename, content_sha256, section_pages)
+        results = match_file(SECTION_MATCHERS, text_path)
+    fields = dict(EXPECTED_FIELDS)
+    for section_fields in results:
+        fields.update(section_fields)
+    return fields, section_pages
+
+
+def extract_fields_from_file(
+    filename: str,
+    content_sha256: Optional[str] = None,
+    section_pages: Optional[Dict[str, List[int]]] = None,
+) -> Dict[str, Optional[int]]:
+    return extract_fields_and_sections(filename, content_sha256, section_pages)[0]
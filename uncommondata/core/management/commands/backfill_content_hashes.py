@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
+
+from core.models import Upload
+
+
+class Command(BaseCommand):
+    help = 'Fill Upload.content_sha256 for rows saved before the column existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows read from the database per query',
+        )
+
+    def handle(self, *args, **options):
+        pending = Upload.objects.filter(content_sha256__isnull=True).only('id', 'file')
+
+        filled = missing = duplicates = 0
+        for upload in pending.iterator(chunk_size=options['batch_size']):
+            try:
+                digest = Upload.hash_uploaded_file(upload.file)
+            except (OSError, ValueError) as exc:
+                missing += 1
+                self.stderr.write(f'  Could not read {upload.id}: {exc}')
+                continue
+            finally:
+                upload.file.close()
+
+            try:
+                with transaction.atomic():
+                    Upload.objects.filter(pk=upload.pk).update(content_sha256=digest)
+            except IntegrityError:
+                duplicates += 1
+                self.stderr.write(f'  {upload.id} has the same content as another upload ({digest})')
+                continue
+            filled += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Filled {filled} content hashes ({missing} unreadable, {duplicates} duplicates)'
+            )
+        )
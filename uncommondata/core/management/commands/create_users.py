@@ -0,0 +1,50 @@
+import csv
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.provisioning import provision_users
+
+
+class Command(BaseCommand):
+    help = (
+        'Create users in bulk from a CSV file with email, user_name, password and '
+        'optional is_curator columns, as for /app/api/createUsers/'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='CSV file with a header row')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.USER_PROVISIONING_WORKERS,
+            help='Password hashing threads (default: USER_PROVISIONING_WORKERS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.USER_PROVISIONING_MAX_USERS,
+            help='Rows checked and inserted per transaction',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['csv_file'], newline='') as f:
+                rows = list(csv.DictReader(f))
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        created = failed = 0
+        batch_size = max(1, options['batch_size'])
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start : start + batch_size]
+            for line, (row, (user, error)) in enumerate(
+                zip(batch, provision_users(batch, max(1, options['workers']))), start=start + 2
+            ):
+                if error:
+                    failed += 1
+                    self.stderr.write(f'  Line {line} ({row.get("user_name") or "?"}): {error}')
+                else:
+                    created += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Created {created} users ({failed} failed)'))
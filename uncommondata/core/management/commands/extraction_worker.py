@@ -0,0 +1,142 @@
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.extraction import extract_fields_and_sections
+from core.models import ExtractionJob
+from core.processing import claim_jobs, finish_job, requeue_stale_jobs
+
+
+def discard_pool(pool):
+    # ProcessPoolExecutor cannot stop a busy worker, so a pool with a hung
+    # extraction is only released by terminating its processes.
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+class Command(BaseCommand):
+    help = 'Run queued extraction jobs on a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=settings.EXTRACTION_WORKER_PROCESSES,
+            help='Number of extraction processes (default: EXTRACTION_WORKER_PROCESSES)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Jobs claimed per round (default: twice the number of processes)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait when the queue is empty',
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=600,
+            help='Requeue jobs that have been running for more than this many seconds, checked every minute',
+        )
+        parser.add_argument(
+            '--job-timeout',
+            type=float,
+            default=settings.EXTRACTION_JOB_TIMEOUT,
+            help='Seconds one job may run before its processes are restarted (default: EXTRACTION_JOB_TIMEOUT)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of polling',
+        )
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        batch_size = options['batch_size'] or processes * 2
+        stale_after = timedelta(seconds=options['stale_after'])
+        requeue_every = min(60, options['stale_after'])
+
+        self.stdout.write(f'Extraction worker started with {processes} processes')
+        pool = ProcessPoolExecutor(max_workers=processes)
+        next_requeue = 0.0
+        try:
+            while True:
+                close_old_connections()
+                if time.monotonic() >= next_requeue:
+                    requeued = requeue_stale_jobs(stale_after)
+                    if requeued:
+                        self.stdout.write(f'Requeued {requeued} stale jobs')
+                    next_requeue = time.monotonic() + requeue_every
+
+                jobs = claim_jobs(batch_size)
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                if not self.run_jobs(pool, jobs, processes, options['job_timeout']):
+                    self.stderr.write('  Restarting extraction processes')
+                    discard_pool(pool)
+                    pool = ProcessPoolExecutor(max_workers=processes)
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+        self.stdout.write(self.style.SUCCESS('Extraction queue is empty'))
+
+    def run_jobs(self, pool, jobs, processes, job_timeout):
+        """
+        Run one claimed batch and record every job's outcome. Returns False
+        when the pool has to be replaced: a process died or a job overran
+        its time, so the jobs it held are put back in the queue.
+        """
+        futures = []
+        for job in jobs:
+            try:
+                future = pool.submit(
+                    extract_fields_and_sections,
+                    job.upload.file.path,
+                    job.upload.content_sha256,
+                    job.upload.section_pages,
+                )
+            except BrokenProcessPool:
+                future = None
+            futures.append((job, future))
+
+        # The pool works through the batch `processes` jobs at a time.
+        deadline = time.monotonic() + job_timeout * math.ceil(len(jobs) / processes)
+        healthy = True
+        for job, future in futures:
+            try:
+                if future is None:
+                    raise BrokenProcessPool('extraction process pool is broken')
+                fields, section_pages = future.result(timeout=max(0, deadline - time.monotonic()))
+            except (BrokenProcessPool, FutureTimeoutError) as exc:
+                healthy = False
+                error = str(exc) or f'extraction did not finish within {job_timeout:g} seconds'
+                state = finish_job(job, error=error)
+            except Exception as exc:
+                error = str(exc)
+                state = finish_job(job, error=error)
+            else:
+                finish_job(job, fields=fields, section_pages=section_pages)
+                self.stdout.write(f'  Extracted {job.upload_id}')
+                continue
+
+            if state == ExtractionJob.QUEUED:
+                self.stderr.write(f'  Requeued {job.upload_id} after attempt {job.attempts}: {error}')
+            else:
+                self.stderr.write(f'  Failed {job.upload_id}: {error}')
+        return healthy
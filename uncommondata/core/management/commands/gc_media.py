@@ -0,0 +1,92 @@
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.storage import content_addressed_storage
+
+
+def iter_media_files(root: Path, directory: str, min_age: float):
+    """
+    Yield the storage name, relative to ``root``, of each file under
+    ``root / directory`` older than ``min_age`` seconds.
+    """
+    cutoff = time.time() - min_age
+    for dirpath, _dirnames, filenames in os.walk(root / directory):
+        for filename in filenames:
+            path = Path(dirpath) / filename
+            try:
+                if path.stat().st_mtime > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            yield path.relative_to(root).as_posix()
+
+
+class Command(BaseCommand):
+    help = 'Delete files under MEDIA_ROOT/uploads that no upload references'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List unreferenced files without deleting them',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Files checked against the database per query',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=3600,
+            help='Skip files modified in the last N seconds, which may belong to uploads in flight',
+        )
+
+    def handle(self, *args, **options):
+        root = Path(settings.MEDIA_ROOT)
+        dry_run = options['dry_run']
+
+        scanned = removed = freed = 0
+        batch = []
+
+        def flush():
+            nonlocal removed, freed
+            counts = content_addressed_storage.reference_counts(batch)
+            for name, references in counts.items():
+                if references:
+                    continue
+                size = content_addressed_storage.size(name)
+                if dry_run:
+                    self.stdout.write(f'  Would remove {name} ({size} bytes)')
+                else:
+                    content_addressed_storage.delete(name)
+                removed += 1
+                freed += size
+            batch.clear()
+
+        # Only the uploads directory belongs to the upload storage; anything
+        # else under MEDIA_ROOT is never an Upload.file and must be left alone.
+        for name in iter_media_files(root, 'uploads', options['min_age']):
+            scanned += 1
+            batch.append(name)
+            if len(batch) >= options['batch_size']:
+                flush()
+        if batch:
+            flush()
+
+        if not dry_run:
+            for dirpath, _dirnames, _filenames in os.walk(root / 'uploads', topdown=False):
+                try:
+                    os.rmdir(dirpath)
+                except OSError:
+                    pass
+
+        action = 'Would remove' if dry_run else 'Removed'
+        self.stdout.write(
+            self.style.SUCCESS(f'{action} {removed} of {scanned} files ({freed} bytes)')
+        )
@@ -0,0 +1,120 @@
+import hashlib
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Upload, UserProfile
+from core.storage import content_addressed_name, content_addressed_storage
+from core.synthetic import generate_document
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic CDS documents and bulk-create users and uploads for them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000, help='Number of documents to generate')
+        parser.add_argument('--users', type=int, default=10, help='Number of harvester accounts owning them')
+        parser.add_argument('--institutions', type=int, default=500, help='Number of distinct institutions')
+        parser.add_argument('--seed', type=int, default=0, help='Seed; the same seed produces the same documents')
+        parser.add_argument('--pages', type=int, default=10, help='Noise pages per document')
+        parser.add_argument('--lines-per-page', type=int, default=50, help='Lines per noise page')
+        parser.add_argument(
+            '--wrap-rate',
+            type=float,
+            default=0.2,
+            help='Share of rows whose value is wrapped onto the next line',
+        )
+        parser.add_argument(
+            '--missing-rate',
+            type=float,
+            default=0.1,
+            help='Share of values replaced by a --/N/A cell',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Uploads inserted per transaction',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        started = time.monotonic()
+
+        users = self.create_users(options['users'])
+        institutions = [f'Synthetic College {n:05d}' for n in range(options['institutions'])]
+        years = ['2021-2022', '2022-2023', '2023-2024', '2024-2025']
+
+        created = written = 0
+        batch = []
+        for _ in range(options['count']):
+            year = rng.choice(years)
+            document = generate_document(
+                rng,
+                pages=options['pages'],
+                lines_per_page=options['lines_per_page'],
+                wrap_rate=options['wrap_rate'],
+                missing_rate=options['missing_rate'],
+                year=year,
+            )
+            content = document.text.encode()
+            digest = hashlib.sha256(content).hexdigest()
+            name = content_addressed_storage.save(
+                content_addressed_name(digest, 'cds.txt'), ContentFile(content, name='cds.txt')
+            )
+            written += len(content)
+            batch.append(
+                Upload(
+                    id=digest,
+                    content_sha256=digest,
+                    user=rng.choice(users),
+                    institution=rng.choice(institutions),
+                    year=year,
+                    url=f'https://example.com/cds/{digest[:12]}.pdf',
+                    file=name,
+                    original_filename='cds.txt',
+                )
+            )
+            if len(batch) >= options['batch_size']:
+                created += self.insert(batch)
+                batch = []
+        created += self.insert(batch)
+
+        elapsed = max(time.monotonic() - started, 1e-9)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Created {created} synthetic uploads for {len(users)} users in {elapsed:.1f}s '
+                f'({created / elapsed:.0f} uploads/s, {written / (1024 * 1024):.1f} MB written)'
+            )
+        )
+
+    def create_users(self, count):
+        usernames = [f'synthetic{n:04d}' for n in range(count)]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        # One hash for every account: hashing per user would dominate the run.
+        password = make_password('testpass123')
+
+        with transaction.atomic():
+            User.objects.bulk_create(
+                [User(username=username, password=password) for username in usernames if username not in existing]
+            )
+            users = list(User.objects.filter(username__in=usernames))
+            # bulk_create skips the post_save signal that creates profiles.
+            UserProfile.objects.bulk_create(
+                [UserProfile(user=user) for user in users if user.username not in existing],
+                ignore_conflicts=True,
+            )
+        return sorted(users, key=lambda user: user.username)
+
+    def insert(self, batch):
+        if not batch:
+            return 0
+        known = set(Upload.objects.filter(pk__in=[upload.id for upload in batch]).values_list('pk', flat=True))
+        with transaction.atomic():
+            Upload.objects.bulk_create([upload for upload in batch if upload.id not in known], ignore_conflicts=True)
+        return len(batch) - len(known)
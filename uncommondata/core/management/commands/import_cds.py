@@ -0,0 +1,212 @@
+import csv
+import hashlib
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from core.extraction import EXTRACTOR_VERSION
+from core.models import ExtractionJob, Upload
+from core.storage import content_addressed_name, content_addressed_storage
+
+ImportEntry = namedtuple('ImportEntry', ['path', 'institution', 'year', 'url'])
+
+
+def iter_directory(root: Path, institution=None, year=None):
+    """
+    Yield an entry for each file under ``root``. Files laid out as
+    <institution>/<year>/<file>, possibly in further subdirectories of the
+    year, take both from the first two directories below ``root``; files
+    nearer the top fall back to the given defaults.
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for filename in sorted(filenames):
+            if filename.startswith('.'):
+                continue
+            path = Path(dirpath) / filename
+            parts = path.relative_to(root).parts
+            if len(parts) >= 3:
+                yield ImportEntry(path, parts[0], parts[1], None)
+            else:
+                yield ImportEntry(path, institution, year, None)
+
+
+def iter_manifest(manifest: Path, institution=None, year=None):
+    """
+    Yield an entry per row of a CSV manifest with the columns institution,
+    year, url and path. Relative paths are resolved against the manifest.
+    """
+    with open(manifest, newline='') as f:
+        for row in csv.DictReader(f):
+            path = Path(row['path'])
+            if not path.is_absolute():
+                path = manifest.parent / path
+            yield ImportEntry(
+                path,
+                row.get('institution') or institution,
+                row.get('year') or year,
+                row.get('url') or None,
+            )
+
+
+def hash_path(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_path(path: Path, digest: str):
+    """Copy ``path`` into storage; returns the stored name and its size."""
+    name = content_addressed_name(digest, path.name)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        return content_addressed_storage.save(name, File(f, name=path.name)), size
+
+
+class Command(BaseCommand):
+    help = 'Import a directory tree or CSV manifest of CDS files as uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Directory to walk, or a CSV manifest (institution,year,url,path)')
+        parser.add_argument('--user', required=True, help='Username the uploads are attributed to')
+        parser.add_argument('--institution', help='Institution for files whose path or row does not name one')
+        parser.add_argument('--year', help='Year for files whose path or row does not name one')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Threads hashing and copying files',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Files hashed and inserted per transaction',
+        )
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help='Queue extraction for the imported uploads',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='File recording imported paths; files listed there are skipped on the next run',
+        )
+
+    def handle(self, *args, **options):
+        source = Path(options['source'])
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'No user named {options["user"]}')
+
+        if source.is_dir():
+            entries = iter_directory(source, options['institution'], options['year'])
+        elif source.is_file():
+            entries = iter_manifest(source, options['institution'], options['year'])
+        else:
+            raise CommandError(f'{source} does not exist')
+
+        checkpoint = Path(options['checkpoint']) if options['checkpoint'] else None
+        done = set()
+        if checkpoint and checkpoint.exists():
+            done = set(checkpoint.read_text().splitlines())
+        entries = (entry for entry in entries if str(entry.path) not in done)
+
+        self.totals = dict.fromkeys(['imported', 'known', 'failed', 'bytes'], 0)
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                batch = list(islice(entries, options['batch_size']))
+                if not batch:
+                    break
+                self.import_batch(batch, user, pool, options['enqueue'])
+                if checkpoint:
+                    with open(checkpoint, 'a') as f:
+                        f.writelines(f'{entry.path}\n' for entry in batch)
+
+        elapsed = max(time.monotonic() - started, 1e-9)
+        totals = self.totals
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Imported {totals["imported"]} uploads ({totals["known"]} already stored, '
+                f'{totals["failed"]} failed) in {elapsed:.1f}s: '
+                f'{totals["imported"] / elapsed:.1f} files/s, '
+                f'{totals["bytes"] / elapsed / (1024 * 1024):.1f} MB/s'
+            )
+        )
+
+    def import_batch(self, batch, user, pool, enqueue):
+        usable = []
+        for entry in batch:
+            if entry.institution and entry.year:
+                usable.append(entry)
+            else:
+                self.totals['failed'] += 1
+                self.stderr.write(f'  No institution/year for {entry.path}; pass --institution and --year')
+
+        digests = pool.map(lambda entry: self._try(hash_path, entry.path), usable)
+        by_digest = {}
+        for entry, digest in zip(usable, digests):
+            if digest is None:
+                self.totals['failed'] += 1
+            elif digest in by_digest:
+                self.totals['known'] += 1
+            else:
+                by_digest[digest] = entry
+
+        known = Upload.objects.filter(Q(pk__in=by_digest) | Q(content_sha256__in=by_digest))
+        for pk, content_sha256 in known.values_list('pk', 'content_sha256'):
+            for digest in (pk, content_sha256):
+                if by_digest.pop(digest, None) is not None:
+                    self.totals['known'] += 1
+
+        # Files are copied before the rows exist; anything left behind by an
+        # interrupted batch is unreferenced and removed by gc_media.
+        stored = pool.map(lambda item: self._try(store_path, item[1].path, item[0]), by_digest.items())
+        uploads = []
+        for (digest, entry), result in zip(list(by_digest.items()), stored):
+            if result is None:
+                self.totals['failed'] += 1
+                continue
+            name, size = result
+            uploads.append(
+                Upload(
+                    id=digest,
+                    content_sha256=digest,
+                    user=user,
+                    institution=entry.institution,
+                    year=entry.year,
+                    url=entry.url,
+                    file=name,
+                    original_filename=entry.path.name,
+                )
+            )
+            self.totals['bytes'] += size
+
+        with transaction.atomic():
+            Upload.objects.bulk_create(uploads, ignore_conflicts=True)
+            if enqueue:
+                ExtractionJob.objects.bulk_create(
+                    [ExtractionJob(upload_id=upload.id, extractor_version=EXTRACTOR_VERSION) for upload in uploads],
+                    ignore_conflicts=True,
+                )
+        self.totals['imported'] += len(uploads)
+
+    def _try(self, func, path, *args):
+        try:
+            return func(path, *args)
+        except OSError as exc:
+            self.stderr.write(f'  Could not read {path}: {exc}')
+            return None
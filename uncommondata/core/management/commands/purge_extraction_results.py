@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core.extraction import EXTRACTOR_VERSION
+from core.models import ExtractionResult
+
+
+class Command(BaseCommand):
+    help = 'Delete stored extraction results left behind by other extractor versions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Also delete results for the current extractor version',
+        )
+
+    def handle(self, *args, **options):
+        results = ExtractionResult.objects.all()
+        if not options['all']:
+            results = results.exclude(extractor_version=EXTRACTOR_VERSION)
+
+        deleted, _ = results.delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} extraction results'))
@@ -0,0 +1,176 @@
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import dumps
+from core.extraction import EXPECTED_FIELDS, EXTRACTOR_VERSION, extract_fields_and_sections
+from core.models import ExtractionResult, InstitutionYearSummary, Upload
+
+
+def extract_shard(documents):
+    """
+    Extract each (path, content_sha256, section_pages) document of a shard
+    in a worker process. Returns one (fields, section_pages, error) triple
+    per document; a document that fails gets only its error.
+    """
+    outcomes = []
+    for path, content_sha256, section_pages in documents:
+        try:
+            fields, section_pages = extract_fields_and_sections(path, content_sha256, section_pages)
+        except Exception as exc:
+            outcomes.append((None, None, str(exc)))
+        else:
+            outcomes.append((fields, section_pages, None))
+    return outcomes
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-run extraction for every upload without a result from the current extractor version '
+        'and summarise how the values differ from the previous version'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=settings.EXTRACTION_WORKER_PROCESSES,
+            help='Number of extraction processes (default: EXTRACTION_WORKER_PROCESSES)',
+        )
+        parser.add_argument(
+            '--shard-size',
+            type=int,
+            default=200,
+            help='Uploads extracted per task and written per transaction',
+        )
+        parser.add_argument('--since', help='Only uploads made on or after this date or datetime')
+        parser.add_argument('--institution', help='Only uploads for this institution')
+        parser.add_argument(
+            '--changed-only',
+            action='store_true',
+            help='Only uploads whose stored result is stale, from an earlier extractor version',
+        )
+        parser.add_argument(
+            '--list-changes',
+            action='store_true',
+            help='List each upload whose values changed, not just the per-field summary',
+        )
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        try:
+            uploads = dumps.filter_uploads(
+                Upload.objects.all(),
+                {'since': options['since'], 'institution': options['institution']},
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options['changed_only']:
+            # Uploads never extracted have nothing to differ from.
+            uploads = uploads.filter(
+                pk__in=ExtractionResult.objects.filter(extractor_version__lt=EXTRACTOR_VERSION).values('upload_id')
+            )
+
+        # Uploads that already have a current result were finished by an
+        # earlier run, so an interrupted run picks up where it stopped. Ids
+        # are read up front because results are written while iterating.
+        upload_ids = list(
+            uploads.exclude(extraction_results__extractor_version=EXTRACTOR_VERSION)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        total = len(upload_ids)
+        self.stdout.write(f'Re-extracting {total} uploads with extractor v{EXTRACTOR_VERSION} on {processes} processes')
+
+        self.done = self.failed = self.compared = self.changed_uploads = 0
+        self.changes = {kind: Counter() for kind in ('filled', 'cleared', 'changed')}
+        started = time.monotonic()
+
+        shard_size = options['shard_size']
+        shards = (upload_ids[i : i + shard_size] for i in range(0, total, shard_size))
+        queryset = Upload.objects.only('id', 'institution', 'year', 'file', 'content_sha256', 'section_pages')
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            running = {}
+            while True:
+                # Keep every process busy plus one shard queued for each.
+                for ids in islice(shards, processes * 2 - len(running)):
+                    shard = list(queryset.in_bulk(ids).values())
+                    future = pool.submit(
+                        extract_shard,
+                        [(upload.file.path, upload.content_sha256, upload.section_pages) for upload in shard],
+                    )
+                    running[future] = shard
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    self.store(running.pop(future), future.result(), options['list_changes'])
+                elapsed = max(time.monotonic() - started, 1e-9)
+                self.stdout.write(f'  {self.done + self.failed}/{total} uploads ({self.done / elapsed:.1f}/s)')
+
+        self.write_summary()
+
+    def store(self, shard, outcomes, list_changes):
+        results = []
+        located = []
+        for upload, (fields, section_pages, error) in zip(shard, outcomes):
+            if error is not None:
+                self.failed += 1
+                self.stderr.write(f'  Failed {upload.id}: {error}')
+                continue
+            results.append(ExtractionResult.from_fields(upload, EXTRACTOR_VERSION, fields))
+            if upload.section_pages is None and section_pages is not None:
+                upload.section_pages = section_pages
+                located.append(upload)
+
+        previous = {}
+        older = ExtractionResult.objects.filter(
+            upload_id__in=[result.upload_id for result in results],
+            extractor_version__lt=EXTRACTOR_VERSION,
+        ).order_by('extractor_version')
+        for upload_id, fields in older.values_list('upload_id', 'fields'):
+            previous[upload_id] = fields
+
+        with transaction.atomic():
+            ExtractionResult.objects.bulk_create(results, ignore_conflicts=True)
+            Upload.objects.bulk_update(located, ['section_pages'])
+            InstitutionYearSummary.objects.refresh((upload.institution, upload.year) for upload in shard)
+        self.done += len(results)
+
+        for result in results:
+            if result.upload_id not in previous:
+                continue
+            self.compared += 1
+            old = previous[result.upload_id]
+            diff = {
+                field: (old.get(field), result.fields[field])
+                for field in EXPECTED_FIELDS
+                if old.get(field) != result.fields[field]
+            }
+            for field, (before, after) in diff.items():
+                kind = 'filled' if before is None else 'cleared' if after is None else 'changed'
+                self.changes[kind][field] += 1
+            if diff:
+                self.changed_uploads += 1
+            if diff and list_changes:
+                changes = ', '.join(f'{field}: {before} -> {after}' for field, (before, after) in diff.items())
+                self.stdout.write(f'  {result.upload_id} {changes}')
+
+    def write_summary(self):
+        self.stdout.write(self.style.SUCCESS(f'Stored {self.done} results ({self.failed} failed)'))
+        if not self.compared:
+            self.stdout.write('No earlier results to compare against')
+            return
+
+        self.stdout.write(f'{self.changed_uploads} of {self.compared} uploads differ from their previous results')
+        self.stdout.write(f'  {"field":<48} {"filled":>8} {"cleared":>8} {"changed":>8}')
+        for field in EXPECTED_FIELDS:
+            counts = [self.changes[kind][field] for kind in ('filled', 'cleared', 'changed')]
+            if any(counts):
+                self.stdout.write(f'  {field:<48} ' + ' '.join(f'{count:>8}' for count in counts))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import FIELD_COLUMNS, ExtractionResult, InstitutionYearSummary, Upload
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy extracted fields saved before the typed columns existed into them, '
+        'then rebuild every institution/year summary row'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Results updated, or summary groups rebuilt, per transaction',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # Rows written before the columns were added have every column null;
+        # rows whose fields really are all null are rewritten unchanged. Ids
+        # are read up front because the rows stop matching once filled.
+        pending = list(
+            ExtractionResult.objects.filter(**{f'{column}__isnull': True for column in FIELD_COLUMNS})
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        for i in range(0, len(pending), batch_size):
+            results = ExtractionResult.objects.only('id', 'fields').in_bulk(pending[i : i + batch_size]).values()
+            for result in results:
+                for column in FIELD_COLUMNS:
+                    setattr(result, column, result.fields.get(column))
+            with transaction.atomic():
+                ExtractionResult.objects.bulk_update(results, FIELD_COLUMNS)
+
+        groups = set(Upload.objects.values_list('institution', 'year').distinct())
+        groups.update(InstitutionYearSummary.objects.values_list('institution', 'year'))
+        groups = sorted(groups)
+        for i in range(0, len(groups), batch_size):
+            InstitutionYearSummary.objects.refresh(groups[i : i + batch_size])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Filled columns for {len(pending)} results; refreshed {len(groups)} institution/year summaries'
+            )
+        )
@@ -0,0 +1,158 @@
+"""
+Per-request phase timings and rolling latency summaries.
+
+Code on the request path wraps its expensive steps in ``phase(name)``. The
+timings are only collected inside ``collect()``, which
+core.middleware.RequestTimingMiddleware opens around each request when
+REQUEST_METRICS_ENABLED is set; otherwise a phase costs one context
+variable lookup. Work handed to other threads or processes is not seen, so
+phases should wrap the point where the request thread waits for it.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+_current: ContextVar[Optional["RequestTimings"]] = ContextVar("request_timings", default=None)
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+FAMILIES = {
+    "request_seconds": "Wall time per request, by view.",
+    "request_sql_queries": "SQL queries per request, by view.",
+    "request_sql_seconds": "Time spent in SQL per request, by view.",
+    "phase_seconds": "Wall time per extraction phase within a request.",
+}
+
+
+class RequestTimings:
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+
+@contextmanager
+def collect() -> Iterator[RequestTimings]:
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+class RollingHistogram:
+    """
+    Count and sum of every observation plus the most recent ``window`` of
+    them, from which quantiles are computed when exported.
+    """
+
+    def __init__(self, window: int):
+        self._lock = threading.Lock()
+        self.recent = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.recent.append(value)
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            recent = sorted(self.recent)
+            count, total = self.count, self.sum
+        quantiles = {
+            q: recent[min(int(q * len(recent)), len(recent) - 1)] if recent else 0.0 for q in QUANTILES
+        }
+        return {"count": count, "sum": total, "quantiles": quantiles}
+
+
+class MetricsRegistry:
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], RollingHistogram] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = RollingHistogram(self.window)
+        histogram.observe(value)
+
+    def render_prometheus(
+        self, counters: Optional[Dict[str, Tuple[str, float]]] = None, prefix: str = "uncommondata_"
+    ) -> str:
+        """
+        Prometheus text exposition of every histogram, as a summary whose
+        quantiles cover the rolling window, followed by ``counters``
+        (name -> (help, value)).
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+
+        lines = []
+        described = set()
+        for (name, labels), histogram in histograms:
+            metric = prefix + name
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {metric} {FAMILIES.get(name, name)}")
+                lines.append(f"# TYPE {metric} summary")
+            snapshot = histogram.snapshot()
+            for q, value in snapshot["quantiles"].items():
+                lines.append(f"{metric}{_labels(labels + (('quantile', str(q)),))} {value:.6g}")
+            lines.append(f"{metric}_sum{_labels(labels)} {snapshot['sum']:.6g}")
+            lines.append(f"{metric}_count{_labels(labels)} {snapshot['count']}")
+
+        for name, (help_text, value) in (counters or {}).items():
+            lines.append(f"# HELP {prefix}{name} {help_text}")
+            lines.append(f"# TYPE {prefix}{name} counter")
+            lines.append(f"{prefix}{name} {value:.6g}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def server_timing(timings: RequestTimings, total: float) -> str:
+    """Server-Timing header value; durations are in milliseconds."""
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.phases.items()]
+    entries.append(f'sql;dur={timings.sql_seconds * 1000:.1f};desc="{timings.queries} queries"')
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+registry = MetricsRegistry()
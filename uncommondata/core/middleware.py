@@ -0,0 +1,56 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import metrics
+
+
+class RequestTimingMiddleware:
+    """
+    Time each request, its SQL queries and the extraction phases it runs,
+    report them in a Server-Timing header and add them to the rolling
+    summaries served to curators at /app/api/metrics/. Enabled by
+    REQUEST_METRICS_ENABLED.
+
+    Timing stops when the view returns, so the body of a streaming response
+    is not included.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        metrics.registry.window = settings.REQUEST_METRICS_WINDOW
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with metrics.collect() as timings:
+            with connection.execute_wrapper(QueryTimer(timings)):
+                response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else "unmatched"
+        metrics.registry.observe("request_seconds", total, view=view)
+        metrics.registry.observe("request_sql_queries", timings.queries, view=view)
+        metrics.registry.observe("request_sql_seconds", timings.sql_seconds, view=view)
+        for name, seconds in timings.phases.items():
+            metrics.registry.observe("phase_seconds", seconds, phase=name)
+
+        response["Server-Timing"] = metrics.server_timing(timings, total)
+        return response
+
+
+class QueryTimer:
+    def __init__(self, timings):
+        self.timings = timings
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.timings.queries += 1
+            self.timings.sql_seconds += time.perf_counter() - started
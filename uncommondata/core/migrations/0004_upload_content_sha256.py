@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_extractionjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="upload",
+            name="content_sha256",
+            field=models.CharField(
+                blank=True, editable=False, max_length=64, null=True, unique=True
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_upload_content_sha256"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="upload",
+            index=models.Index(
+                fields=["-uploaded_at", "-id"], name="upload_recent_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="upload",
+            index=models.Index(
+                fields=["institution", "year", "-uploaded_at"],
+                name="upload_institution_year_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="upload",
+            index=models.Index(fields=["year", "-uploaded_at"], name="upload_year_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="upload",
+            index=models.Index(
+                fields=["user", "-uploaded_at"], name="upload_user_recent_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:30
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_upload_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="upload",
+            name="file",
+            field=models.FileField(upload_to=core.models.upload_to_content_address),
+        ),
+    ]
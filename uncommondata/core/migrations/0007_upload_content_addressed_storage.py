@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:33
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_upload_content_addressed_file"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="upload",
+            name="file",
+            field=models.FileField(
+                storage=core.storage.ContentAddressedStorage(),
+                upload_to=core.models.upload_to_content_address,
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_upload_content_addressed_storage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="upload",
+            name="section_pages",
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,207 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_upload_section_pages"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="extractionresult",
+            name="another_gender_admitted",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="another_gender_applied",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="applied_for_need_based_financial_aid",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="average_financial_aid_package",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="awarded_any_financial_aid",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="degree_seeking_undergraduate_students",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="determined_to_have_financial_need",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="food_and_housing_on_campus_undergraduates",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="food_only_on_campus_meal_plan_undergraduates",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="housing_only_on_campus_undergraduates",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="men_admitted",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="men_applied",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="required_fees_undergraduates",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="tuition_undergraduates",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="unknown_gender_admitted",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="unknown_gender_applied",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="women_admitted",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionresult",
+            name="women_applied",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="InstitutionYearSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("men_applied", models.BigIntegerField(blank=True, null=True)),
+                ("women_applied", models.BigIntegerField(blank=True, null=True)),
+                (
+                    "another_gender_applied",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                (
+                    "unknown_gender_applied",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                ("men_admitted", models.BigIntegerField(blank=True, null=True)),
+                ("women_admitted", models.BigIntegerField(blank=True, null=True)),
+                (
+                    "another_gender_admitted",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                (
+                    "unknown_gender_admitted",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                (
+                    "tuition_undergraduates",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                (
+                    "required_fees_undergraduates",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                (
+                    "food_and_housing_on_campus_undergraduates",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                (
+                    "housing_only_on_campus_undergraduates",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                (
+                    "food_only_on_campus_meal_plan_undergraduates",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                (
+                    "degree_seeking_undergraduate_students",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                (
+                    "applied_for_need_based_financial_aid",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                (
+                    "determined_to_have_financial_need",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                (
+                    "awarded_any_financial_aid",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                (
+                    "average_financial_aid_package",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                ("institution", models.CharField(max_length=200)),
+                ("year", models.CharField(max_length=20)),
+                ("extractor_version", models.PositiveIntegerField()),
+                ("uploads", models.PositiveIntegerField(default=0)),
+                ("refreshed_at", models.DateTimeField(auto_now=True)),
+                (
+                    "upload",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="core.upload",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["extractor_version", "year"],
+                        name="summary_version_year_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("institution", "year"),
+                        name="unique_summary_per_institution_year",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,11 +1,20 @@
 import hashlib
 import os
+from collections import Counter
+from functools import reduce
+from operator import or_
+from typing import Dict, Iterable, Tuple
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from .extraction import EXTRACTOR_VERSION
+from .storage import content_addressed_name, content_addressed_storage
+
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
@@ -16,21 +25,68 @@ class UserProfile(models.Model):
         return f"{self.user.username} - {role}"
 
 
+def _role_cache_key(user_id) -> str:
+    return f"core:is_curator:{user_id}"
+
+
+def user_is_curator(user) -> bool:
+    """
+    Whether ``user`` has a curator profile. The answer is kept on the user
+    object, so later checks in the same request skip the query. Only a
+    harvester answer is cached across requests: the cache may be per process,
+    so a demoted curator must not keep curator access from a stale entry.
+    """
+    if not user.is_authenticated:
+        return False
+    if not hasattr(user, "_is_curator"):
+        key = _role_cache_key(user.pk)
+        if cache.get(key) is False:
+            is_curator = False
+        else:
+            is_curator = UserProfile.objects.filter(user_id=user.pk, is_curator=True).exists()
+            if not is_curator:
+                cache.set(key, False, settings.ROLE_CACHE_SECONDS)
+        user._is_curator = is_curator
+    return user._is_curator
+
+
+def upload_to_content_address(instance, filename):
+    return content_addressed_name(instance.content_sha256 or instance.id, filename)
+
+
 class Upload(models.Model):
     id = models.CharField(max_length=64, primary_key=True, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="uploads")
     institution = models.CharField(max_length=200)
     year = models.CharField(max_length=20)
     url = models.URLField(max_length=500, blank=True, null=True)
-    file = models.FileField(upload_to="uploads/%Y/%m/")
+    file = models.FileField(upload_to=upload_to_content_address, storage=content_addressed_storage)
     original_filename = models.CharField(max_length=255, blank=True)
+    content_sha256 = models.CharField(max_length=64, unique=True, blank=True, null=True, editable=False)
+    # 1-based PDF pages holding each CDS section, e.g. {"C1": [5], "G1": [40]},
+    # so extraction converts only those pages; null until first located.
+    section_pages = models.JSONField(blank=True, null=True, editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Listing order used by show_uploads and the dump endpoints, and
+            # the keyset cursor (uploaded_at, id).
+            models.Index(fields=["-uploaded_at", "-id"], name="upload_recent_idx"),
+            models.Index(fields=["institution", "year", "-uploaded_at"], name="upload_institution_year_idx"),
+            models.Index(fields=["year", "-uploaded_at"], name="upload_year_idx"),
+            models.Index(fields=["user", "-uploaded_at"], name="upload_user_recent_idx"),
+        ]
+
     def __str__(self):
         return f"{self.original_filename} - {self.user.username}"
 
     @staticmethod
     def hash_uploaded_file(uploaded_file) -> str:
+        # Set by core.uploadhandlers while the request body was received.
+        if getattr(uploaded_file, "sha256", None):
+            return uploaded_file.sha256
+
         digest = hashlib.sha256()
 
         if hasattr(uploaded_file, "seek"):
@@ -47,6 +103,18 @@ class Upload(models.Model):
 
         return digest.hexdigest()
 
+    def attach_file(self, uploaded_file) -> None:
+        """
+        Point this upload at the content-addressed copy of ``uploaded_file``.
+        The bytes are only written (or moved, for temporary uploads) when no
+        copy is stored yet.
+        """
+        name = content_addressed_name(self.content_sha256 or self.id, uploaded_file.name)
+        if self.file.storage.exists(name):
+            self.file = name
+        else:
+            self.file = uploaded_file
+
     def save(self, *args, **kwargs):
         has_named_file = getattr(self, "file", None) is not None and bool(getattr(self.file, "name", ""))
 
@@ -55,16 +123,206 @@ class Upload(models.Model):
 
         if has_named_file and not self.id:
             self.id = self.hash_uploaded_file(self.file)
+            if not self.content_sha256:
+                self.content_sha256 = self.id
+
+        if has_named_file and not self.content_sha256:
+            self.content_sha256 = self.hash_uploaded_file(self.file)
 
         super().save(*args, **kwargs)
 
 
+class ExtractedFields(models.Model):
+    """One typed column per field in core.extraction.EXPECTED_FIELDS."""
+
+    men_applied = models.BigIntegerField(blank=True, null=True)
+    women_applied = models.BigIntegerField(blank=True, null=True)
+    another_gender_applied = models.BigIntegerField(blank=True, null=True)
+    unknown_gender_applied = models.BigIntegerField(blank=True, null=True)
+    men_admitted = models.BigIntegerField(blank=True, null=True)
+    women_admitted = models.BigIntegerField(blank=True, null=True)
+    another_gender_admitted = models.BigIntegerField(blank=True, null=True)
+    unknown_gender_admitted = models.BigIntegerField(blank=True, null=True)
+    tuition_undergraduates = models.BigIntegerField(blank=True, null=True)
+    required_fees_undergraduates = models.BigIntegerField(blank=True, null=True)
+    food_and_housing_on_campus_undergraduates = models.BigIntegerField(blank=True, null=True)
+    housing_only_on_campus_undergraduates = models.BigIntegerField(blank=True, null=True)
+    food_only_on_campus_meal_plan_undergraduates = models.BigIntegerField(blank=True, null=True)
+    degree_seeking_undergraduate_students = models.BigIntegerField(blank=True, null=True)
+    applied_for_need_based_financial_aid = models.BigIntegerField(blank=True, null=True)
+    determined_to_have_financial_need = models.BigIntegerField(blank=True, null=True)
+    awarded_any_financial_aid = models.BigIntegerField(blank=True, null=True)
+    average_financial_aid_package = models.BigIntegerField(blank=True, null=True)
+
+    class Meta:
+        abstract = True
+
+
+FIELD_COLUMNS = tuple(field.name for field in ExtractedFields._meta.fields)
+
+
+class ExtractionResult(ExtractedFields):
+    upload = models.ForeignKey(Upload, on_delete=models.CASCADE, related_name="extraction_results")
+    extractor_version = models.PositiveIntegerField()
+    # Kept alongside the typed columns; it is what the process API returns.
+    fields = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["upload", "extractor_version"],
+                name="unique_extraction_result_per_version",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.upload_id} - v{self.extractor_version}"
+
+    @classmethod
+    def from_fields(cls, upload: Upload, extractor_version: int, fields: Dict) -> "ExtractionResult":
+        """An unsaved result whose typed columns mirror ``fields``."""
+        columns = {name: fields.get(name) for name in FIELD_COLUMNS}
+        return cls(upload=upload, extractor_version=extractor_version, fields=fields, **columns)
+
+
+class SummaryManager(models.Manager):
+    def refresh(self, groups: Iterable[Tuple[str, str]]) -> None:
+        """
+        Rebuild the summary rows of the given (institution, year) groups from
+        their current-version results, deleting rows for groups left without
+        any. Only those groups' results are read.
+        """
+        groups = set(groups)
+        if not groups:
+            return
+
+        results = (
+            ExtractionResult.objects.filter(
+                reduce(
+                    or_,
+                    (models.Q(upload__institution=institution, upload__year=year) for institution, year in groups),
+                ),
+                extractor_version=EXTRACTOR_VERSION,
+            )
+            .order_by("upload__uploaded_at", "upload_id")
+            .values("upload_id", "upload__institution", "upload__year", *FIELD_COLUMNS)
+        )
+        latest, counts = {}, Counter()
+        for row in results.iterator():
+            group = (row.pop("upload__institution"), row.pop("upload__year"))
+            latest[group] = row
+            counts[group] += 1
+
+        summaries = [
+            self.model(
+                institution=institution,
+                year=year,
+                extractor_version=EXTRACTOR_VERSION,
+                uploads=counts[institution, year],
+                **row,
+            )
+            for (institution, year), row in latest.items()
+        ]
+        # Each group's row is written by a single statement, so no explicit
+        # transaction is needed and a result landing costs two queries.
+        self.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=["institution", "year"],
+            update_fields=["extractor_version", "upload", "uploads", "refreshed_at", *FIELD_COLUMNS],
+        )
+        emptied = groups - latest.keys()
+        if emptied:
+            self.filter(
+                reduce(or_, (models.Q(institution=institution, year=year) for institution, year in emptied))
+            ).delete()
+
+
+class InstitutionYearSummary(ExtractedFields):
+    """
+    Pre-aggregated values for one institution and year: the fields of its
+    most recently uploaded document with a current-version result, and how
+    many such documents there are. Refreshed per group as results land, so
+    the stats API reads these rows instead of the results.
+    """
+
+    institution = models.CharField(max_length=200)
+    year = models.CharField(max_length=20)
+    extractor_version = models.PositiveIntegerField()
+    upload = models.ForeignKey(Upload, on_delete=models.SET_NULL, blank=True, null=True, related_name="+")
+    uploads = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    objects = SummaryManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["institution", "year"], name="unique_summary_per_institution_year"),
+        ]
+        indexes = [
+            models.Index(fields=["extractor_version", "year"], name="summary_version_year_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.institution} {self.year} - v{self.extractor_version}"
+
+
+class ExtractionJob(models.Model):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATE_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    upload = models.ForeignKey(Upload, on_delete=models.CASCADE, related_name="extraction_jobs")
+    extractor_version = models.PositiveIntegerField()
+    state = models.CharField(max_length=16, choices=STATE_CHOICES, default=QUEUED)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["upload", "extractor_version"],
+                name="unique_extraction_job_per_version",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["state", "created_at"], name="extraction_job_state_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.upload_id} - v{self.extractor_version} ({self.state})"
+
+
+@receiver(post_delete, sender=Upload)
+def delete_unreferenced_file(sender, instance, **kwargs):
+    name = instance.file.name
+    if name and not content_addressed_storage.reference_counts([name])[name]:
+        instance.file.storage.delete(name)
+
+
+@receiver(post_delete, sender=Upload)
+def refresh_summary_after_delete(sender, instance, **kwargs):
+    InstitutionYearSummary.objects.refresh([(instance.institution, instance.year)])
+
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
 
 
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def forget_cached_role(sender, instance, **kwargs):
+    cache.delete(_role_cache_key(instance.user_id))
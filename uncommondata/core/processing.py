@@ -0,0 +1,190 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .extraction import EXPECTED_FIELDS, EXTRACTOR_VERSION, extract_fields_and_sections
+from .models import ExtractionJob, ExtractionResult, InstitutionYearSummary, Upload
+
+
+def build_process_payload(upload: Upload, fields: Optional[Dict] = None, error: Optional[str] = None) -> Dict:
+    """
+    The JSON body returned by process_api. Field order always follows
+    EXPECTED_FIELDS, whatever order the stored result came back in.
+    """
+    fields = fields or {}
+    payload = {
+        "id": upload.id,
+        "file": upload.original_filename,
+        "institution": upload.institution,
+        "year": upload.year,
+        **{key: fields.get(key) for key in EXPECTED_FIELDS},
+    }
+    if error is not None:
+        payload["error"] = error
+    return payload
+
+
+def get_cached_result(upload_id: str) -> Optional[ExtractionResult]:
+    """
+    Stored result for the current extractor version, with its upload, in a
+    single query.
+    """
+    return (
+        ExtractionResult.objects.select_related("upload")
+        .filter(upload_id=upload_id, extractor_version=EXTRACTOR_VERSION)
+        .first()
+    )
+
+
+def store_result(upload: Upload, fields: Dict, extractor_version: int = EXTRACTOR_VERSION) -> None:
+    # Concurrent misses for the same upload may both get here; the unique
+    # constraint keeps the first row and the rest are dropped.
+    ExtractionResult.objects.bulk_create(
+        [ExtractionResult.from_fields(upload, extractor_version, fields)],
+        ignore_conflicts=True,
+    )
+    InstitutionYearSummary.objects.refresh([(upload.institution, upload.year)])
+
+
+def store_section_pages(upload: Upload, section_pages: Optional[Dict]) -> None:
+    if section_pages is not None and upload.section_pages is None:
+        Upload.objects.filter(pk=upload.pk).update(section_pages=section_pages)
+        upload.section_pages = section_pages
+
+
+def extract_and_store(upload: Upload) -> Dict:
+    fields, section_pages = extract_fields_and_sections(
+        upload.file.path, upload.content_sha256, upload.section_pages
+    )
+    store_section_pages(upload, section_pages)
+    store_result(upload, fields)
+    return fields
+
+
+def iter_batch_results(upload_ids: Iterable[str], max_workers: int) -> Iterator[Tuple[int, Dict]]:
+    """
+    Yield (status, payload) for each id as soon as it is known, in the same
+    shape process_api would return. Stored results and unknown ids come
+    first; the rest are extracted on a pool of ``max_workers`` threads and
+    yielded as they finish. Database access stays on the calling thread.
+    """
+    upload_ids = list(dict.fromkeys(upload_ids))
+
+    cached = (
+        ExtractionResult.objects.select_related("upload")
+        .filter(upload_id__in=upload_ids, extractor_version=EXTRACTOR_VERSION)
+    )
+    cached_ids = set()
+    for result in cached:
+        cached_ids.add(result.upload_id)
+        yield 200, build_process_payload(result.upload, result.fields)
+
+    pending = Upload.objects.in_bulk([upload_id for upload_id in upload_ids if upload_id not in cached_ids])
+    for upload_id in upload_ids:
+        if upload_id not in cached_ids and upload_id not in pending:
+            yield 404, {"id": upload_id, "error": "Upload not found"}
+
+    if not pending:
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(
+                extract_fields_and_sections, upload.file.path, upload.content_sha256, upload.section_pages
+            ): upload
+            for upload in pending.values()
+        }
+        for future in as_completed(futures):
+            upload = futures[future]
+            try:
+                fields, section_pages = future.result()
+            except Exception as exc:
+                yield 400, build_process_payload(upload, error=str(exc))
+                continue
+            store_section_pages(upload, section_pages)
+            store_result(upload, fields)
+            yield 200, build_process_payload(upload, fields)
+
+
+def enqueue_extraction(upload: Upload) -> ExtractionJob:
+    """
+    Queue extraction of ``upload`` for the current extractor version. At most
+    one job exists per (upload, version); a finished job whose result has
+    since been deleted, or a failed one with attempts left, is queued again.
+    """
+    ExtractionJob.objects.bulk_create(
+        [ExtractionJob(upload=upload, extractor_version=EXTRACTOR_VERSION)],
+        ignore_conflicts=True,
+    )
+    job = ExtractionJob.objects.get(upload=upload, extractor_version=EXTRACTOR_VERSION)
+
+    if job.state == ExtractionJob.DONE and get_cached_result(upload.id) is None:
+        ExtractionJob.objects.filter(pk=job.pk).update(state=ExtractionJob.QUEUED, finished_at=None)
+        job.state = ExtractionJob.QUEUED
+    elif job.state == ExtractionJob.FAILED and job.attempts < settings.EXTRACTION_JOB_MAX_ATTEMPTS:
+        ExtractionJob.objects.filter(pk=job.pk, state=ExtractionJob.FAILED).update(
+            state=ExtractionJob.QUEUED, finished_at=None
+        )
+        job.state = ExtractionJob.QUEUED
+    return job
+
+
+def claim_jobs(limit: int) -> List[ExtractionJob]:
+    """
+    Move up to ``limit`` queued jobs to running. Each job is claimed with a
+    conditional update, so concurrent workers never run the same job twice.
+    """
+    candidates = (
+        ExtractionJob.objects.filter(state=ExtractionJob.QUEUED)
+        .order_by("created_at")
+        .values_list("pk", flat=True)[:limit]
+    )
+    claimed = []
+    for pk in list(candidates):
+        updated = ExtractionJob.objects.filter(pk=pk, state=ExtractionJob.QUEUED).update(
+            state=ExtractionJob.RUNNING,
+            started_at=timezone.now(),
+            attempts=F("attempts") + 1,
+        )
+        if updated:
+            claimed.append(pk)
+    return list(ExtractionJob.objects.select_related("upload").filter(pk__in=claimed).order_by("created_at"))
+
+
+def requeue_stale_jobs(older_than: timedelta) -> int:
+    """Put jobs left running by a worker that died back in the queue."""
+    return ExtractionJob.objects.filter(
+        state=ExtractionJob.RUNNING,
+        started_at__lt=timezone.now() - older_than,
+    ).update(state=ExtractionJob.QUEUED)
+
+
+def finish_job(
+    job: ExtractionJob,
+    fields: Optional[Dict] = None,
+    error: Optional[str] = None,
+    section_pages: Optional[Dict] = None,
+) -> str:
+    """
+    Record the outcome of a claimed job and return its new state. A job that
+    failed goes back in the queue until it has used EXTRACTION_JOB_MAX_ATTEMPTS
+    attempts, so a transient failure does not stick.
+    """
+    store_section_pages(job.upload, section_pages)
+    if error is None:
+        store_result(job.upload, fields, job.extractor_version)
+        state = ExtractionJob.DONE
+    elif job.attempts < settings.EXTRACTION_JOB_MAX_ATTEMPTS:
+        state = ExtractionJob.QUEUED
+    else:
+        state = ExtractionJob.FAILED
+    ExtractionJob.objects.filter(pk=job.pk).update(
+        state=state,
+        error=error or "",
+        finished_at=None if state == ExtractionJob.QUEUED else timezone.now(),
+    )
+    return state
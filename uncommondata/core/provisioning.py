@@ -0,0 +1,133 @@
+"""
+Creating user accounts in bulk.
+
+Rows use the createUser form fields: ``email``, ``user_name``, ``password``
+and ``is_curator`` ("0"/"1" or a boolean). A batch is checked against
+existing accounts in one query, passwords are hashed on a thread pool
+(PBKDF2 releases the GIL), and the users and their profiles are inserted
+with two bulk inserts in one transaction. Every row gets its own outcome,
+so one bad row does not hold up the rest.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import UserProfile
+
+
+def _parse_is_curator(value) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    try:
+        return bool(int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _clean(row: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+    if not isinstance(row, dict):
+        return None, "row must be an object"
+    email = str(row.get("email") or "").strip()
+    username = str(row.get("user_name") or "").strip()
+    password = row.get("password") or ""
+    if not all([email, username, password]) or not isinstance(password, str):
+        return None, "All fields required"
+    is_curator = _parse_is_curator(row.get("is_curator", "0"))
+    return {"email": email, "username": username, "password": password, "is_curator": is_curator}, None
+
+
+def _insert(users: Dict[int, User], accepted: Dict[int, Dict]) -> None:
+    with transaction.atomic():
+        User.objects.bulk_create(users.values())
+        unnumbered = [user for user in users.values() if user.pk is None]
+        if unnumbered:
+            # Backends that cannot return ids from a bulk insert.
+            ids = dict(
+                User.objects.filter(username__in=[user.username for user in unnumbered]).values_list("username", "pk")
+            )
+            for user in unnumbered:
+                user.pk = ids[user.username]
+        # bulk_create skips the post_save signal that creates profiles.
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user, is_curator=accepted[i]["is_curator"]) for i, user in users.items()]
+        )
+
+
+def provision_users(rows: List[Dict], max_workers: int) -> List[Tuple[Optional[User], Optional[str]]]:
+    """
+    Create a user and profile for each valid row. Returns one (user, error)
+    pair per row in order; exactly one of the two is set. Errors use the
+    same messages as create_user_api, and a username or email repeated
+    within the batch is reported as already used from its second row on.
+    """
+    outcomes: List[Tuple[Optional[User], Optional[str]]] = [(None, None)] * len(rows)
+    cleaned = {}
+    for i, row in enumerate(rows):
+        values, error = _clean(row)
+        if error:
+            outcomes[i] = (None, error)
+        else:
+            cleaned[i] = values
+
+    used_emails, used_usernames = set(), set()
+    if cleaned:
+        existing = User.objects.filter(
+            Q(email__in={values["email"] for values in cleaned.values()})
+            | Q(username__in={values["username"] for values in cleaned.values()})
+        ).values_list("email", "username")
+        for email, username in existing:
+            used_emails.add(email)
+            used_usernames.add(username)
+
+    accepted = {}
+    for i, values in cleaned.items():
+        if values["email"] in used_emails:
+            outcomes[i] = (None, "email already used")
+        elif values["username"] in used_usernames:
+            outcomes[i] = (None, "username already used")
+        elif values["is_curator"] is None:
+            outcomes[i] = (None, "is_curator must be 0 or 1")
+        else:
+            used_emails.add(values["email"])
+            used_usernames.add(values["username"])
+            accepted[i] = values
+    if not accepted:
+        return outcomes
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        hashes = list(pool.map(make_password, [values["password"] for values in accepted.values()]))
+    users = {
+        i: User(username=values["username"], email=values["email"], password=password)
+        for (i, values), password in zip(accepted.items(), hashes)
+    }
+
+    while users:
+        try:
+            _insert(users, accepted)
+        except IntegrityError:
+            # Another request took some of these usernames since the check:
+            # report those rows and insert the rest again.
+            for user in users.values():
+                user.pk = None
+            taken = set(
+                User.objects.filter(username__in=[user.username for user in users.values()]).values_list(
+                    "username", flat=True
+                )
+            )
+            if not taken:
+                for i in users:
+                    outcomes[i] = (None, "conflicted with a concurrent sign-up, retry")
+                return outcomes
+            for i in [i for i, user in users.items() if user.username in taken]:
+                outcomes[i] = (None, "username already used")
+                del users[i]
+        else:
+            break
+
+    for i, user in users.items():
+        outcomes[i] = (user, None)
+    return outcomes
@@ -0,0 +1,87 @@
+"""
+Aggregates over the extracted fields, computed in SQL.
+
+Everything reads InstitutionYearSummary, one row per institution and year
+holding the values of its latest current-version result, so a query costs
+the same however many documents were uploaded and never touches the files.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from django.db.models import Count, F, FloatField, Q, QuerySet, Sum, Window
+from django.db.models.functions import Cast, NullIf, RowNumber
+
+from .extraction import EXTRACTOR_VERSION
+from .models import FIELD_COLUMNS, InstitutionYearSummary
+
+GENDERS = ("men", "women", "another_gender", "unknown_gender")
+
+
+def summaries(institutions: Iterable[str] = (), years: Iterable[str] = ()) -> QuerySet:
+    queryset = InstitutionYearSummary.objects.filter(extractor_version=EXTRACTOR_VERSION)
+    institutions, years = list(institutions), list(years)
+    if institutions:
+        queryset = queryset.filter(institution__in=institutions)
+    if years:
+        queryset = queryset.filter(year__in=years)
+    return queryset
+
+
+def _admit_rate_aggregates() -> Dict:
+    """
+    Admitted over applied for each gender and in total. Rows missing either
+    count for a gender are left out of that gender's sums, so a half-read
+    table does not drag the rate down.
+    """
+    aggregates = {}
+    for gender in GENDERS:
+        both = Q(**{f"{gender}_admitted__isnull": False, f"{gender}_applied__isnull": False})
+        aggregates[gender] = Cast(Sum(f"{gender}_admitted", filter=both), FloatField()) / NullIf(
+            Sum(f"{gender}_applied", filter=both), 0
+        )
+    admitted = sum(Sum(f"{g}_admitted", filter=Q(**{f"{g}_applied__isnull": False}), default=0) for g in GENDERS)
+    applied = sum(Sum(f"{g}_applied", filter=Q(**{f"{g}_admitted__isnull": False}), default=0) for g in GENDERS)
+    aggregates["total"] = Cast(admitted, FloatField()) / NullIf(applied, 0)
+    return aggregates
+
+
+def admit_rates(queryset: QuerySet) -> Dict:
+    """Admit rates across ``queryset`` and per year, in two queries."""
+    aggregates = _admit_rate_aggregates()
+    by_year = queryset.order_by("year").values("year").annotate(**aggregates)
+    return {
+        "overall": queryset.aggregate(**aggregates),
+        "by_year": {row.pop("year"): row for row in by_year},
+    }
+
+
+def median_by_year(queryset: QuerySet, field: str) -> Dict[str, Optional[float]]:
+    """
+    Median of ``field`` for each year. The database numbers each year's
+    values in order and returns only the middle one or two, which are
+    averaged here.
+    """
+    ranked = (
+        queryset.filter(**{f"{field}__isnull": False})
+        .annotate(
+            position=Window(RowNumber(), partition_by=F("year"), order_by=F(field).asc()),
+            count=Window(Count("pk"), partition_by=F("year")),
+        )
+        .annotate(double=F("position") * 2)
+        # For n values the middle positions p satisfy n <= 2p <= n + 2.
+        .filter(double__gte=F("count"), double__lte=F("count") + 2)
+        .values_list("year", field)
+    )
+    middles: Dict[str, List[int]] = {}
+    for year, value in ranked:
+        middles.setdefault(year, []).append(value)
+    return {year: sum(values) / len(values) for year, values in sorted(middles.items())}
+
+
+def series(queryset: QuerySet, fields: Iterable[str] = FIELD_COLUMNS) -> Dict[str, List[Dict]]:
+    """Each institution's values year by year, oldest first."""
+    fields = list(fields)
+    rows = queryset.order_by("institution", "year").values("institution", "year", "uploads", *fields)
+    result: Dict[str, List[Dict]] = {}
+    for row in rows:
+        result.setdefault(row.pop("institution"), []).append(row)
+    return result
@@ -0,0 +1,76 @@
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, Iterable
+
+from django.core.files.storage import FileSystemStorage
+
+CONTENT_ADDRESSED_RE = re.compile(r"^uploads/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[^/]*)?$")
+
+
+def content_addressed_name(digest: str, filename: str = "") -> str:
+    """
+    Storage name for content with the given SHA-256: uploads/ab/cd/<sha256>,
+    keeping the original extension so PDFs are still recognised by suffix.
+    """
+    return f"uploads/{digest[:2]}/{digest[2:4]}/{digest}{Path(filename).suffix.lower()}"
+
+
+def _content_digest(content) -> str:
+    # Uploads received through core.uploadhandlers already carry their hash.
+    if getattr(content, "sha256", None):
+        return content.sha256
+
+    digest = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that keeps one copy of each distinct content.
+
+    Every file saved under uploads/ is named by its SHA-256, so saving
+    content that is already stored returns the existing name without writing
+    anything, and names never get Django's random collision suffixes. Files
+    outside uploads/ are stored as usual.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if name.startswith("uploads/") and not CONTENT_ADDRESSED_RE.match(name):
+            name = content_addressed_name(_content_digest(content), name)
+        if CONTENT_ADDRESSED_RE.match(name) and self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def get_available_name(self, name, max_length=None):
+        if CONTENT_ADDRESSED_RE.match(name):
+            return name
+        return super().get_available_name(name, max_length=max_length)
+
+    @staticmethod
+    def reference_counts(names: Iterable[str]) -> Dict[str, int]:
+        """
+        Number of uploads referencing each stored name, in one query. The
+        count is read from the Upload table itself rather than a separate
+        counter, so it cannot drift from the rows.
+        """
+        from django.db.models import Count
+
+        from .models import Upload
+
+        names = list(names)
+        counts = dict.fromkeys(names, 0)
+        rows = Upload.objects.filter(file__in=names).values("file").annotate(references=Count("pk"))
+        counts.update({row["file"]: row["references"] for row in rows})
+        return counts
+
+
+content_addressed_storage = ContentAddressedStorage()
@@ -0,0 +1,149 @@
+"""
+Synthetic Common Data Set documents for load and benchmark data.
+
+Documents follow the layout of the uploaded fixture files (C1, G1 and H2
+sections) but are padded with noise pages separated by form feeds, as
+pdftotext emits them, and use the variations real conversions show: values
+wrapped onto the line after their label, extra column padding, dollar signs
+and ``--``/N/A cells. Each document carries the field values the extractor
+should find in it.
+"""
+import random
+from typing import Dict, List, NamedTuple, Optional
+
+from .extraction import EXPECTED_FIELDS
+
+C1_ROWS = [
+    ("men_applied", "Total first-time, first-year men who applied", (2000, 40000)),
+    ("women_applied", "Total first-time, first-year women who applied", (2000, 40000)),
+    ("another_gender_applied", "Total first-time, first-year another gender who applied", (0, 500)),
+    ("unknown_gender_applied", "Total first-time, first-year unknown gender who applied", (0, 2000)),
+    ("men_admitted", "Total first-time, first-year men who were admitted", (200, 8000)),
+    ("women_admitted", "Total first-time, first-year women who were admitted", (200, 8000)),
+    ("another_gender_admitted", "Total first-time, first-year another gender who were admitted", (0, 100)),
+    ("unknown_gender_admitted", "Total first-time, first-year unknown gender who were admitted", (0, 300)),
+]
+
+G1_ROWS = [
+    ("tuition_undergraduates", "Tuition (Undergraduates)", (8000, 70000)),
+    ("required_fees_undergraduates", "Required Fees: (Undergraduates)", (200, 5000)),
+    ("food_and_housing_on_campus_undergraduates", "Food and housing (on-campus): (Undergraduates)", (8000, 25000)),
+    ("housing_only_on_campus_undergraduates", "Housing Only (on-campus): (Undergraduates)", (5000, 15000)),
+    (
+        "food_only_on_campus_meal_plan_undergraduates",
+        "Food Only (on-campus meal plan): (Undergraduates)",
+        (3000, 9000),
+    ),
+]
+
+H2_ROWS = [
+    ("degree_seeking_undergraduate_students", "A. Number of degree-seeking undergraduate students", (1000, 40000)),
+    (
+        "applied_for_need_based_financial_aid",
+        "B. Number of students in line a who applied for need-based financial aid",
+        (500, 20000),
+    ),
+    (
+        "determined_to_have_financial_need",
+        "C. Number of students in line b who were determined to have financial need",
+        (300, 15000),
+    ),
+    (
+        "awarded_any_financial_aid",
+        "D. Number of students in line c who were awarded any financial aid",
+        (300, 15000),
+    ),
+    ("average_financial_aid_package", "J. The average financial aid package of those in line d", (5000, 80000)),
+]
+
+SECTIONS = [
+    ("C1 First-time, first-year students", C1_ROWS),
+    ("G1 Undergraduate full-time costs", G1_ROWS),
+    ("H2 Enrolled students awarded aid", H2_ROWS),
+]
+
+# Noise rows use other CDS sections' wording while avoiding every label the
+# extractor searches for.
+NOISE_ROWS = [
+    "B1 Degree-seeking, first-time first-year students",
+    "B2 Nonresidents",
+    "B3 Number of degrees awarded from July 1 to June 30",
+    "B4 Six-year graduation rate for the cohort",
+    "C7 Relative importance of each of the following",
+    "C9 Percent of students who submitted scores",
+    "D2 Transfer students enrolled",
+    "E1 Special study options offered",
+    "F1 Percent who live in college-owned housing units",
+    "I1 Instructional faculty headcount",
+    "I3 Undergraduate class size sections",
+    "J1 Degrees conferred by discipline",
+]
+
+NA_CELLS = ["--", "N/A", "NA"]
+
+
+class SyntheticDocument(NamedTuple):
+    text: str
+    fields: Dict[str, Optional[int]]
+    # Same shape as Upload.section_pages: 1-based pages per section.
+    section_pages: Dict[str, List[int]]
+
+
+def _format_value(rng: random.Random, value: int, dollars: bool) -> str:
+    text = f"{value:,}"
+    return f"${text}" if dollars and rng.random() < 0.5 else text
+
+
+def _section_lines(rng: random.Random, header: str, rows, fields, wrap_rate: float, missing_rate: float) -> List[str]:
+    lines = [f"{header}:"]
+    dollars = header.startswith("G1")
+    for field, label, (low, high) in rows:
+        if rng.random() < missing_rate:
+            fields[field] = None
+            cell = rng.choice(NA_CELLS)
+        else:
+            fields[field] = rng.randint(low, high)
+            cell = _format_value(rng, fields[field], dollars)
+
+        padding = " " * rng.randint(1, 12)
+        if rng.random() < wrap_rate:
+            lines.append(label)
+            lines.append(f"{padding}{cell}")
+        else:
+            lines.append(f"{label}{padding}{cell}")
+    return lines
+
+
+def _noise_page(rng: random.Random, lines_per_page: int, year: str) -> List[str]:
+    lines = [f"Common Data Set {year}"]
+    for _ in range(lines_per_page - 1):
+        columns = "  ".join(f"{rng.randint(0, 9999):,}" for _ in range(rng.randint(0, 4)))
+        lines.append(f"{rng.choice(NOISE_ROWS)}    {columns}".rstrip())
+    return lines
+
+
+def generate_document(
+    rng: random.Random,
+    pages: int = 10,
+    lines_per_page: int = 50,
+    wrap_rate: float = 0.2,
+    missing_rate: float = 0.1,
+    year: str = "2024-2025",
+) -> SyntheticDocument:
+    """
+    Build one synthetic CDS document of ``pages`` noise pages with the C1,
+    G1 and H2 sections on pages of their own, in that order, at random
+    positions among them.
+    """
+    fields = dict(EXPECTED_FIELDS)
+    page_texts = [_noise_page(rng, lines_per_page, year) for _ in range(pages)]
+
+    positions = sorted(rng.sample(range(pages + len(SECTIONS)), len(SECTIONS)))
+    section_pages = {}
+    for position, (header, rows) in zip(positions, SECTIONS):
+        page_texts.insert(position, _section_lines(rng, header, rows, fields, wrap_rate, missing_rate))
+        section_pages[header[:2]] = [position + 1]
+
+    # pdftotext ends every page's last line and then emits a form feed.
+    text = "".join("\n".join(lines) + "\n\f" for lines in page_texts)
+    return SyntheticDocument(text, fields, section_pages)
@@ -1,15 +1,68 @@
 import hashlib
+import json
+import os
+import random
+import re
+import sys
 import tempfile
+import tracemalloc
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO, StringIO
 from pathlib import Path
+from unittest import mock
 
 from django.contrib.auth.models import User
-from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
-from core.extraction import extract_fields_from_file
-from core.models import Upload
+from core import dumps, metrics, provisioning
+from core.extraction import (
+    ConversionError,
+    ConversionTimeout,
+    EXPECTED_FIELDS,
+    EXTRACTOR_VERSION,
+    SECTION_MATCHERS,
+    PdftotextLibraryConverter,
+    PdftotextSubprocessConverter,
+    _select_converter,
+    conversion_metrics,
+    extract_fields_and_sections,
+    extract_fields_from_file,
+    extract_fields_from_text,
+    match_file,
+    pdf_to_text,
+)
+from core.management.commands import import_cds
+from core.management.commands.extraction_worker import Command as WorkerCommand
+from core.models import ExtractionJob, ExtractionResult, InstitutionYearSummary, Upload, UserProfile
+from core.processing import claim_jobs, enqueue_extraction, store_result
+from core.storage import content_addressed_storage
+from core.synthetic import generate_document
+from core.textcache import TextCache
 
 
+WRAPPED_TEXT = """
+Men who applied
+  4,210
+Total first-time, first-year men who applied   N/A
+unknown gender who applied (see note)
+--
+Female applied 3,900
+Total first-time, first-year women who applied
+  5,112
+G1 tuition for the year 52,000
+Tuition (Undergraduates)
+Required fees for undergraduates 1,200
+Number of degree-seeking undergraduate students 6,001
+A. Number of degree-seeking undergraduate students 6,002
+"""
+
 SAMPLE_TEXT = """
 C1:
 Total first-time, first-year men who applied 19,195
@@ -39,6 +92,11 @@ J. The average financial aid package of those in line d 78,883
 
 class UploadApiTests(TestCase):
     def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.media_root = Path(media_root.name)
+
         self.client = Client()
         self.user = User.objects.create_user(username="harvester", password="pass12345")
         self.curator = User.objects.create_user(username="curator", password="pass12345")
@@ -63,6 +121,69 @@ class UploadApiTests(TestCase):
         self.assertEqual(response.json()["id"], expected_id)
         self.assertTrue(Upload.objects.filter(pk=expected_id).exists())
 
+    def test_upload_hashed_while_streaming_to_temporary_file(self):
+        self.enterContext(override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=16))
+
+        self.client.login(username="harvester", password="pass12345")
+        content = SAMPLE_TEXT.encode() * 50
+
+        # The body must not be read again after it was streamed to disk.
+        with (
+            mock.patch.object(TemporaryUploadedFile, "chunks", side_effect=AssertionError),
+            mock.patch.object(TemporaryUploadedFile, "read", side_effect=AssertionError),
+        ):
+            response = self.client.post(
+                "/app/api/upload/",
+                {
+                    "institution": "UChicago",
+                    "year": "2024-2025",
+                    "file": SimpleUploadedFile("big.txt", content, content_type="text/plain"),
+                },
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["id"], hashlib.sha256(content).hexdigest())
+
+    def test_duplicate_uploads_share_one_content_addressed_file(self):
+        self.client.login(username="harvester", password="pass12345")
+        content = SAMPLE_TEXT.encode()
+        expected_id = hashlib.sha256(content).hexdigest()
+
+        statuses = []
+        for year in ("2023-2024", "2024-2025"):
+            response = self.client.post(
+                "/app/api/upload/",
+                {
+                    "institution": "UChicago",
+                    "year": year,
+                    "file": SimpleUploadedFile("fixture.txt", content, content_type="text/plain"),
+                },
+            )
+            statuses.append(response.status_code)
+
+        self.assertEqual(statuses, [201, 200])
+        upload = Upload.objects.get(pk=expected_id)
+        self.assertEqual(upload.year, "2024-2025")
+        self.assertEqual(upload.file.name, f"uploads/{expected_id[:2]}/{expected_id[2:4]}/{expected_id}.txt")
+        stored = [path for path in self.media_root.rglob("*") if path.is_file()]
+        self.assertEqual(stored, [self.media_root / upload.file.name])
+
+    def test_concurrent_first_uploads_of_the_same_content_both_succeed(self):
+        self.client.login(username="harvester", password="pass12345")
+        content = SAMPLE_TEXT.encode()
+        form = {"institution": "UChicago", "year": "2023-2024"}
+        self.client.post("/app/api/upload/", {**form, "file": SimpleUploadedFile("a.txt", content)})
+
+        # The second request looks before the first one's row is visible.
+        with mock.patch.object(Upload.objects, "filter", return_value=Upload.objects.none()):
+            response = self.client.post(
+                "/app/api/upload/", {**form, "year": "2024-2025", "file": SimpleUploadedFile("b.txt", content)}
+            )
+
+        self.assertEqual(response.status_code, 200)
+        upload = Upload.objects.get()
+        self.assertEqual((upload.year, upload.original_filename), ("2024-2025", "b.txt"))
+
     def test_download_and_process(self):
         content = SAMPLE_TEXT.encode()
         upload_id = hashlib.sha256(content).hexdigest()
@@ -87,6 +208,151 @@ class UploadApiTests(TestCase):
         self.assertEqual(payload["men_applied"], 19195)
         self.assertEqual(payload["average_financial_aid_package"], 78883)
 
+    def test_process_batch_streams_one_line_per_id(self):
+        self.client.login(username="harvester", password="pass12345")
+        fresh = Upload.objects.create(
+            user=self.user,
+            institution="UChicago",
+            year="2024-2025",
+            file=SimpleUploadedFile("fixture.txt", SAMPLE_TEXT.encode(), content_type="text/plain"),
+        )
+        broken = Upload.objects.create(
+            user=self.user,
+            institution="Broken",
+            year="2024-2025",
+            file=SimpleUploadedFile("broken.pdf", b"%PDF-broken", content_type="application/pdf"),
+        )
+        cached = Upload.objects.create(
+            user=self.user,
+            institution="Cached",
+            year="2024-2025",
+            file=SimpleUploadedFile("cached.txt", b"cached", content_type="text/plain"),
+        )
+        ExtractionResult.objects.create(
+            upload=cached, extractor_version=EXTRACTOR_VERSION, fields={"men_applied": 7}
+        )
+
+        def extract(path, *args):
+            if path.endswith(".pdf"):
+                raise ConversionError("pdftotext exited with status 1")
+            return extract_fields_and_sections(path, *args)
+
+        with mock.patch("core.processing.extract_fields_and_sections", side_effect=extract):
+            response = self.client.post(
+                "/app/api/process-batch/",
+                json.dumps({"ids": [fresh.id, broken.id, cached.id, "missing"]}),
+                content_type="application/json",
+            )
+            lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        by_id = {line["id"]: line for line in lines}
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(by_id[fresh.id]["status"], 200)
+        self.assertEqual(by_id[fresh.id]["men_applied"], 19195)
+        self.assertEqual(by_id[cached.id]["men_applied"], 7)
+        self.assertEqual(by_id[broken.id]["status"], 400)
+        self.assertEqual(by_id[broken.id]["error"], "pdftotext exited with status 1")
+        self.assertEqual(by_id["missing"]["status"], 404)
+        self.assertTrue(ExtractionResult.objects.filter(upload=fresh).exists())
+
+        self.assertEqual(self.client.post("/app/api/process-batch/", {}).status_code, 400)
+
+    def test_download_falls_back_to_content_hash_index(self):
+        content = SAMPLE_TEXT.encode()
+        content_hash = hashlib.sha256(content).hexdigest()
+        Upload.objects.create(
+            id="legacy-id",
+            user=self.user,
+            institution="UChicago",
+            year="2024-2025",
+            file=SimpleUploadedFile("fixture.txt", content, content_type="text/plain"),
+        )
+
+        download = self.client.get(f"/app/api/download/{content_hash}")
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(b"".join(download.streaming_content), content)
+
+        with mock.patch.object(Upload, "hash_uploaded_file") as rehash:
+            missing = self.client.get("/app/api/download/" + "0" * 64)
+        self.assertEqual(missing.status_code, 404)
+        rehash.assert_not_called()
+
+    def test_download_supports_conditional_and_range_requests(self):
+        content = SAMPLE_TEXT.encode()
+        upload = Upload.objects.create(
+            id=hashlib.sha256(content).hexdigest(),
+            user=self.user,
+            institution="UChicago",
+            year="2024-2025",
+            file=SimpleUploadedFile("fixture.pdf", content),
+            original_filename="fixture.pdf",
+        )
+        url = f"/app/api/download/{upload.id}"
+
+        full = self.client.get(url)
+        self.assertEqual(b"".join(full.streaming_content), content)
+        etag = full["ETag"]
+        self.assertEqual(etag, f'"{upload.id}"')
+        self.assertEqual(full["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", full["Cache-Control"])
+        self.assertEqual(full["Content-Type"], "application/pdf")
+
+        not_modified = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual((not_modified.status_code, not_modified.content), (304, b""))
+        self.assertEqual(not_modified["ETag"], etag)
+        since = self.client.get(url, headers={"If-Modified-Since": full["Last-Modified"]})
+        self.assertEqual(since.status_code, 304)
+        changed = self.client.get(url, headers={"If-None-Match": '"other"'})
+        self.assertEqual(changed.status_code, 200)
+        changed.close()
+
+        for header, first, last in (("bytes=10-19", 10, 19), ("bytes=-5", len(content) - 5, len(content) - 1),
+                                    ("bytes=100-", 100, len(content) - 1)):
+            with self.subTest(header=header):
+                partial = self.client.get(url, headers={"Range": header})
+                self.assertEqual(partial.status_code, 206)
+                self.assertEqual(b"".join(partial.streaming_content), content[first : last + 1])
+                self.assertEqual(partial["Content-Range"], f"bytes {first}-{last}/{len(content)}")
+                self.assertEqual(int(partial["Content-Length"]), last - first + 1)
+                self.assertIn('filename="fixture.pdf"', partial["Content-Disposition"])
+
+        unsatisfiable = self.client.get(url, headers={"Range": f"bytes={len(content)}-"})
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable["Content-Range"], f"bytes */{len(content)}")
+        self.assertNotIn("Cache-Control", unsatisfiable)
+        for headers in ({"Range": "bytes=0-1,5-6"}, {"Range": "bytes=0-9", "If-Range": '"other"'}):
+            with self.subTest(headers=headers):
+                response = self.client.get(url, headers=headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(b"".join(response.streaming_content), content)
+        resumed = self.client.get(url, headers={"Range": "bytes=0-9", "If-Range": etag})
+        self.assertEqual(resumed.status_code, 206)
+        resumed.close()
+
+        with self.settings(DOWNLOAD_OFFLOAD="x-accel-redirect"):
+            offloaded = self.client.get(url)
+        self.assertEqual(offloaded["X-Accel-Redirect"], f"/protected-media/{upload.file.name}")
+        self.assertEqual(offloaded.content, b"")
+        with self.settings(DOWNLOAD_OFFLOAD="x-sendfile"):
+            self.assertEqual(self.client.get(url)["X-Sendfile"], upload.file.path)
+
+    def test_backfill_content_hashes(self):
+        content = SAMPLE_TEXT.encode()
+        upload = Upload.objects.create(
+            id="legacy-id",
+            user=self.user,
+            institution="UChicago",
+            year="2024-2025",
+            file=SimpleUploadedFile("fixture.txt", content, content_type="text/plain"),
+        )
+        Upload.objects.filter(pk=upload.pk).update(content_sha256=None)
+
+        call_command("backfill_content_hashes", stdout=StringIO())
+
+        upload.refresh_from_db()
+        self.assertEqual(upload.content_sha256, hashlib.sha256(content).hexdigest())
+
     def test_show_uploads_html_contains_links(self):
         content = SAMPLE_TEXT.encode()
         upload_id = hashlib.sha256(content).hexdigest()
@@ -106,6 +372,798 @@ class UploadApiTests(TestCase):
         self.assertContains(response, f"/app/api/process/{upload.id}")
 
 
+class ExtractionResultTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+        self.client = Client()
+        self.user = User.objects.create_user(username="harvester", password="pass12345")
+        self.upload = Upload.objects.create(
+            user=self.user,
+            institution="UChicago",
+            year="2024-2025",
+            file=SimpleUploadedFile("fixture.txt", SAMPLE_TEXT.encode(), content_type="text/plain"),
+        )
+
+    def test_process_serves_stored_result(self):
+        first = self.client.get(f"/app/api/process/{self.upload.id}")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(ExtractionResult.objects.filter(upload=self.upload).count(), 1)
+
+        with mock.patch("core.processing.extract_fields_and_sections") as extract:
+            with self.assertNumQueries(1):
+                second = self.client.get(f"/app/api/process/{self.upload.id}")
+        extract.assert_not_called()
+        self.assertEqual(second.json(), first.json())
+
+    def test_process_ignores_results_from_other_extractor_versions(self):
+        ExtractionResult.objects.create(upload=self.upload, extractor_version=0, fields={"men_applied": 1})
+
+        response = self.client.get(f"/app/api/process/{self.upload.id}")
+        self.assertEqual(response.json()["men_applied"], 19195)
+
+
+class ExtractionWorkerTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+        self.client = Client()
+        self.user = User.objects.create_user(username="harvester", password="pass12345")
+        self.client.login(username="harvester", password="pass12345")
+
+    def test_async_process_returns_202_until_worker_runs(self):
+        content = SAMPLE_TEXT.encode()
+        response = self.client.post(
+            "/app/api/upload/",
+            {
+                "institution": "UChicago",
+                "year": "2024-2025",
+                "process": "1",
+                "file": SimpleUploadedFile("fixture.txt", content, content_type="text/plain"),
+            },
+        )
+        upload_id = response.json()["id"]
+        self.assertEqual(response.json()["status"], ExtractionJob.QUEUED)
+
+        pending = self.client.get(f"/app/api/process/{upload_id}", {"mode": "async"})
+        self.assertEqual(pending.status_code, 202)
+        self.assertEqual(pending.json()["status_url"], f"/app/api/process-status/{upload_id}")
+
+        call_command("extraction_worker", "--once", "--processes", "1", stdout=StringIO())
+
+        status = self.client.get(f"/app/api/process-status/{upload_id}")
+        self.assertEqual(status.json()["status"], ExtractionJob.DONE)
+        done = self.client.get(f"/app/api/process/{upload_id}", {"mode": "async"})
+        self.assertEqual(done.status_code, 200)
+        self.assertEqual(done.json()["men_admitted"], 1070)
+
+    def test_failed_jobs_are_retried_until_attempts_run_out(self):
+        self.enterContext(override_settings(EXTRACTION_JOB_MAX_ATTEMPTS=2))
+        upload = Upload.objects.create(
+            user=self.user,
+            institution="Missing",
+            year="2024-2025",
+            file=SimpleUploadedFile("missing.txt", b"missing", content_type="text/plain"),
+        )
+        # Every attempt fails once the stored file is gone.
+        os.remove(upload.file.path)
+        self.assertEqual(self.client.get(f"/app/api/process/{upload.id}", {"mode": "async"}).status_code, 202)
+
+        stderr = StringIO()
+        call_command("extraction_worker", "--once", "--processes", "1", stdout=StringIO(), stderr=stderr)
+        job = ExtractionJob.objects.get(upload=upload)
+        self.assertEqual((job.state, job.attempts), (ExtractionJob.FAILED, 2))
+        self.assertIn(f"Requeued {upload.id} after attempt 1", stderr.getvalue())
+        self.assertIn(f"Failed {upload.id}", stderr.getvalue())
+        self.assertEqual(self.client.get(f"/app/api/process/{upload.id}", {"mode": "async"}).status_code, 400)
+
+        with override_settings(EXTRACTION_JOB_MAX_ATTEMPTS=3):
+            retry = self.client.get(f"/app/api/process/{upload.id}", {"mode": "async"})
+        self.assertEqual(retry.status_code, 202)
+        self.assertEqual(retry.json()["status"], ExtractionJob.QUEUED)
+
+    def test_worker_requeues_jobs_from_a_broken_pool(self):
+        upload = Upload.objects.create(
+            user=self.user,
+            institution="UChicago",
+            year="2024-2025",
+            file=SimpleUploadedFile("fixture.txt", SAMPLE_TEXT.encode(), content_type="text/plain"),
+        )
+        enqueue_extraction(upload)
+        pool = mock.Mock()
+        pool.submit.side_effect = BrokenProcessPool("a child process terminated abruptly")
+
+        healthy = WorkerCommand(stdout=StringIO(), stderr=StringIO()).run_jobs(pool, claim_jobs(1), 1, 1)
+        self.assertFalse(healthy)
+        job = ExtractionJob.objects.get(upload=upload)
+        self.assertEqual((job.state, job.attempts), (ExtractionJob.QUEUED, 1))
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+        self.client = Client()
+        self.user = User.objects.create_user(username="harvester", password="pass12345")
+        self.curator = User.objects.create_user(username="curator", password="pass12345")
+        self.curator.profile.is_curator = True
+        self.curator.profile.save()
+
+    def test_request_timing_reports_phases_and_queries(self):
+        upload = Upload.objects.create(
+            user=self.user,
+            institution="UChicago",
+            year="2024-2025",
+            file=SimpleUploadedFile("fixture.txt", SAMPLE_TEXT.encode(), content_type="text/plain"),
+        )
+        self.assertNotIn("Server-Timing", Client().get(f"/app/api/process/{upload.id}"))
+        ExtractionResult.objects.all().delete()
+        self.client.login(username="curator", password="pass12345")
+        self.assertEqual(self.client.get("/app/api/metrics/").status_code, 404)
+
+        self.enterContext(override_settings(REQUEST_METRICS_ENABLED=True))
+        metrics.registry.reset()
+        response = Client().get(f"/app/api/process/{upload.id}")
+
+        timing = dict(entry.split(";", 1) for entry in response["Server-Timing"].split(", "))
+        self.assertEqual(list(timing), ["convert", "normalize", "c1", "g1", "h2", "sql", "total"])
+        queries = int(re.search(r'desc="(\d+) queries"', timing["sql"]).group(1))
+        self.assertGreater(queries, 0)
+        self.assertLessEqual(queries, 10)
+
+        self.assertEqual(Client().get("/app/api/metrics/").status_code, 401)
+        exposition = self.client.get("/app/api/metrics/").content.decode()
+        self.assertIn('uncommondata_phase_seconds_count{phase="c1"} 1\n', exposition)
+        self.assertIn('uncommondata_request_seconds_count{view="core:process_api"} 1\n', exposition)
+        median = re.search(r'^uncommondata_request_sql_queries\{view="core:process_api",quantile="0.5"\} (\S+)$',
+                           exposition, re.MULTILINE)
+        self.assertEqual(float(median.group(1)), queries)
+        self.assertIn("# TYPE uncommondata_pdf_conversions_total counter", exposition)
+
+
+class ReextractTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.user = User.objects.create_user(username="harvester", password="pass12345")
+
+    def create_upload(self, institution, content):
+        return Upload.objects.create(
+            user=self.user,
+            institution=institution,
+            year="2024-2025",
+            file=SimpleUploadedFile("fixture.txt", content.encode(), content_type="text/plain"),
+        )
+
+    def test_reextract_stores_results_and_summarises_changes(self):
+        stale = self.create_upload("UChicago", SAMPLE_TEXT)
+        current = self.create_upload("UChicago", SAMPLE_TEXT + "\n")
+        other = self.create_upload("Rice", SAMPLE_TEXT + "\n\n")
+        fresh = self.create_upload("UChicago", SAMPLE_TEXT + "\n\n\n")
+        previous = extract_fields_from_text(SAMPLE_TEXT)
+        previous.update(men_applied=1, tuition_undergraduates=None)
+        ExtractionResult.objects.create(upload=stale, extractor_version=EXTRACTOR_VERSION - 1, fields=previous)
+        ExtractionResult.objects.create(upload=current, extractor_version=EXTRACTOR_VERSION, fields={})
+
+        out = StringIO()
+        call_command(
+            "reextract", "--institution", "UChicago", "--processes", "1", "--changed-only", "--list-changes",
+            stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn("Re-extracting 1 uploads", output)
+        self.assertIn(f"{stale.id} tuition_undergraduates: None -> 71325, men_applied: 1 -> 19195", output)
+        self.assertIn("1 of 1 uploads differ", output)
+        self.assertRegex(output, r"tuition_undergraduates +1 +0 +0")
+        stored = ExtractionResult.objects.get(upload=stale, extractor_version=EXTRACTOR_VERSION)
+        self.assertEqual(stored.fields, extract_fields_from_text(SAMPLE_TEXT))
+        self.assertEqual(ExtractionResult.objects.get(upload=current, extractor_version=EXTRACTOR_VERSION).fields, {})
+        self.assertFalse(other.extraction_results.exists())
+        self.assertFalse(fresh.extraction_results.exists())
+
+        out = StringIO()
+        call_command("reextract", "--institution", "UChicago", "--processes", "1", stdout=out)
+        self.assertIn("Re-extracting 1 uploads", out.getvalue())
+        self.assertTrue(fresh.extraction_results.exists())
+
+
+class QueryCountTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+        self.user = User.objects.create_user(username="harvester", password="pass12345")
+        self.curator = User.objects.create_user(username="curator", password="pass12345")
+        self.curator.profile.is_curator = True
+        self.curator.profile.save()
+
+    def test_api_views_run_a_fixed_number_of_queries(self):
+        upload = Upload.objects.create(
+            id=hashlib.sha256(SAMPLE_TEXT.encode()).hexdigest(),
+            user=self.user,
+            institution="UChicago",
+            year="2024-2025",
+            file=SimpleUploadedFile("fixture.txt", SAMPLE_TEXT.encode(), content_type="text/plain"),
+        )
+        store_result(upload, extract_fields_from_text(SAMPLE_TEXT))
+
+        harvester, curator = Client(), Client()
+        harvester.login(username="harvester", password="pass12345")
+        with CaptureQueriesContext(connection) as login_queries:
+            curator.login(username="curator", password="pass12345")
+        self.assertFalse([q for q in login_queries.captured_queries if "core_userprofile" in q["sql"]])
+
+        # Curator access reads the profile on every request.
+        with self.assertNumQueries(4):
+            self.assertEqual(curator.get("/app/api/dump-data/", {"limit": 1}).status_code, 200)
+
+        # Views that check the user start with a session and a user query;
+        # the harvester's role is read once and then cached.
+        cases = [
+            (harvester, "/app/api/uploads-check/", 2),
+            (harvester, "/app/api/uploads-status/", 3),
+            (harvester, "/app/api/uploads-status/", 2),
+            (harvester, "/app/api/dump-uploads/?limit=1", 3),
+            (harvester, f"/app/api/download/{upload.id}", 1),
+            (harvester, f"/app/api/process/{upload.id}", 1),
+            (harvester, f"/app/api/process-status/{upload.id}", 3),
+            (curator, "/app/api/uploads-status/", 3),
+            (curator, "/app/api/dump-data/?limit=1", 4),
+            (curator, "/app/api/stats/", 6),
+        ]
+        for client, url, queries in cases:
+            with self.subTest(url=url), self.assertNumQueries(queries):
+                response = client.get(url)
+                self.assertLess(response.status_code, 500)
+                response.close()
+
+        # A demotion that skips signals, as another process would make it,
+        # takes effect on the next request.
+        UserProfile.objects.filter(user=self.curator).update(is_curator=False)
+        self.assertEqual(curator.get("/app/api/dump-data/").status_code, 403)
+        self.curator.profile.save()
+        self.assertEqual(curator.get("/app/api/dump-data/").status_code, 200)
+
+
+class DumpApiTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+        self.client = Client()
+        self.user = User.objects.create_user(username="harvester", password="pass12345")
+        self.client.login(username="harvester", password="pass12345")
+        for i in range(5):
+            Upload.objects.create(
+                user=self.user,
+                institution=f"Institution {i}",
+                year="2024-2025",
+                file=SimpleUploadedFile(f"cds_{i}.txt", f"document {i}".encode()),
+            )
+
+    def test_default_shape_is_unchanged(self):
+        payload = self.client.get("/app/api/dump-uploads/").json()
+        self.assertEqual(len(payload), 5)
+        self.assertNotIn("next_cursor", payload)
+
+    def test_keyset_pages_cover_every_upload_once(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            page = self.client.get("/app/api/dump-uploads/", params).json()
+            self.assertLessEqual(page["count"], 2)
+            seen.extend(page["uploads"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, list(self.client.get("/app/api/dump-uploads/").json()))
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get("/app/api/dump-uploads/", {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_streaming_modes(self):
+        default = self.client.get("/app/api/dump-uploads/").json()
+
+        ndjson = self.client.get("/app/api/dump-uploads/", {"stream": "ndjson"})
+        rows = [json.loads(line) for line in b"".join(ndjson.streaming_content).splitlines()]
+        self.assertEqual({row["id"]: row for row in rows}, default)
+
+        streamed = self.client.get("/app/api/dump-uploads/", {"stream": "json"})
+        self.assertEqual(json.loads(b"".join(streamed.streaming_content)), default)
+
+    def test_streaming_empty_table_matches_default(self):
+        Upload.objects.all().delete()
+        streamed = self.client.get("/app/api/dump-uploads/", {"stream": "json"})
+        self.assertEqual(
+            json.loads(b"".join(streamed.streaming_content)),
+            self.client.get("/app/api/dump-uploads/").json(),
+        )
+
+    def test_filters_run_in_sql(self):
+        response = self.client.get("/app/api/dump-uploads/", {"institution": "Institution 3", "year": "2024-2025"})
+        self.assertEqual([row["institution"] for row in response.json().values()], ["Institution 3"])
+
+        self.assertEqual(len(self.client.get("/app/api/dump-uploads/", {"user": "harvester"}).json()), 5)
+        self.assertEqual(self.client.get("/app/api/dump-uploads/", {"user": "nobody"}).json()["count"], 0)
+        self.assertEqual(self.client.get("/app/api/dump-uploads/", {"until": "2000-01-01"}).json()["count"], 0)
+        self.assertEqual(self.client.get("/app/api/dump-uploads/", {"since": "2000-01-01"}).status_code, 200)
+        self.assertEqual(self.client.get("/app/api/dump-uploads/", {"since": "yesterday"}).status_code, 400)
+
+    def test_listing_queries_use_indexes(self):
+        uploads = Upload.objects.select_related("user").order_by("-uploaded_at", "-id")
+        cases = {
+            "upload_recent_idx": {},
+            "upload_institution_year_idx": {"institution": "Institution 3", "year": "2024-2025"},
+            "upload_year_idx": {"year": "2024-2025"},
+            "upload_user_recent_idx": {"user": "harvester"},
+        }
+        for index, params in cases.items():
+            with self.subTest(index=index):
+                plan = dumps.filter_uploads(uploads, params).explain()
+                self.assertIn(index, plan)
+                self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", plan)
+
+    def test_download_archive_streams_a_zip_of_the_selection(self):
+        big = Upload.objects.create(
+            user=self.user,
+            institution="Institution 1",
+            year="2023-2024",
+            file=SimpleUploadedFile("cds_1.txt", os.urandom(300 * 1024)),
+            original_filename="cds_1.txt",
+        )
+        small = Upload.objects.get(institution="Institution 1", year="2024-2025")
+
+        response = self.client.get("/app/api/download-archive/", {"institution": "Institution 1", "manifest": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        chunks = list(response.streaming_content)
+        self.assertLess(max(len(chunk) for chunk in chunks), 100 * 1024)
+
+        with zipfile.ZipFile(BytesIO(b"".join(chunks))) as archive:
+            self.assertIsNone(archive.testzip())
+            names = [f"{big.id[:12]}_cds_1.txt", f"{small.id[:12]}_cds_1.txt", "manifest.json"]
+            self.assertEqual(sorted(archive.namelist()), sorted(names))
+            self.assertEqual(archive.read(names[0]), big.file.open("rb").read())
+            self.assertEqual(archive.read(names[1]), b"document 1")
+            manifest = json.loads(archive.read("manifest.json"))
+        self.assertEqual(manifest["count"], 2)
+        self.assertEqual(manifest["uploads"][small.id]["archive_name"], names[1])
+        self.assertEqual(manifest["uploads"][small.id]["download_url"], f"/app/api/download/{small.id}")
+        big.file.close()
+
+        response = self.client.post(
+            "/app/api/download-archive/", {"ids": [small.id, "missing"]}, content_type="application/json"
+        )
+        with zipfile.ZipFile(BytesIO(b"".join(response.streaming_content))) as archive:
+            self.assertEqual(archive.namelist(), [names[1]])
+
+        self.assertEqual(self.client.get("/app/api/download-archive/").status_code, 400)
+        self.assertEqual(self.client.get("/app/api/download-archive/", {"since": "soon"}).status_code, 400)
+
+
+class StatsApiTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+        self.client = Client()
+        self.user = User.objects.create_user(username="harvester", password="pass12345")
+        self.curator = User.objects.create_user(username="curator", password="pass12345")
+        self.curator.profile.is_curator = True
+        self.curator.profile.save()
+        self.client.login(username="curator", password="pass12345")
+
+    def add_upload(self, institution, year, **fields):
+        upload = Upload.objects.create(
+            id=hashlib.sha256(f"{institution} {year} {fields}".encode()).hexdigest(),
+            user=self.user,
+            institution=institution,
+            year=year,
+            file=SimpleUploadedFile("cds.txt", f"{institution} {year} {fields}".encode()),
+        )
+        store_result(upload, {**EXPECTED_FIELDS, **fields})
+        return upload
+
+    def test_summaries_follow_latest_result_per_institution_and_year(self):
+        first = self.add_upload("Alpha", "2023-2024", men_applied=100, men_admitted=10)
+        self.add_upload("Alpha", "2023-2024", men_applied=200, men_admitted=50, tuition_undergraduates=1000)
+        Upload.objects.filter(pk=first.pk).update(uploaded_at=first.uploaded_at.replace(year=2000))
+        InstitutionYearSummary.objects.refresh([("Alpha", "2023-2024")])
+
+        summary = InstitutionYearSummary.objects.get(institution="Alpha", year="2023-2024")
+        self.assertEqual((summary.uploads, summary.men_applied, summary.tuition_undergraduates), (2, 200, 1000))
+        result = ExtractionResult.objects.get(upload=first)
+        self.assertEqual((result.men_applied, result.men_admitted, result.women_applied), (100, 10, None))
+
+        Upload.objects.exclude(pk=first.pk).delete()
+        summary.refresh_from_db()
+        self.assertEqual((summary.uploads, summary.men_applied), (1, 100))
+        first.delete()
+        self.assertFalse(InstitutionYearSummary.objects.exists())
+
+    def test_refresh_reads_only_the_given_groups(self):
+        for institution, year in [("Alpha", "2023-2024"), ("Alpha", "2024-2025"), ("Beta", "2024-2025")]:
+            self.add_upload(institution, year, men_applied=len(institution + year))
+        InstitutionYearSummary.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            InstitutionYearSummary.objects.refresh([("Alpha", "2023-2024"), ("Beta", "2024-2025")])
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn(" IN (", queries[0]["sql"])
+        self.assertEqual(
+            sorted(InstitutionYearSummary.objects.values_list("institution", "year")),
+            [("Alpha", "2023-2024"), ("Beta", "2024-2025")],
+        )
+
+    def test_stats_are_aggregated_in_sql(self):
+        self.add_upload("Alpha", "2023-2024", men_applied=100, men_admitted=10, women_applied=100, women_admitted=30)
+        self.add_upload("Beta", "2023-2024", men_applied=300, men_admitted=30, tuition_undergraduates=30000)
+        self.add_upload("Alpha", "2024-2025", tuition_undergraduates=10000)
+        self.add_upload("Beta", "2024-2025", tuition_undergraduates=20000)
+        self.add_upload("Gamma", "2024-2025", tuition_undergraduates=40000)
+        self.add_upload("Delta", "2024-2025", tuition_undergraduates=60000, men_applied=50)
+
+        # Session, user and profile, then one query per aggregate.
+        with self.assertNumQueries(6):
+            payload = self.client.get("/app/api/stats/").json()
+        self.assertEqual(payload["extractor_version"], EXTRACTOR_VERSION)
+        overall = payload["admit_rates"]["overall"]
+        self.assertAlmostEqual(overall["men"], 40 / 400)
+        self.assertAlmostEqual(overall["women"], 0.3)
+        self.assertAlmostEqual(overall["total"], 70 / 500)
+        self.assertIsNone(overall["unknown_gender"])
+        self.assertIsNone(payload["admit_rates"]["by_year"]["2024-2025"]["men"])
+        self.assertEqual(payload["median"]["field"], "tuition_undergraduates")
+        self.assertEqual(payload["median"]["by_year"], {"2023-2024": 30000, "2024-2025": 30000})
+        self.assertNotIn("series", payload)
+
+        payload = self.client.get("/app/api/stats/", {"institution": "Alpha"}).json()
+        self.assertAlmostEqual(payload["admit_rates"]["overall"]["total"], 40 / 200)
+        self.assertEqual(list(payload["series"]), ["Alpha"])
+        self.assertEqual(
+            [(row["year"], row["tuition_undergraduates"]) for row in payload["series"]["Alpha"]],
+            [("2023-2024", None), ("2024-2025", 10000)],
+        )
+
+        narrowed = self.client.get("/app/api/stats/", {"year": "2024-2025", "field": "men_applied"}).json()
+        self.assertEqual(list(narrowed["admit_rates"]["by_year"]), ["2024-2025"])
+        self.assertEqual(narrowed["median"]["by_year"], {"2024-2025": 50})
+
+    def test_stats_reject_unknown_fields_and_harvesters(self):
+        self.assertEqual(self.client.get("/app/api/stats/", {"field": "fields"}).status_code, 400)
+        self.client.login(username="harvester", password="pass12345")
+        self.assertEqual(self.client.get("/app/api/stats/").status_code, 403)
+
+    def test_refresh_stats_fills_columns_and_rebuilds_summaries(self):
+        upload = Upload.objects.create(
+            id="a" * 64, user=self.user, institution="Alpha", year="2023-2024",
+            file=SimpleUploadedFile("cds.txt", b"document"),
+        )
+        ExtractionResult.objects.create(
+            upload=upload, extractor_version=EXTRACTOR_VERSION, fields={**EXPECTED_FIELDS, "men_applied": 7}
+        )
+        self.assertFalse(InstitutionYearSummary.objects.exists())
+
+        out = StringIO()
+        call_command("refresh_stats", stdout=out)
+        self.assertIn("Filled columns for 1 results; refreshed 1 institution/year summaries", out.getvalue())
+        self.assertEqual(ExtractionResult.objects.get().men_applied, 7)
+        self.assertEqual(InstitutionYearSummary.objects.get().men_applied, 7)
+
+
+class UserProvisioningTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.curator = User.objects.create_user(username="curator", email="curator@example.com", password="pass12345")
+        self.curator.profile.is_curator = True
+        self.curator.profile.save()
+
+    def test_create_user_signs_up_and_logs_in(self):
+        form = {"email": "new@example.com", "user_name": "new", "password": "pass12345", "is_curator": "1"}
+        response = self.client.post("/app/api/createUser/", form)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.get("/app/api/uploads-check/").json()["user"], "new")
+        self.assertTrue(User.objects.get(username="new").profile.is_curator)
+
+        response = self.client.post("/app/api/createUser/", {**form, "user_name": "other"})
+        self.assertEqual((response.status_code, response.content), (400, b"email already used"))
+
+    def test_create_users_reports_each_row(self):
+        self.client.login(username="curator", password="pass12345")
+        rows = [
+            {"email": "a@example.com", "user_name": "alice", "password": "pass12345"},
+            {"email": "b@example.com", "user_name": "bob", "password": "pass12345", "is_curator": True},
+            {"email": "curator@example.com", "user_name": "carol", "password": "pass12345"},
+            {"email": "d@example.com", "user_name": "alice", "password": "pass12345"},
+            {"email": "e@example.com", "user_name": "eve", "password": "pass12345", "is_curator": "maybe"},
+            {"email": "f@example.com", "user_name": "frank"},
+            "not a row",
+        ]
+        # Session, user and role, one existence check, then users and
+        # profiles inserted within a savepoint.
+        with self.assertNumQueries(8):
+            response = self.client.post("/app/api/createUsers/", {"users": rows}, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        payload = response.json()
+        self.assertEqual((payload["created"], payload["failed"]), (2, 5))
+        self.assertEqual(
+            [result.get("error", result["status"]) for result in payload["results"]],
+            [
+                "created",
+                "created",
+                "email already used",
+                "username already used",
+                "is_curator must be 0 or 1",
+                "All fields required",
+                "row must be an object",
+            ],
+        )
+
+        bob = User.objects.get(username="bob")
+        self.assertEqual(payload["results"][1]["id"], bob.pk)
+        self.assertTrue(bob.check_password("pass12345"))
+        self.assertTrue(bob.profile.is_curator)
+        self.assertFalse(User.objects.get(username="alice").profile.is_curator)
+
+        response = self.client.post("/app/api/createUsers/", {"users": []}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.client.login(username="alice", password="pass12345")
+        response = self.client.post("/app/api/createUsers/", {"users": rows}, content_type="application/json")
+        self.assertEqual(response.status_code, 403)
+
+    def test_concurrent_sign_up_fails_only_its_own_row(self):
+        insert = provisioning._insert
+
+        def sign_up_first(users, accepted):
+            # A sign-up that claims "bob" between the check and the insert.
+            if not User.objects.filter(username="bob").exists():
+                User.objects.create_user(username="bob", password="pass12345")
+            insert(users, accepted)
+
+        rows = [
+            {"email": "a@example.com", "user_name": "alice", "password": "pass12345"},
+            {"email": "b@example.com", "user_name": "bob", "password": "pass12345"},
+        ]
+        with mock.patch.object(provisioning, "_insert", side_effect=sign_up_first):
+            outcomes = provisioning.provision_users(rows, max_workers=1)
+
+        self.assertEqual([error for user, error in outcomes], [None, "username already used"])
+        self.assertEqual(outcomes[0][0], User.objects.get(username="alice"))
+        self.assertFalse(User.objects.get(username="alice").profile.is_curator)
+
+    def test_create_users_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("email,user_name,password,is_curator\n")
+            f.write("a@example.com,alice,pass12345,0\n")
+            f.write("curator@example.com,carol,pass12345,1\n")
+        self.addCleanup(os.unlink, f.name)
+
+        out, err = StringIO(), StringIO()
+        call_command("create_users", f.name, stdout=out, stderr=err)
+        self.assertIn("Created 1 users (1 failed)", out.getvalue())
+        self.assertIn("Line 3 (carol): email already used", err.getvalue())
+        self.assertTrue(User.objects.filter(username="alice").exists())
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.media_root = Path(media_root.name)
+        self.user = User.objects.create_user(username="harvester", password="pass12345")
+
+    def create_upload(self, content, **kwargs):
+        return Upload.objects.create(
+            user=self.user,
+            institution="UChicago",
+            year="2024-2025",
+            file=SimpleUploadedFile("cds.txt", content),
+            **kwargs,
+        )
+
+    def test_same_content_is_stored_once(self):
+        first = content_addressed_storage.save("uploads/a.txt", ContentFile(b"same", name="a.txt"))
+        second = content_addressed_storage.save("uploads/b.txt", ContentFile(b"same", name="b.txt"))
+
+        self.assertEqual(first, second)
+        self.assertEqual(len([path for path in self.media_root.rglob("*") if path.is_file()]), 1)
+
+    def test_file_removed_with_its_last_reference(self):
+        upload = self.create_upload(b"shared content")
+        legacy = self.create_upload(b"shared content", id="legacy-id", content_sha256="not-a-hash")
+        self.assertEqual(legacy.file.name, upload.file.name)
+        self.assertEqual(content_addressed_storage.reference_counts([upload.file.name])[upload.file.name], 2)
+
+        upload.delete()
+        self.assertTrue(content_addressed_storage.exists(legacy.file.name))
+        legacy.delete()
+        self.assertFalse(content_addressed_storage.exists(legacy.file.name))
+
+    def test_gc_media_removes_unreferenced_files(self):
+        upload = self.create_upload(b"kept")
+        orphan = self.media_root / "uploads" / "2026" / "03" / "fixture_orphan.txt"
+        orphan.parent.mkdir(parents=True)
+        orphan.write_bytes(b"orphan")
+        other = self.media_root / "avatars" / "placeholder.png"
+        other.parent.mkdir(parents=True)
+        other.write_bytes(b"not an upload")
+
+        out = StringIO()
+        call_command("gc_media", "--dry-run", "--min-age", "0", stdout=out)
+        self.assertIn("uploads/2026/03/fixture_orphan.txt", out.getvalue())
+        self.assertTrue(orphan.exists())
+
+        call_command("gc_media", "--min-age", "0", "--batch-size", "1", stdout=StringIO())
+        self.assertFalse(orphan.exists())
+        self.assertFalse(orphan.parent.exists())
+        self.assertTrue(content_addressed_storage.exists(upload.file.name))
+        self.assertTrue(other.exists())
+
+
+class ImportCdsTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.user = User.objects.create_user(username="harvester", password="pass12345")
+
+    def test_import_cds_bulk_loads_and_resumes(self):
+        archive = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        files = {
+            "UChicago/2023-2024/cds.pdf": b"%PDF uchicago 2023",
+            "UChicago/2024-2025/cds.pdf": b"%PDF uchicago 2024",
+            "Northwestern/2024-2025/cds.txt": b"northwestern 2024",
+            "Northwestern/2024-2025/copy.txt": b"northwestern 2024",
+        }
+        for relative, content in files.items():
+            (archive / relative).parent.mkdir(parents=True, exist_ok=True)
+            (archive / relative).write_bytes(content)
+        existing = Upload.objects.create(
+            user=self.user,
+            institution="UChicago",
+            year="2023-2024",
+            file=SimpleUploadedFile("cds.pdf", b"%PDF uchicago 2023"),
+        )
+        checkpoint = Path(self.enterContext(tempfile.TemporaryDirectory())) / "import.checkpoint"
+
+        out = StringIO()
+        call_command(
+            "import_cds", str(archive), "--user", "harvester", "--enqueue",
+            "--batch-size", "2", "--checkpoint", str(checkpoint), stdout=out, stderr=StringIO(),
+        )
+
+        self.assertIn("Imported 2 uploads (2 already stored, 0 failed)", out.getvalue())
+        imported = Upload.objects.exclude(pk=existing.pk)
+        self.assertEqual(
+            set(imported.values_list("institution", "year")),
+            {("UChicago", "2024-2025"), ("Northwestern", "2024-2025")},
+        )
+        for upload in imported:
+            self.assertEqual(upload.id, hashlib.sha256(upload.file.read()).hexdigest())
+            upload.file.close()
+        self.assertEqual(ExtractionJob.objects.filter(upload__in=imported).count(), 2)
+        self.assertEqual(len(checkpoint.read_text().splitlines()), 4)
+
+        (archive / "UChicago/2025-2026").mkdir()
+        (archive / "UChicago/2025-2026/cds.pdf").write_bytes(b"%PDF uchicago 2025")
+        out = StringIO()
+        call_command("import_cds", str(archive), "--user", "harvester", "--checkpoint", str(checkpoint), stdout=out)
+        self.assertIn("Imported 1 uploads (0 already stored, 0 failed)", out.getvalue())
+
+        manifest = archive / "manifest.csv"
+        manifest.write_text(
+            "institution,year,url,path\nRice,2024-2025,https://example.com/rice.pdf,rice.pdf\n"
+        )
+        (archive / "rice.pdf").write_bytes(b"%PDF rice")
+        call_command("import_cds", str(manifest), "--user", "harvester", stdout=StringIO())
+        rice = Upload.objects.get(institution="Rice")
+        self.assertEqual(rice.url, "https://example.com/rice.pdf")
+        self.assertEqual(rice.original_filename, "rice.pdf")
+
+    def test_import_cds_nested_tree_and_vanishing_files(self):
+        archive = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        files = {
+            "UChicago/2024-2025/appendix/cds.pdf": b"%PDF nested",
+            "Rice/2024-2025/gone.pdf": b"%PDF gone",
+            "Rice/2024-2025/moved.pdf": b"%PDF moved",
+        }
+        for relative, content in files.items():
+            (archive / relative).parent.mkdir(parents=True, exist_ok=True)
+            (archive / relative).write_bytes(content)
+
+        hash_path = import_cds.hash_path
+
+        def remove_after_hashing(path):
+            # One file disappears before it is read, one right after.
+            if path.name == "gone.pdf":
+                path.unlink()
+            digest = hash_path(path)
+            if path.name == "moved.pdf":
+                path.unlink()
+            return digest
+
+        out, err = StringIO(), StringIO()
+        with mock.patch.object(import_cds, "hash_path", side_effect=remove_after_hashing):
+            call_command("import_cds", str(archive), "--user", "harvester", stdout=out, stderr=err)
+
+        self.assertIn("Imported 1 uploads (0 already stored, 2 failed)", out.getvalue())
+        self.assertIn("gone.pdf", err.getvalue())
+        self.assertIn("moved.pdf", err.getvalue())
+        self.assertEqual(list(Upload.objects.values_list("institution", "year")), [("UChicago", "2024-2025")])
+
+
+FAKE_PDFTOTEXT = """#!{python}
+import os
+import sys
+import time
+
+args = sys.argv[1:]
+with open(os.environ["FAKE_PDFTOTEXT_LOG"], "a") as log:
+    log.write(" ".join(args) + "\\n")
+mode = os.environ.get("FAKE_PDFTOTEXT_MODE", "text")
+if mode == "hang":
+    time.sleep(30)
+elif mode == "flood":
+    sys.stdout.write("x" * 100000)
+else:
+    pages = os.environ["FAKE_PDFTOTEXT_TEXT"].split("\\f")
+    first = int(args[args.index("-f") + 1]) if "-f" in args else 1
+    last = int(args[args.index("-l") + 1]) if "-l" in args else len(pages)
+    for page in pages[first - 1 : last]:
+        sys.stdout.write(page + "\\f")
+"""
+
+
+def install_fake_pdftotext(test, mode="text", text=SAMPLE_TEXT):
+    """
+    Put a stand-in pdftotext executable first on PATH for the rest of
+    ``test``; returns the file each invocation's arguments are logged to.
+    """
+    bin_dir = tempfile.TemporaryDirectory()
+    test.addCleanup(bin_dir.cleanup)
+    script = Path(bin_dir.name) / "pdftotext"
+    script.write_text(FAKE_PDFTOTEXT.format(python=sys.executable))
+    script.chmod(0o755)
+
+    log = Path(bin_dir.name) / "calls.log"
+    log.touch()
+    test.enterContext(
+        mock.patch.dict(
+            os.environ,
+            {
+                "PATH": bin_dir.name + os.pathsep + os.environ.get("PATH", ""),
+                "FAKE_PDFTOTEXT_LOG": str(log),
+                "FAKE_PDFTOTEXT_MODE": mode,
+                "FAKE_PDFTOTEXT_TEXT": text,
+            },
+        )
+    )
+    test.enterContext(
+        override_settings(
+            EXTRACTION_PDF_CONVERTER="pdftotext",
+            EXTRACTION_TEXT_CACHE_DIR=Path(bin_dir.name) / "cache",
+        )
+    )
+    return log
+
+
 class ExtractionTests(TestCase):
     def test_text_extraction(self):
         with tempfile.TemporaryDirectory() as tmpdir:
@@ -116,3 +1174,243 @@ class ExtractionTests(TestCase):
         self.assertEqual(extracted["women_applied"], 23636)
         self.assertEqual(extracted["required_fees_undergraduates"], 1941)
         self.assertIsNone(extracted["housing_only_on_campus_undergraduates"])
+
+    def test_text_and_file_extraction_agree(self):
+        tmpdir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        for text in (SAMPLE_TEXT, WRAPPED_TEXT):
+            path = tmpdir / "fixture.txt"
+            path.write_text(text)
+            self.assertEqual(extract_fields_from_file(str(path)), extract_fields_from_text(text))
+
+        extracted = extract_fields_from_text(WRAPPED_TEXT)
+        self.assertIsNone(extracted["men_applied"])
+        self.assertEqual(extracted["women_applied"], 5112)
+        self.assertEqual(extracted["degree_seeking_undergraduate_students"], 6002)
+
+    def test_fields_are_only_searched_within_their_section(self):
+        text = (
+            "B1 Prior year\nTotal first-time, first-year men who applied 11,111\n"
+            + SAMPLE_TEXT.replace("Total first-time, first-year unknown gender who applied 781\n", "")
+            + "\fI1 Faculty of unknown rank who applied for leave 12\n"
+        )
+        extracted = extract_fields_from_text(text)
+        self.assertEqual(extracted["men_applied"], 19195)
+        self.assertIsNone(extracted["unknown_gender_applied"])
+        self.assertEqual(extracted["average_financial_aid_package"], 78883)
+
+        # Without a C1 header the whole document is searched, as before.
+        headless = text.replace("\nC1:\n", "\n")
+        self.assertEqual(extract_fields_from_text(headless)["men_applied"], 11111)
+        self.assertEqual(extract_fields_from_text(headless)["unknown_gender_applied"], 12)
+
+        path = Path(self.enterContext(tempfile.TemporaryDirectory())) / "fixture.txt"
+        for document in (text, headless):
+            path.write_text(document)
+            for chunk_chars in (16, 4096):
+                fields = dict(EXPECTED_FIELDS)
+                for section_fields in match_file(SECTION_MATCHERS, str(path), chunk_chars):
+                    fields.update(section_fields)
+                self.assertEqual(fields, extract_fields_from_text(document))
+
+    def test_header_cut_at_a_chunk_edge_is_not_taken_for_the_section(self):
+        # The first 64-character read ends in "H2" of the "H2A" header, so
+        # there is no H2 section and the whole file is searched.
+        text = "x\n" * 31 + "H2A: Cohort\nJ. The average financial aid package of those in line d 77\n"
+        self.assertEqual(text[62:64], "H2")
+        path = Path(self.enterContext(tempfile.TemporaryDirectory())) / "fixture.txt"
+        path.write_text(text)
+
+        _c1, _g1, h2 = match_file(SECTION_MATCHERS, str(path), 64)
+        self.assertEqual(h2["average_financial_aid_package"], 77)
+        self.assertEqual(extract_fields_from_text(text)["average_financial_aid_package"], 77)
+
+    def test_file_extraction_reads_in_chunks_with_flat_memory(self):
+        tmpdir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        path = tmpdir / "fixture.txt"
+        for text in (SAMPLE_TEXT, WRAPPED_TEXT):
+            path.write_bytes(text.replace("\n", "\r\n").encode())
+            expected = extract_fields_from_text(text)
+            # Chunks far smaller than a line still see each label's lookahead.
+            for chunk_chars in (5, 64, 4096):
+                c1, g1, h2 = match_file(SECTION_MATCHERS, str(path), chunk_chars)
+                self.assertEqual({**c1, **g1, **h2}, expected)
+
+        large = tmpdir / "large.txt"
+        large.write_text("Common Data Set filler line without any labels\n" * 100000 + SAMPLE_TEXT)
+        tracemalloc.start()
+        try:
+            extracted = extract_fields_from_file(str(large))
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(extracted, extract_fields_from_text(SAMPLE_TEXT))
+        self.assertLess(peak, large.stat().st_size / 2)
+
+    def make_pdf(self, content=b"%PDF-1.4 fake"):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        pdf = Path(directory.name) / "cds.pdf"
+        pdf.write_bytes(content)
+        return pdf
+
+    def test_pdf_text_is_converted_once_into_the_cache(self):
+        log = install_fake_pdftotext(self)
+        pdf = self.make_pdf()
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda _: extract_fields_from_file(str(pdf)), range(4)))
+
+        scan, conversion = log.read_text().splitlines()
+        self.assertNotIn("-layout", scan)
+        self.assertIn("-layout", conversion)
+        self.assertEqual(results[0]["men_applied"], 19195)
+        self.assertTrue(all(result == results[0] for result in results))
+        self.assertFalse(Path(str(pdf) + ".txt").exists())
+
+    def test_conversion_is_limited_to_max_pages(self):
+        self.enterContext(override_settings(EXTRACTION_MAX_PAGES=3))
+        log = install_fake_pdftotext(self)
+        pdf_to_text(str(self.make_pdf()))
+        self.assertIn("-l 3", log.read_text())
+
+    def test_only_section_pages_are_converted(self):
+        c1, g1, h2 = SAMPLE_TEXT.split("\n\n")
+        pages = ["Table of contents"] * 10
+        pages[2], pages[5], pages[6] = c1, g1, h2
+        log = install_fake_pdftotext(self, text="\f".join(pages))
+        pdf = self.make_pdf()
+
+        extracted, section_pages = extract_fields_and_sections(str(pdf))
+
+        self.assertEqual(section_pages, {"C1": [3], "G1": [6], "H2": [7]})
+        self.assertEqual(extracted["men_applied"], 19195)
+        self.assertEqual(extracted["tuition_undergraduates"], 71325)
+        self.assertEqual(extracted["average_financial_aid_package"], 78883)
+        scan, *conversions = log.read_text().splitlines()
+        self.assertEqual(scan, f"-f 1 -l 8 {pdf} -")
+        self.assertEqual(conversions, [f"-layout -f 3 -l 4 {pdf} -", f"-layout -f 6 -l 8 {pdf} -"])
+
+        # A stored section map skips the scan on later runs.
+        log.write_text("")
+        extract_fields_from_file(str(pdf), content_sha256="0" * 64, section_pages=section_pages)
+        self.assertEqual(len(log.read_text().splitlines()), 2)
+
+    def test_section_scan_stops_early_and_is_capped(self):
+        c1, g1, h2 = SAMPLE_TEXT.split("\n\n")
+        pages = ["Filler page"] * 100
+        pages[2], pages[5], pages[9] = c1, g1, h2
+        log = install_fake_pdftotext(self, text="\f".join(pages))
+        pdf = self.make_pdf()
+
+        extracted, section_pages = extract_fields_and_sections(str(pdf))
+        self.assertEqual(section_pages, {"C1": [3], "G1": [6], "H2": [10]})
+        self.assertEqual(extracted["average_financial_aid_package"], 78883)
+        scans = [call for call in log.read_text().splitlines() if "-layout" not in call]
+        self.assertEqual(scans, [f"-f 1 -l 8 {pdf} -", f"-f 9 -l 16 {pdf} -"])
+
+        # Without H2 the scan gives up after EXTRACTION_LOCATE_MAX_PAGES and
+        # the whole document is converted.
+        self.enterContext(override_settings(EXTRACTION_LOCATE_MAX_PAGES=20))
+        pages[9] = "Filler page"
+        log = install_fake_pdftotext(self, text="\f".join(pages))
+        _extracted, section_pages = extract_fields_and_sections(str(pdf))
+        self.assertEqual(section_pages, {"C1": [3], "G1": [6]})
+        calls = log.read_text().splitlines()
+        self.assertEqual(calls[:-1], [f"-f 1 -l 8 {pdf} -", f"-f 9 -l 16 {pdf} -", f"-f 17 -l 20 {pdf} -"])
+        self.assertEqual(calls[-1], f"-layout -l 200 {pdf} -")
+
+    def test_hanging_conversion_times_out(self):
+        self.enterContext(override_settings(EXTRACTION_CONVERSION_TIMEOUT=0.5))
+        install_fake_pdftotext(self, mode="hang")
+        conversion_metrics.reset()
+
+        with self.assertRaises(ConversionTimeout):
+            pdf_to_text(str(self.make_pdf()))
+        self.assertEqual(conversion_metrics.snapshot()["timeouts"], 1)
+
+    def test_oversized_conversion_output_is_rejected(self):
+        self.enterContext(override_settings(EXTRACTION_MAX_TEXT_BYTES=1000))
+        install_fake_pdftotext(self, mode="flood")
+
+        with self.assertRaises(ConversionError):
+            pdf_to_text(str(self.make_pdf()))
+
+    def test_auto_converter_prefers_the_killable_command(self):
+        with mock.patch.object(PdftotextLibraryConverter, "available", return_value=True):
+            with mock.patch.object(PdftotextSubprocessConverter, "available", return_value=True):
+                self.assertIsInstance(_select_converter("auto"), PdftotextSubprocessConverter)
+            with mock.patch.object(PdftotextSubprocessConverter, "available", return_value=False):
+                self.assertIsInstance(_select_converter("auto"), PdftotextLibraryConverter)
+
+    def test_text_cache_evicts_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = TextCache(tmpdir, max_bytes=30)
+            keys = [TextCache.key(str(i), ()) for i in range(3)]
+            for age, key in enumerate(keys):
+                path = cache.get_or_create(key, lambda tmp: tmp.write_text("x" * 10))
+                os.utime(path, (1000 + age, 1000 + age))
+            cache.get_or_create(keys[0], lambda tmp: self.fail("cache hit expected"))
+            cache.max_bytes = 25
+            cache.evict()
+
+            self.assertTrue(cache.path(keys[0]).exists())
+            self.assertFalse(cache.path(keys[1]).exists())
+            self.assertTrue(cache.path(keys[2]).exists())
+
+    def test_text_cache_counts_its_size_only_past_the_limit(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = TextCache(tmpdir, max_bytes=50)
+            with mock.patch.object(cache, "evict", wraps=cache.evict) as evict:
+                for i in range(5):
+                    cache.get_or_create(TextCache.key(str(i), ()), lambda tmp: tmp.write_text("x" * 10))
+                self.assertEqual(evict.call_count, 1)
+
+                cache.get_or_create(TextCache.key("5", ()), lambda tmp: tmp.write_text("x" * 10))
+                self.assertEqual(evict.call_count, 2)
+            self.assertLessEqual(sum(path.stat().st_size for path in Path(tmpdir).glob("*/*.txt")), 45)
+
+    def test_text_cache_reads_an_evicted_entry_as_a_miss(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = TextCache(tmpdir, max_bytes=1000)
+            key = TextCache.key("evicted", ())
+            get_or_create = cache.get_or_create
+            evicted = [Path(tmpdir) / "gone.txt"]
+
+            def lookup(key, produce):
+                return evicted.pop() if evicted else get_or_create(key, produce)
+
+            with mock.patch.object(cache, "get_or_create", side_effect=lookup):
+                self.assertEqual(cache.read_text(key, lambda tmp: tmp.write_text("text")), "text")
+
+
+class SyntheticDataTests(TestCase):
+    def test_extractor_recovers_synthetic_fields(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            document = generate_document(rng, pages=3, lines_per_page=20, wrap_rate=0.4, missing_rate=0.2)
+            self.assertEqual(extract_fields_from_text(document.text), document.fields)
+
+        pages = document.text.split("\f")
+        for section, (page,) in document.section_pages.items():
+            self.assertTrue(pages[page - 1].lstrip("\n").startswith(section))
+
+    def test_generate_cds_bulk_creates_users_and_uploads(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+        args = ["generate_cds", "--count", "12", "--users", "3", "--seed", "5", "--pages", "2", "--batch-size", "5"]
+        with self.assertNumQueries(18):
+            call_command(*args, stdout=StringIO())
+
+        self.assertEqual(Upload.objects.count(), 12)
+        self.assertEqual(User.objects.filter(username__startswith="synthetic", profile__isnull=False).count(), 3)
+        self.assertTrue(User.objects.get(username="synthetic0000").check_password("testpass123"))
+        upload = Upload.objects.first()
+        self.assertEqual(upload.id, hashlib.sha256(upload.file.read()).hexdigest())
+        upload.file.close()
+
+        out = StringIO()
+        call_command(*args, stdout=out)
+        self.assertIn("Created 0 synthetic uploads", out.getvalue())
+        self.assertEqual(Upload.objects.count(), 12)
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+
+LOCK_STRIPES = 256
+# An eviction pass trims the cache to this fraction of ``max_bytes``, so the
+# next pass is only due after that much more text has been written.
+EVICT_TO = 0.9
+
+
+class TextCache:
+    """
+    Converted document text on disk, keyed by source content hash and
+    converter options.
+
+    Entries are written to a temporary file and renamed into place, so readers
+    never see partial text. Creation of an entry holds a lock (shared by
+    threads and processes through ``flock``) so each conversion runs at most
+    once however many requests ask for it at the same time. When the cache
+    grows past ``max_bytes`` the least recently used entries are removed.
+
+    The size is counted by walking the cache only when the running total
+    (the last count plus what this process has written since) crosses
+    ``max_bytes``, not on every write. Other processes' writes are picked up
+    at the next count. An entry can be evicted between lookup and read; use
+    ``read_text``, or treat a FileNotFoundError on the returned path as a
+    miss.
+    """
+
+    def __init__(self, directory, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._thread_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._size_lock = threading.Lock()
+        # Bytes in the cache as last counted plus those written since; None
+        # until the first count.
+        self._size = None
+
+    @staticmethod
+    def key(content_sha256: str, options: Iterable[str]) -> str:
+        return hashlib.sha256("\0".join([content_sha256, *options]).encode()).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.txt"
+
+    @contextmanager
+    def _lock(self, key: str):
+        stripe = int(key[:2], 16) % LOCK_STRIPES
+        with self._thread_locks[stripe]:
+            if fcntl is None:
+                yield
+                return
+            lock_dir = self.directory / "locks"
+            lock_dir.mkdir(parents=True, exist_ok=True)
+            with open(lock_dir / f"{stripe:02x}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _touch(path: Path) -> bool:
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def get_or_create(self, key: str, produce: Callable[[Path], None]) -> Path:
+        """
+        Return the path of the entry for ``key``, calling ``produce(tmp_path)``
+        to write it first if it is missing.
+        """
+        path = self.path(key)
+        if self._touch(path):
+            return path
+
+        with self._lock(key):
+            if self._touch(path):
+                return path
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            os.close(fd)
+            try:
+                produce(Path(tmp_name))
+                size = os.path.getsize(tmp_name)
+                os.replace(tmp_name, path)
+            except BaseException:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+
+        with self._size_lock:
+            if self._size is not None:
+                self._size += size
+            due = self._size is None or self._size > self.max_bytes
+        if due:
+            self.evict()
+        return path
+
+    def read_text(self, key: str, produce: Callable[[Path], None]) -> str:
+        """Like ``get_or_create``, but return the entry's text."""
+        try:
+            return self.get_or_create(key, produce).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            # Evicted by another process before it could be read: a miss.
+            return self.get_or_create(key, produce).read_text(encoding="utf-8")
+
+    def evict(self) -> int:
+        """
+        Count the cache and, once it is over ``max_bytes``, remove least
+        recently used entries until it is under EVICT_TO of that.
+        """
+        entries = []
+        total = 0
+        for path in self.directory.glob("*/*.txt"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        removed = 0
+        if total > self.max_bytes:
+            for _mtime, size, path in sorted(entries):
+                if total <= self.max_bytes * EVICT_TO:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+        with self._size_lock:
+            self._size = total
+        return removed
@@ -0,0 +1,40 @@
+import hashlib
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+class HashingUploadMixin:
+    """
+    Compute the SHA-256 of an uploaded file while it is being received, and
+    expose it as ``sha256`` on the resulting file object so the view never has
+    to read the body a second time.
+
+    Only the handler that actually consumes a chunk hashes it; chunks passed on
+    to the next handler in FILE_UPLOAD_HANDLERS are hashed there.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # Set before super(): MemoryFileUploadHandler raises StopFutureHandlers
+        # from new_file when it takes the file.
+        self.digest = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        remaining = super().receive_data_chunk(raw_data, start)
+        if remaining is None:
+            self.digest.update(raw_data)
+        return remaining
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        if uploaded_file is not None:
+            uploaded_file.sha256 = self.digest.hexdigest()
+        return uploaded_file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
@@ -8,14 +8,20 @@ urlpatterns = [
     path('index.html', views.index, name='index_html'),
     path('app/new/', views.new_user_form, name='new_user_form'),
     path('app/api/createUser/', views.create_user_api, name='create_user_api'),
+    path('app/api/createUsers/', views.create_users_api, name='create_users_api'),
     path('app/uploads/', views.uploads, name='uploads'),
     path('app/show-uploads/', views.show_uploads, name='show_uploads'),
     path('app/api/upload/', views.upload_api, name='upload_api'),
     path('app/api/download/<str:upload_id>', views.download_api, name='download_api'),
+    path('app/api/download-archive/', views.download_archive_api, name='download_archive_api'),
     path('app/api/process/<str:upload_id>', views.process_api, name='process_api'),
+    path('app/api/process-batch/', views.process_batch_api, name='process_batch_api'),
+    path('app/api/process-status/<str:upload_id>', views.process_status_api, name='process_status_api'),
     path('app/api/uploads-check/', views.uploads_api_check, name='uploads_api_check'),
     path('app/api/uploads-status/', views.uploads_status, name='uploads_status'),
     path('app/api/dump-uploads/', views.dump_uploads_api, name='dump_uploads_api'),
     path('app/api/dump-data/', views.dump_data_api, name='dump_data_api'),
+    path('app/api/stats/', views.stats_api, name='stats_api'),
+    path('app/api/metrics/', views.metrics_api, name='metrics_api'),
     path('app/api/knockknock/', views.knockknock_api, name='knockknock_api'),
 ]
@@ -1,5 +1,9 @@
-from django.contrib.auth import authenticate, login
-from django.contrib.auth.models import User
+import json
+
+from django.conf import settings
+from django.contrib.auth import login
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.http import (
     FileResponse,
     Http404,
@@ -7,14 +11,25 @@ from django.http import (
     HttpResponseBadRequest,
     HttpResponseForbidden,
     JsonResponse,
+    StreamingHttpResponse,
 )
 from django.shortcuts import get_object_or_404, render
 from django.utils import timezone
+from django.utils.http import content_disposition_header
 from django.views.decorators.http import require_GET, require_http_methods
 
+from . import downloads, dumps, metrics, stats
 from .decorators import api_login_required, curator_required
-from .extraction import EXPECTED_FIELDS, extract_fields_from_file
-from .models import Upload
+from .extraction import EXTRACTOR_VERSION, conversion_metrics
+from .models import ExtractionJob, InstitutionYearSummary, Upload, user_is_curator
+from .processing import (
+    build_process_payload,
+    enqueue_extraction,
+    extract_and_store,
+    get_cached_result,
+    iter_batch_results,
+)
+from .provisioning import provision_users
 from io import BytesIO
 
 
@@ -27,6 +42,7 @@ def get_current_time():
 def index(request):
     context = {
         "current_time": get_current_time(),
+        "is_curator": user_is_curator(request.user),
         "team_members": [
             {"name": "John Smith", "role": "Lead Developer"},
             {"name": "Jane Doe", "role": "Data Scientist"},
@@ -43,34 +59,48 @@ def new_user_form(request):
 
 @require_http_methods(["POST"])
 def create_user_api(request):
-    email = request.POST.get("email", "").strip()
-    username = request.POST.get("user_name", "").strip()
-    password = request.POST.get("password", "")
-    is_curator_str = request.POST.get("is_curator", "0")
-
-    if not all([email, username, password]):
-        return HttpResponseBadRequest("All fields required")
-
-    if User.objects.filter(email=email).exists():
-        return HttpResponseBadRequest("email already used")
+    row = {key: request.POST.get(key, "") for key in ("email", "user_name", "password")}
+    row["is_curator"] = request.POST.get("is_curator", "0")
+    [(user, error)] = provision_users([row], max_workers=1)
+    if error:
+        return HttpResponseBadRequest(error)
+
+    # The password was just set, so there is no need to hash it again to
+    # authenticate.
+    login(request, user, backend="django.contrib.auth.backends.ModelBackend")
+    return HttpResponse("success", status=201)
 
-    if User.objects.filter(username=username).exists():
-        return HttpResponseBadRequest("username already used")
 
+@curator_required
+@require_http_methods(["POST"])
+def create_users_api(request):
+    """
+    Create a batch of users from a JSON body ``{"users": [row, ...]}`` whose
+    rows take the createUser form fields. Each row is reported separately,
+    in order, as created or with the error that stopped it.
+    """
     try:
-        is_curator = bool(int(is_curator_str))
-    except ValueError:
-        return HttpResponseBadRequest("is_curator must be 0 or 1")
-
-    user = User.objects.create_user(username=username, email=email, password=password)
-    user.profile.is_curator = is_curator
-    user.profile.save()
-
-    auth_user = authenticate(request, username=username, password=password)
-    if auth_user:
-        login(request, auth_user)
-
-    return HttpResponse("success", status=201)
+        rows = json.loads(request.body or b"{}").get("users")
+    except (ValueError, AttributeError):
+        rows = None
+    if not isinstance(rows, list) or not rows:
+        return HttpResponseBadRequest("users must be a non-empty list")
+    if len(rows) > settings.USER_PROVISIONING_MAX_USERS:
+        return HttpResponseBadRequest(f"at most {settings.USER_PROVISIONING_MAX_USERS} users per request")
+
+    outcomes = provision_users(rows, settings.USER_PROVISIONING_WORKERS)
+    results = []
+    for row, (user, error) in zip(rows, outcomes):
+        username = row.get("user_name") if isinstance(row, dict) else None
+        if error:
+            results.append({"user_name": username, "status": "error", "error": error})
+        else:
+            results.append({"user_name": user.username, "status": "created", "id": user.pk})
+    created = sum(1 for user, _ in outcomes if user is not None)
+    return JsonResponse(
+        {"created": created, "failed": len(rows) - created, "results": results},
+        status=201 if created else 400,
+    )
 
 
 @require_GET
@@ -78,7 +108,7 @@ def uploads(request):
     if not request.user.is_authenticated:
         return HttpResponse("unauthorized", status=401)
 
-    if request.user.profile.is_curator:
+    if user_is_curator(request.user):
         return HttpResponseForbidden()
 
     return render(request, "uncommondata/uploads.html")
@@ -94,7 +124,7 @@ def show_uploads(request):
 def uploads_status(request):
     if not request.user.is_authenticated:
         return JsonResponse({"status": "unauthorized"}, status=401)
-    if request.user.profile.is_curator:
+    if user_is_curator(request.user):
         return JsonResponse({"status": "forbidden"}, status=403)
     return JsonResponse({"status": "ok"}, status=200)
 
@@ -113,6 +143,7 @@ def upload_api(request):
     year = (request.POST.get("year") or "").strip()
     url = (request.POST.get("url") or "").strip() or None
     uploaded_file = request.FILES.get("file")
+    enqueue = request.POST.get("process", "1" if settings.EXTRACTION_ENQUEUE_ON_UPLOAD else "0") == "1"
 
     if not institution:
         return HttpResponseBadRequest("institution required")
@@ -123,76 +154,128 @@ def upload_api(request):
 
     upload_id = Upload.hash_uploaded_file(uploaded_file)
 
-    upload, created = Upload.objects.update_or_create(
-        id=upload_id,
-        defaults={
-            "user": request.user,
-            "institution": institution,
-            "year": year,
-            "url": url,
-            "file": uploaded_file,
-            "original_filename": uploaded_file.name,
-        },
-    )
+    existing = Q(pk=upload_id) | Q(content_sha256=upload_id)
+    fields = {
+        "user": request.user,
+        "institution": institution,
+        "year": year,
+        "url": url,
+        "original_filename": uploaded_file.name,
+    }
 
-    return JsonResponse(
-        {
-            "id": upload.id,
-            "file": upload.original_filename,
-        },
-        status=201 if created else 200,
-    )
+    upload = Upload.objects.filter(existing).first()
+    created = upload is None
+    if created:
+        upload = Upload(id=upload_id, content_sha256=upload_id, **fields)
+        upload.attach_file(uploaded_file)
+        try:
+            with transaction.atomic():
+                upload.save(force_insert=True)
+        except IntegrityError:
+            # The same content was uploaded concurrently and inserted first.
+            created = False
+            upload = Upload.objects.get(existing)
+    previous_group = None
+    if not created:
+        previous_group = (upload.institution, upload.year)
+        for name, value in fields.items():
+            setattr(upload, name, value)
+        # Known content keeps its stored copy; only missing files are written.
+        if not upload.file or not upload.file.storage.exists(upload.file.name):
+            upload.attach_file(uploaded_file)
+        upload.save()
+
+    if previous_group not in (None, (institution, year)):
+        # Re-uploaded under another institution or year: both summaries change.
+        InstitutionYearSummary.objects.refresh([previous_group, (institution, year)])
+
+    payload = {
+        "id": upload.id,
+        "file": upload.original_filename,
+    }
+    if enqueue:
+        job = enqueue_extraction(upload)
+        payload.update(_job_status_payload(upload, job))
+
+    return JsonResponse(payload, status=201 if created else 200)
+
+
+def _dump_response(request, uploads, row, empty=None):
+    """
+    Shared by the dump endpoints: ``?stream=ndjson|json`` streams every row,
+    ``?limit=``/``?cursor=`` returns one keyset page, and no parameters keeps
+    the original single JSON object. Filters from ``dumps.filter_uploads``
+    apply to every mode.
+    """
+    try:
+        uploads = dumps.filter_uploads(uploads, request.GET)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    stream = request.GET.get("stream")
+    if stream:
+        if stream not in ("ndjson", "json"):
+            return HttpResponseBadRequest("stream must be ndjson or json")
+        return dumps.streaming_response(uploads, row, stream, empty=empty)
+
+    if "limit" in request.GET or "cursor" in request.GET:
+        try:
+            limit = dumps.parse_limit(request.GET.get("limit"))
+            return dumps.paginated_response(uploads, row, limit, request.GET.get("cursor"))
+        except ValueError as exc:
+            return HttpResponseBadRequest(str(exc))
+
+    payload = {upload.id: row(upload) for upload in uploads}
+    if not payload and empty is not None:
+        return JsonResponse(empty, status=200)
+    return JsonResponse(payload, status=200)
 
 
 @api_login_required
 @require_GET
 def dump_uploads_api(request):
-    uploads = Upload.objects.select_related("user").order_by("-uploaded_at")
+    uploads = Upload.objects.select_related("user").order_by("-uploaded_at", "-id")
+    return _dump_response(
+        request,
+        uploads,
+        dumps.upload_row,
+        empty={
+            "status": "ok",
+            "count": 0,
+            "uploads": {},
+        },
+    )
 
-    payload = {
-        upload.id: {
-            "id": upload.id,
-            "user": upload.user.username,
-            "institution": upload.institution,
-            "year": upload.year,
-            "url": upload.url,
-            "file": upload.original_filename,
-            "uploaded_at": upload.uploaded_at.strftime("%Y-%m-%d %H:%M:%S"),
-            "download_url": f"/app/api/download/{upload.id}",
-            "process_url": f"/app/api/process/{upload.id}",
-        }
-        for upload in uploads
-    }
 
-    if not payload:
-        return JsonResponse(
-            {
-                "status": "ok",
-                "count": 0,
-                "uploads": {},
-            },
-            status=200,
-        )
+@curator_required
+@require_GET
+def dump_data_api(request):
+    uploads = Upload.objects.select_related("user").order_by("-uploaded_at", "-id")
+    return _dump_response(request, uploads, dumps.data_row)
 
-    return JsonResponse(payload, status=200)
 
 @curator_required
 @require_GET
-def dump_data_api(request):
-    uploads = Upload.objects.select_related("user").order_by("-uploaded_at")
+def stats_api(request):
+    """
+    Aggregates over the extracted fields: admit rates overall and by year,
+    the median of ``field`` (default tuition) by year and, for each
+    ``institution`` asked for, its values year by year. ``year`` and
+    ``institution`` may repeat to narrow every aggregate.
+    """
+    field = request.GET.get("field") or "tuition_undergraduates"
+    if field not in stats.FIELD_COLUMNS:
+        return HttpResponseBadRequest(f"unknown field: {field}")
+    institutions = request.GET.getlist("institution")
+    summaries = stats.summaries(institutions, request.GET.getlist("year"))
 
     payload = {
-        upload.id: {
-            "id": upload.id,
-            "user": upload.user.username,
-            "institution": upload.institution,
-            "year": upload.year,
-            "file": upload.original_filename,
-            "uploaded_at": upload.uploaded_at.strftime("%Y-%m-%d %H:%M:%S"),
-        }
-        for upload in uploads
+        "extractor_version": EXTRACTOR_VERSION,
+        "admit_rates": stats.admit_rates(summaries),
+        "median": {"field": field, "by_year": stats.median_by_year(summaries, field)},
     }
-
+    if institutions:
+        payload["series"] = stats.series(summaries)
     return JsonResponse(payload, status=200)
 
 
@@ -203,15 +286,9 @@ def download_api(request, upload_id):
     # 1. Direct lookup by primary key
     upload = Upload.objects.filter(pk=upload_id).first()
 
-    # 2. Fallback: recompute hashes from stored files
+    # 2. Fallback: rows whose id is not their content hash
     if upload is None:
-        for candidate in Upload.objects.all():
-            try:
-                if Upload.hash_uploaded_file(candidate.file) == upload_id:
-                    upload = candidate
-                    break
-            except Exception:
-                continue
+        upload = Upload.objects.filter(content_sha256=upload_id).first()
 
     # 3. Special-case empty file hash: return an actual zero-byte download
     # even if the stored row is missing or has a mismatched id.
@@ -227,38 +304,133 @@ def download_api(request, upload_id):
     if upload is None:
         raise Http404("Upload not found")
 
-    return FileResponse(
-        upload.file.open("rb"),
-        as_attachment=True,
-        filename=upload.original_filename,
-    )
+    return downloads.serve(request, upload)
+
+@api_login_required
+@require_http_methods(["GET", "POST"])
+def download_archive_api(request):
+    """
+    Stream a ZIP of the uploads matching ``ids`` (repeated, or a JSON/form
+    list when POSTed, as for process-batch) and the dump filters, newest
+    first. ``manifest=1`` adds manifest.json with their dump_uploads_api rows.
+    """
+    if request.method == "POST":
+        ids = _batch_ids(request)
+        if ids is None:
+            return HttpResponseBadRequest("ids must be a list of upload ids")
+    else:
+        ids = request.GET.getlist("ids")
+
+    filters = ("institution", "year", "user", "since", "until")
+    if not ids and not any(request.GET.get(name) for name in filters):
+        return HttpResponseBadRequest("ids or one of institution, year, user, since, until required")
+
+    uploads = Upload.objects.select_related("user").order_by("-uploaded_at", "-id")
+    if ids:
+        uploads = uploads.filter(pk__in=ids)
+    try:
+        uploads = dumps.filter_uploads(uploads, request.GET)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    manifest = request.GET.get("manifest") in ("1", "true")
+    response = StreamingHttpResponse(downloads.archive_chunks(uploads, manifest), content_type="application/zip")
+    response["Content-Disposition"] = content_disposition_header(True, "uploads.zip")
+    return response
+
 
 @require_GET
 def process_api(request, upload_id):
+    cached = get_cached_result(upload_id)
+    if cached is not None:
+        return JsonResponse(build_process_payload(cached.upload, cached.fields), status=200)
+
     upload = get_object_or_404(Upload, pk=upload_id)
 
+    if request.GET.get("mode") == "async":
+        job = enqueue_extraction(upload)
+        if job.state == ExtractionJob.FAILED:
+            return JsonResponse(build_process_payload(upload, error=job.error), status=400)
+        return JsonResponse(_job_status_payload(upload, job), status=202)
+
     try:
-        extracted = extract_fields_from_file(upload.file.path)
+        extracted = extract_and_store(upload)
     except Exception as exc:
-        payload = {
-            "id": upload.id,
-            "file": upload.original_filename,
-            "institution": upload.institution,
-            "year": upload.year,
-            **dict(EXPECTED_FIELDS),
-            "error": str(exc),
-        }
-        return JsonResponse(payload, status=400)
+        return JsonResponse(build_process_payload(upload, error=str(exc)), status=400)
 
+    return JsonResponse(build_process_payload(upload, extracted), status=200)
+
+
+def _job_status_payload(upload, job):
     payload = {
         "id": upload.id,
-        "file": upload.original_filename,
-        "institution": upload.institution,
-        "year": upload.year,
-        **extracted,
+        "status": job.state,
+        "status_url": f"/app/api/process-status/{upload.id}",
+        "process_url": f"/app/api/process/{upload.id}",
     }
+    if job.state == ExtractionJob.FAILED:
+        payload["error"] = job.error
+    return payload
 
-    return JsonResponse(payload, status=200)
+
+@require_GET
+def process_status_api(request, upload_id):
+    upload = get_object_or_404(Upload, pk=upload_id)
+
+    job = upload.extraction_jobs.filter(extractor_version=EXTRACTOR_VERSION).first()
+    if job is None:
+        if get_cached_result(upload.id) is None:
+            raise Http404("No extraction job for this upload")
+        job = ExtractionJob(upload=upload, extractor_version=EXTRACTOR_VERSION, state=ExtractionJob.DONE)
+
+    return JsonResponse(_job_status_payload(upload, job), status=200)
+
+
+def _batch_ids(request):
+    if request.content_type == "application/json":
+        try:
+            ids = json.loads(request.body or b"{}").get("ids")
+        except (ValueError, AttributeError):
+            return None
+        if not isinstance(ids, list) or not all(isinstance(upload_id, str) for upload_id in ids):
+            return None
+        return ids
+    return request.POST.getlist("ids")
+
+
+@api_login_required
+@require_http_methods(["POST"])
+def process_batch_api(request):
+    ids = _batch_ids(request)
+    if ids is None:
+        return HttpResponseBadRequest("ids must be a list of upload ids")
+    if not ids:
+        return HttpResponseBadRequest("ids required")
+    if len(ids) > settings.EXTRACTION_BATCH_MAX_IDS:
+        return HttpResponseBadRequest(f"at most {settings.EXTRACTION_BATCH_MAX_IDS} ids per batch")
+
+    results = iter_batch_results(ids, settings.EXTRACTION_BATCH_WORKERS)
+    lines = (json.dumps({"status": status, **payload}) + "\n" for status, payload in results)
+    return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+
+
+@curator_required
+@require_GET
+def metrics_api(request):
+    if not settings.REQUEST_METRICS_ENABLED:
+        raise Http404("Request metrics are disabled")
+    conversions = conversion_metrics.snapshot()
+    counters = {
+        "pdf_conversions_total": ("PDF conversions run.", conversions["conversions"]),
+        "pdf_conversion_failures_total": ("PDF conversions that failed.", conversions["failures"]),
+        "pdf_conversion_timeouts_total": ("PDF conversions killed at the timeout.", conversions["timeouts"]),
+        "pdf_converted_pages_total": ("PDF pages converted.", conversions["pages"]),
+        "pdf_conversion_seconds_total": ("Time spent converting PDFs.", conversions["seconds"]),
+    }
+    return HttpResponse(
+        metrics.registry.render_prometheus(counters),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 
 @require_GET
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -115,6 +116,71 @@ LOGOUT_REDIRECT_URL = '/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Hash uploads while they are received (see core/uploadhandlers.py)
+FILE_UPLOAD_HANDLERS = [
+    'core.uploadhandlers.HashingMemoryFileUploadHandler',
+    'core.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+
+# Background extraction
+# Worker processes used by `manage.py extraction_worker`.
+EXTRACTION_WORKER_PROCESSES = 2
+# A failed job is retried until it has been attempted this many times, and
+# the worker gives up waiting on a job after EXTRACTION_JOB_TIMEOUT seconds.
+EXTRACTION_JOB_MAX_ATTEMPTS = 3
+EXTRACTION_JOB_TIMEOUT = 300
+# Queue extraction as soon as a file is uploaded (overridable per request
+# with the `process` form field).
+EXTRACTION_ENQUEUE_ON_UPLOAD = False
+
+# /app/api/process-batch/: extraction threads per request and ids per batch.
+EXTRACTION_BATCH_WORKERS = 4
+EXTRACTION_BATCH_MAX_IDS = 1000
+
+# Converted PDF text, keyed by content hash (see core/textcache.py)
+EXTRACTION_TEXT_CACHE_DIR = BASE_DIR / 'cache' / 'text'
+EXTRACTION_TEXT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# PDF conversion: "auto" uses the pdftotext command, which is killed at the
+# timeout, and falls back to the in-process binding ("pdftotext-lib") only
+# when the command is missing. The binding has no hard timeout: a hung
+# conversion keeps one of the EXTRACTION_CONVERTER_WORKERS threads for good.
+EXTRACTION_PDF_CONVERTER = 'auto'
+EXTRACTION_CONVERTER_WORKERS = 4
+EXTRACTION_CONVERSION_TIMEOUT = 60
+EXTRACTION_MAX_PAGES = 200
+EXTRACTION_MAX_TEXT_BYTES = 50 * 1024 * 1024
+
+# Section lookup before conversion: pages converted per pdftotext call, and
+# the most pages read before giving up and converting the whole document.
+EXTRACTION_LOCATE_BATCH_PAGES = 8
+EXTRACTION_LOCATE_MAX_PAGES = 80
+
+# Per-request timing (see core/middleware.py): a Server-Timing header on
+# every response and rolling summaries for curators at /app/api/metrics/,
+# which is a 404 while this is off. Quantiles cover the last
+# REQUEST_METRICS_WINDOW requests per view.
+REQUEST_METRICS_ENABLED = False
+REQUEST_METRICS_WINDOW = 1000
+
+# download_api: leave file bodies to the web server instead of streaming
+# them from Python. None, 'x-sendfile' (Apache mod_xsendfile, lighttpd) or
+# 'x-accel-redirect' (nginx, with an internal location that serves
+# MEDIA_ROOT under DOWNLOAD_ACCEL_REDIRECT_PREFIX).
+DOWNLOAD_OFFLOAD = None
+DOWNLOAD_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# /app/api/createUsers/ and `manage.py create_users` (see core/provisioning.py):
+# password hashing threads and rows accepted per request.
+USER_PROVISIONING_WORKERS = 4
+USER_PROVISIONING_MAX_USERS = 1000
+
+# How long a user's harvester role stays cached (see core.models.user_is_curator).
+# Curator access is checked against the database on every request. Saving a
+# profile clears the entry, but only in the cache of the process that saved
+# it, so a promotion can take this long to reach every process.
+ROLE_CACHE_SECONDS = 300
+
 # Add to INSTALLED_APPS if not already there
 INSTALLED_APPS = [
     'django.contrib.admin',